@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Phân tích hàng loạt ván cờ không cần GUI
+Đọc ván từ file PGN (nước ICCS) hoặc file dòng ('startpos moves h2e2 ...'),
+chia các position cho nhiều process engine và ghi kết quả từng nước ra JSONL
+
+Chạy từ thư mục gốc:
+    python annotate.py games.pgn --depth 12 --output annotations.jsonl
+    python annotate.py games.txt --movetime 500 --engines 4 --option Hash=64
+Chạy lại cùng lệnh sẽ tiếp tục từ checkpoint (<output>.checkpoint).
+"""
+
+import argparse
+import sys
+
+from config.settings import settings
+from src.engine.batch_annotator import DEFAULT_THRESHOLDS, BatchAnnotator
+from src.engine.engine_resources import (available_cores, engine_options,
+                                         parse_option_assignment, resolve_engine,
+                                         split_resources)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Phân tích hàng loạt ván cờ bằng engine")
+    parser.add_argument('games', nargs='+', help="File ván cờ (.pgn hoặc file dòng)")
+    parser.add_argument('--engine', help="Tên engine trong config/engines.json hoặc đường dẫn")
+    parser.add_argument('--depth', type=int, help="Độ sâu cố định cho mỗi position")
+    parser.add_argument('--movetime', type=int, help="Thời gian cố định cho mỗi position (ms)")
+    parser.add_argument('--engines', type=int, default=available_cores(),
+                        help="Số process engine chạy song song (mặc định số core)")
+    parser.add_argument('--option', type=parse_option_assignment, action='append', default=[],
+                        help="Option engine NAME=VALUE (lặp lại được)")
+    parser.add_argument('--output', default='annotations.jsonl', help="File kết quả JSONL")
+    parser.add_argument('--checkpoint',
+                        help="File checkpoint (mặc định <output>.checkpoint)")
+    parser.add_argument('--restart', action='store_true',
+                        help="Bỏ checkpoint cũ, phân tích lại từ đầu")
+    for label, threshold in DEFAULT_THRESHOLDS.items():
+        parser.add_argument(f'--{label}', type=int, default=threshold,
+                            help=f"Điểm mất tối thiểu (cp) của {label} (mặc định {threshold})")
+    args = parser.parse_args(argv)
+
+    engines_config = settings.load_engines_config()
+    try:
+        name, path = resolve_engine(engines_config, args.engine)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    engine_settings = engines_config.get('engine_settings', {})
+    depth = args.depth
+    if not depth and not args.movetime:
+        depth = engine_settings.get('default_depth', 10)
+
+    # Không có GUI nên không cần để lại core
+    policy = dict(engine_settings.get('resources', {}), reserve_cores=0)
+    resources = split_resources(args.engines, policy)
+    options = engine_options(engines_config, name, path, resources)
+    options.update(args.option)
+
+    annotator = BatchAnnotator(
+        path, args.engines, depth, args.movetime, options,
+        {label: getattr(args, label) for label in DEFAULT_THRESHOLDS})
+    checkpoint = args.checkpoint or args.output + '.checkpoint'
+    try:
+        stats = annotator.run(args.games, args.output, checkpoint, resume=not args.restart)
+    except KeyboardInterrupt:
+        print(f"\n⏹️ Đã dừng, chạy lại để tiếp tục từ {checkpoint}")
+        return 130
+    except (OSError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    rate = stats['positions'] / stats['elapsed'] if stats['elapsed'] else 0.0
+    print(f"\n📊 {stats['games']} ván ({stats['skipped']} đã có, {stats['errors']} lỗi), "
+          f"{stats['positions']} position trong {stats['elapsed']:.1f}s ({rate:.1f}/s)")
+    print("   " + ", ".join(f"{label}: {count}" for label, count in stats['classes'].items()))
+    print(f"💾 Kết quả: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark parse dòng info của engine
+So sánh cách parse cũ (split + duyệt token) với src/engine/info_parser trên
+log info thu từ engine (mặc định benchmarks/data/info_lines.txt)
+
+Chạy từ thư mục gốc:
+    python benchmarks/info_parser_bench.py
+    python benchmarks/info_parser_bench.py --input pikafish.log --repeat 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.engine.info_parser import (INFO_FIELDS, RESULT_INFO_FIELDS,  # noqa: E402
+                                    parse_info, score_to_evaluation)
+
+DEFAULT_INPUT = os.path.join(ROOT_DIR, 'benchmarks', 'data', 'info_lines.txt')
+
+
+def legacy_parse_info(line):
+    """Cách parse cũ của EngineWorker (split cả dòng rồi duyệt token)"""
+    parts = line.split()
+    result = {}
+    i = 1
+    while i < len(parts):
+        if parts[i] == "depth" and i + 1 < len(parts):
+            result['depth'] = int(parts[i + 1])
+            i += 2
+        elif parts[i] == "score" and i + 2 < len(parts):
+            if parts[i + 1] == "cp":
+                result['evaluation'] = int(parts[i + 2]) / 100.0
+                i += 3
+            elif parts[i + 1] == "mate":
+                mate_moves = int(parts[i + 2])
+                result['evaluation'] = float('inf') if mate_moves > 0 else float('-inf')
+                i += 3
+            else:
+                i += 1
+        elif parts[i] == "nodes" and i + 1 < len(parts):
+            result['nodes'] = int(parts[i + 1])
+            i += 2
+        elif parts[i] == "pv":
+            result['pv'] = parts[i + 1:]
+            break
+        else:
+            i += 1
+    return result
+
+
+def new_parse_info(line):
+    """Parser dùng chung, đổi về cùng dạng với legacy_parse_info để đối chiếu"""
+    info = parse_info(line, RESULT_INFO_FIELDS)
+    if info is None:
+        return {}
+    evaluation = score_to_evaluation(info)
+    if evaluation is not None:
+        info['evaluation'] = evaluation
+    for key in ('score', 'mate', 'multipv'):
+        info.pop(key, None)
+    return info
+
+
+def worker_parse_info(line):
+    """Đúng phần việc EngineWorker làm với mỗi dòng info"""
+    info = parse_info(line, RESULT_INFO_FIELDS)
+    if info:
+        score_to_evaluation(info)
+    return info
+
+
+def load_lines(path):
+    """Các dòng info trong log (bỏ tiền tố như 'Nhận: ' nếu có)"""
+    lines = []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            index = line.find("info ")
+            if index > 0:
+                line = line[index:]
+            if line.startswith("info ") and not line.startswith("info string"):
+                lines.append(line)
+    return lines
+
+
+def time_parsers(parsers, lines, repeat):
+    """
+    Thời gian tốt nhất (giây) cho 1 lượt parse toàn bộ lines của từng parser
+
+    Các parser được đo xen kẽ trong mỗi vòng để nhiễu của máy chia đều
+    """
+    best = [float('inf')] * len(parsers)
+    for _ in range(repeat):
+        for index, parse in enumerate(parsers):
+            start = time.perf_counter()
+            for line in lines:
+                parse(line)
+            best[index] = min(best[index], time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parse dòng info của engine")
+    parser.add_argument('--input', default=DEFAULT_INPUT,
+                        help="File log chứa các dòng info (mặc định mẫu đi kèm repo)")
+    parser.add_argument('--repeat', type=int, default=50, help="Số lượt đo (mặc định 50)")
+    args = parser.parse_args(argv)
+
+    lines = load_lines(args.input)
+    if not lines:
+        print(f"❌ Không có dòng info trong {args.input}")
+        return 1
+
+    # Kết quả phải giống hệt cách parse cũ
+    mismatches = [line for line in lines if legacy_parse_info(line) != new_parse_info(line)]
+    for line in mismatches[:5]:
+        print(f"   ❌ {line}")
+
+    print(f"{len(lines)} dòng info từ {args.input}, {args.repeat} lượt\n")
+    print(f"{'Parser':<22} {'µs/dòng':>8} {'Dòng/s':>10}")
+    parsers = [
+        ("split (cũ)", legacy_parse_info),
+        ("info_parser", worker_parse_info),
+        ("info_parser (all)", lambda line: parse_info(line, INFO_FIELDS)),
+    ]
+    timings = time_parsers([parse for _, parse in parsers], lines, args.repeat)
+
+    for (name, _), elapsed in zip(parsers, timings):
+        per_line = elapsed / len(lines)
+        print(f"{name:<22} {per_line * 1e6:>8.2f} {int(1 / per_line):>10}")
+
+    print("\n✅ Kết quả khớp cách parse cũ" if not mismatches
+          else f"\n❌ {len(mismatches)} dòng khác cách parse cũ")
+    return 0 if not mismatches else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
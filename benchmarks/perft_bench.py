@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark bộ sinh nước đi bằng perft
+Đo nodes/s trên bộ FEN (khai cuộc, trung cuộc, tàn cuộc) và đối chiếu số node
+với perft của Fairy-Stockfish đi kèm repo
+
+Chạy từ thư mục gốc:
+    python benchmarks/perft_bench.py --depth 3
+    python benchmarks/perft_bench.py --depth 4 --no-engine
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.core.perft import START_FEN, perft, perft_divide  # noqa: E402
+from src.core.position import Position  # noqa: E402
+
+DEFAULT_ENGINE = os.path.join(ROOT_DIR, 'engines', 'Fairy-Stockfish', 'fairy-stockfish')
+
+# (tên, FEN, {depth: số node đã biết})
+PERFT_SUITE = [
+    ("opening", START_FEN,
+     {1: 44, 2: 1920, 3: 79666, 4: 3290240}),
+    ("midgame", "r1ba1a3/4kn3/2n1b4/pNp1p1p1p/4c4/6P2/P1P2R2P/1CcC5/9/2BAKAB2 w",
+     {1: 38, 2: 1128, 3: 43929, 4: 1339047}),
+    ("midgame-2", "1cbak4/9/n2a5/2p1p3p/5cp2/2n2N3/6PCP/3AB4/2C6/3A1K1N1 w",
+     {1: 7, 2: 281, 3: 8620, 4: 326201}),
+    ("endgame", "5a3/3k5/3aR4/9/5r3/5n3/9/3A1A3/5K3/2BC2B2 w",
+     {1: 25, 2: 424, 3: 9850, 4: 202884}),
+    ("endgame-2", "CRN1k1b2/3ca4/4ba3/9/2nr5/9/9/4B4/4A4/4KA3 w",
+     {1: 28, 2: 516, 3: 14808, 4: 395483}),
+    ("endgame-3", "R1N1k1b2/9/3aba3/9/2nr5/2B6/9/4B4/4A4/4KA3 w",
+     {1: 21, 2: 364, 3: 7626, 4: 162837}),
+]
+
+_DIVIDE_LINE = re.compile(r'^([a-i])(\d+)([a-i])(\d+): (\d+)$')
+
+
+def engine_perft(engine_path, fen, depth, timeout=600):
+    """
+    Chạy 'go perft' trên Fairy-Stockfish
+
+    Returns:
+        tuple: (tổng node, dict divide theo ký hiệu engine của GUI) hoặc
+               (None, None) nếu không chạy được engine
+    """
+    commands = (
+        "setoption name UCI_Variant value xiangqi\n"
+        f"position fen {fen} - - 0 1\n"
+        f"go perft {depth}\n"
+        "quit\n"
+    )
+    try:
+        output = subprocess.run([engine_path], input=commands, capture_output=True,
+                                text=True, timeout=timeout).stdout
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"⚠️  Không chạy được engine {engine_path}: {e}")
+        return None, None
+
+    total = None
+    divide = {}
+    for line in output.splitlines():
+        line = line.strip()
+        match = _DIVIDE_LINE.match(line)
+        if match:
+            # Fairy-Stockfish đánh rank 1..10, GUI/UCCI dùng 0..9
+            from_file, from_rank, to_file, to_rank, nodes = match.groups()
+            move = f"{from_file}{int(from_rank) - 1}{to_file}{int(to_rank) - 1}"
+            divide[move] = int(nodes)
+        elif line.startswith('Nodes searched'):
+            total = int(line.split()[-1])
+    return total, divide
+
+
+def report_divide_mismatch(position, depth, engine_divide):
+    """In các nước đầu tiên có số node khác engine"""
+    ours = perft_divide(position, depth)
+    for move in sorted(set(ours) | set(engine_divide)):
+        if ours.get(move) != engine_divide.get(move):
+            print(f"      {move}: ours={ours.get(move)} engine={engine_divide.get(move)}")
+
+
+def run_suite(max_depth, engine_path=None):
+    """
+    Chạy toàn bộ suite
+
+    Returns:
+        bool: True nếu mọi kết quả khớp
+    """
+    all_ok = True
+    total_nodes = 0
+    total_time = 0.0
+
+    print(f"{'Position':<10} {'D':>2} {'Nodes':>10} {'Time(s)':>8} {'Nodes/s':>9}  Check")
+    for name, fen, known in PERFT_SUITE:
+        position = Position.from_fen(fen)
+        for depth in range(1, max_depth + 1):
+            start = time.perf_counter()
+            nodes = perft(position, depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+
+            checks = []
+            ok = True
+            if depth in known:
+                ok = ok and nodes == known[depth]
+                checks.append("known" if nodes == known[depth] else f"known={known[depth]}")
+
+            engine_divide = None
+            if engine_path:
+                engine_nodes, engine_divide = engine_perft(engine_path, fen, depth)
+                if engine_nodes is not None:
+                    ok = ok and nodes == engine_nodes
+                    checks.append("engine" if nodes == engine_nodes
+                                  else f"engine={engine_nodes}")
+
+            nps = int(nodes / elapsed) if elapsed > 0 else 0
+            status = "✓" if ok else "❌"
+            print(f"{name:<10} {depth:>2} {nodes:>10} {elapsed:>8.3f} {nps:>9}  "
+                  f"{status} {' '.join(checks)}")
+
+            if not ok:
+                all_ok = False
+                if engine_divide:
+                    report_divide_mismatch(position, depth, engine_divide)
+
+    nps = int(total_nodes / total_time) if total_time > 0 else 0
+    print(f"\nTổng: {total_nodes} nodes trong {total_time:.3f}s ({nps} nodes/s)")
+    return all_ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft benchmark cho bộ sinh nước đi")
+    parser.add_argument('--depth', type=int, default=3, help="Độ sâu tối đa (mặc định 3)")
+    parser.add_argument('--engine', default=DEFAULT_ENGINE,
+                        help="Đường dẫn Fairy-Stockfish để đối chiếu")
+    parser.add_argument('--no-engine', action='store_true',
+                        help="Chỉ so với số node đã biết, không chạy engine")
+    args = parser.parse_args(argv)
+
+    engine_path = None
+    if not args.no_engine:
+        if os.path.isfile(args.engine) and os.access(args.engine, os.X_OK):
+            engine_path = args.engine
+        else:
+            print(f"⚠️  Không tìm thấy engine: {args.engine}, chỉ so với số node đã biết")
+
+    ok = run_suite(args.depth, engine_path)
+    print("✅ Perft khớp" if ok else "❌ Perft KHÔNG khớp")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cho các engine đấu với nhau không cần GUI (đo sức mạnh các bản build engine)
+Engine lấy theo tên trong config/engines.json hoặc đường dẫn; khai cuộc từ file
+PGN hoặc file dòng (xem src/core/game_file)
+
+Chạy từ thư mục gốc:
+    python match.py --engine Fairy-Stockfish --engine ./build/fairy-stockfish --tc 10+0.1
+    python match.py --engine A --engine B --openings openings.txt --rounds 2 \\
+        --sprt 0 5 --pgn match.pgn
+    python match.py --engine A --engine B --tc 60+0.5 --ponder
+"""
+
+import argparse
+import sys
+
+from config.settings import settings
+from src.core.clock import UNLIMITED, parse_time_control
+from src.engine.engine_resources import (available_cores, engine_options,
+                                         parse_option_assignment, resolve_engine,
+                                         split_resources)
+from src.engine.match_runner import (DEFAULT_MAX_PLIES, DEFAULT_SPRT, DEFAULT_TIME_MARGIN,
+                                     MatchRunner, load_openings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cho các engine đấu với nhau")
+    parser.add_argument('--engine', action='append', default=[],
+                        help="Tên engine trong config/engines.json hoặc đường dẫn "
+                             "(lặp lại, mặc định mọi engine trong config)")
+    parser.add_argument('--tc', type=parse_time_control,
+                        help="Time control: 10+0.1 (Fischer, mặc định), 40/300 (số nước), "
+                             "600:30x3 (byoyomi), st=5 (giây mỗi nước)")
+    parser.add_argument('--depth', type=int, help="Độ sâu cố định mỗi nước (thay cho --tc)")
+    parser.add_argument('--movetime', type=int, help="Thời gian cố định mỗi nước (ms)")
+    parser.add_argument('--openings', action='append', default=[],
+                        help="File khai cuộc (.pgn hoặc file dòng), mặc định vị trí ban đầu")
+    parser.add_argument('--rounds', type=int, default=1,
+                        help="Số lượt lặp lại bộ khai cuộc (mỗi khai cuộc 2 ván đổi màu)")
+    parser.add_argument('--concurrency', type=int,
+                        help="Số ván chạy song song (mặc định số core, --ponder: nửa số core)")
+    parser.add_argument('--max-plies', type=int, default=DEFAULT_MAX_PLIES,
+                        help=f"Số nửa nước tối đa, quá thì xử hòa (mặc định {DEFAULT_MAX_PLIES})")
+    parser.add_argument('--time-margin', type=int, default=DEFAULT_TIME_MARGIN,
+                        help=f"Thời gian vượt quá cho phép (ms, mặc định {DEFAULT_TIME_MARGIN})")
+    parser.add_argument('--sprt', type=float, nargs=2, metavar=('ELO0', 'ELO1'),
+                        help="Dừng sớm theo SPRT (chỉ khi có 2 engine)")
+    parser.add_argument('--alpha', type=float, default=DEFAULT_SPRT['alpha'])
+    parser.add_argument('--beta', type=float, default=DEFAULT_SPRT['beta'])
+    parser.add_argument('--option', type=parse_option_assignment, action='append', default=[],
+                        help="Option cho mọi engine NAME=VALUE (lặp lại được)")
+    parser.add_argument('--pgn', help="Ghi các ván ra file PGN")
+    parser.add_argument('--ponder', action='store_true',
+                        help="Cho engine suy nghĩ trong lượt đối thủ (go ponder/ponderhit)")
+    args = parser.parse_args(argv)
+
+    engines_config = settings.load_engines_config()
+    requested = args.engine or [entry['name'] for entry in engines_config.get('engines', [])]
+    # Mỗi ván có 2 engine nhưng chỉ 1 engine tìm kiếm tại 1 thời điểm, trừ khi
+    # ponder (cả 2 cùng search) nên mặc định giảm một nửa số ván song song
+    concurrency = args.concurrency
+    if not concurrency:
+        concurrency = max(1, available_cores() // 2) if args.ponder else available_cores()
+    policy = dict(engines_config.get('engine_settings', {}).get('resources', {}),
+                  reserve_cores=0)
+    resources = split_resources(2 * concurrency, policy)
+
+    engines = []
+    for engine in requested:
+        try:
+            name, path = resolve_engine(engines_config, engine)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        # Tên phải khác nhau để phân biệt trong bảng kết quả
+        unique_name, index = name, 2
+        while any(entry['name'] == unique_name for entry in engines):
+            unique_name, index = f"{name} #{index}", index + 1
+        options = engine_options(engines_config, name, path, resources)
+        options.update(args.option)
+        engines.append({'name': unique_name, 'path': path, 'options': options})
+    if len(engines) < 2:
+        print("❌ Cần ít nhất 2 engine (--engine A --engine B)")
+        return 1
+
+    time_control = args.tc
+    if time_control and time_control['mode'] == UNLIMITED:
+        time_control = None
+    if not time_control and not args.depth and not args.movetime:
+        time_control = parse_time_control('10+0.1')
+    sprt = None
+    if args.sprt:
+        sprt = {'elo0': args.sprt[0], 'elo1': args.sprt[1],
+                'alpha': args.alpha, 'beta': args.beta}
+
+    runner = MatchRunner(engines, load_openings(args.openings), args.rounds,
+                         concurrency, time_control, args.depth, args.movetime,
+                         args.max_plies, args.time_margin, sprt, args.pgn, args.ponder)
+    try:
+        summary = runner.run()
+    except KeyboardInterrupt:
+        print("\n⏹️ Đã dừng match")
+        summary = runner.summary()
+
+    print(f"\n📊 {summary['games']} ván")
+    for pair in summary['pairs']:
+        print(f"   {pair['first']} vs {pair['second']}: +{pair['wins']} ={pair['draws']} "
+              f"-{pair['losses']}, điểm {pair['score']:.3f}, "
+              f"Elo {pair['elo']:.1f} ± {pair['error']:.1f}, LOS {pair['los'] * 100:.1f}%")
+    status = summary['sprt']
+    if status is not None:
+        verdict = f"chấp nhận {status['result']}" if status['result'] else "chưa ngã ngũ"
+        print(f"   SPRT [{sprt['elo0']}, {sprt['elo1']}]: LLR {status['llr']:.2f} "
+              f"({status['lower']:.2f}, {status['upper']:.2f}) - {verdict}")
+    ponder = summary['ponder']
+    if args.ponder and ponder['hits'] + ponder['misses']:
+        rate = ponder['hits'] / (ponder['hits'] + ponder['misses'])
+        print(f"   Ponder: {ponder['hits']} đoán đúng, {ponder['misses']} đoán sai "
+              f"({rate * 100:.1f}%)")
+    if args.pgn:
+        print(f"💾 PGN: {args.pgn}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
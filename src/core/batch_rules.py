@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+"""
+Batch Rules cho Xiangqi
+Kiểm tra luật trên nhiều position cùng lúc bằng NumPy: mask nước hợp lệ,
+cờ bị chiếu và số quân tấn công từng ô cho mảng (N, 90) mã quân
+
+Dùng cho các công cụ cần xử lý hàng loạt (kiểm tra thế cờ xếp, puzzle,
+sinh dataset). Mã quân và chỉ số ô giống Position: sq = row * 9 + col,
+quân Đen có bit BLACK_FLAG.
+
+Ví dụ:
+    boards, sides = encode_positions(fens)
+    for start, result in iter_evaluate(boards, sides):
+        result['legal']      # (n, NUM_MOVE_SLOTS) bool, cột = MOVE_SLOTS
+        result['in_check']   # (n,) bool
+        result['attacks']    # (n, 2, 90) uint8, [:, RED] / [:, BLACK]
+"""
+
+import numpy as np
+
+from .move_tables import (BOARD_SIZE, KING_STEPS_SQ, ADVISOR_STEPS_SQ,
+                          ELEPHANT_HOPS_SQ, HORSE_HOPS_SQ, HORSE_ATTACKERS_SQ,
+                          RAYS_SQ, PAWN_STEPS_SQ, PAWN_ATTACKERS_SQ)
+from .position import (Position, RED, BLACK, KING, ADVISOR, ELEPHANT, HORSE,
+                       ROOK, CANNON, PAWN)
+
+# Số position xử lý mỗi lượt (giới hạn bộ nhớ tạm ~ vài chục MB)
+DEFAULT_CHUNK_SIZE = 4096
+
+# Ô đệm luôn trống: các bảng gather được đệm bằng chỉ số này
+SENTINEL = BOARD_SIZE
+
+
+def _pad(rows, width, fill=SENTINEL):
+    """Danh sách các dãy độ dài khác nhau -> mảng (len(rows), width) đã đệm"""
+    table = np.full((len(rows), width), fill, dtype=np.intp)
+    for index, row in enumerate(rows):
+        table[index, :len(row)] = row
+    return table
+
+
+def _pad_pairs(rows, width):
+    """Bảng [sq] -> tuple (a, b) thành 2 mảng (90, width) đã đệm"""
+    first = _pad([[pair[0] for pair in row] for row in rows], width)
+    second = _pad([[pair[1] for pair in row] for row in rows], width)
+    return first, second
+
+
+# ---------------------------------------------------------------------------
+# Ô đích của nước đi (xuôi: từ ô xuất phát) và quân tấn công (ngược: từ ô đích)
+# ---------------------------------------------------------------------------
+
+# RAY_TABLE[sq, dir, k]: ô thứ k trên tia dir (2 tia đầu là hàng dọc)
+RAY_TABLE = np.stack([_pad(rays, 9) for rays in RAYS_SQ])
+
+HORSE_TO, HORSE_LEG = _pad_pairs(HORSE_HOPS_SQ, 8)
+ELEPHANT_TO, ELEPHANT_EYE = _pad_pairs(ELEPHANT_HOPS_SQ, 4)
+HORSE_FROM, HORSE_FROM_LEG = _pad_pairs(HORSE_ATTACKERS_SQ, 8)
+KING_TO = _pad(KING_STEPS_SQ, 4)
+ADVISOR_TO = _pad(ADVISOR_STEPS_SQ, 4)
+PAWN_TO = np.stack([_pad(PAWN_STEPS_SQ[side], 3) for side in (RED, BLACK)])
+PAWN_FROM = np.stack([_pad(PAWN_ATTACKERS_SQ[side], 3) for side in (RED, BLACK)])
+
+# ---------------------------------------------------------------------------
+# Ô nước đi: mỗi cặp (from_sq, to_sq) mà ít nhất 1 loại quân đi được
+# ---------------------------------------------------------------------------
+
+
+def _build_move_slots():
+    pairs = set()
+    for sq in range(BOARD_SIZE):
+        tables = [KING_TO[sq], ADVISOR_TO[sq], ELEPHANT_TO[sq], HORSE_TO[sq],
+                  RAY_TABLE[sq].ravel(), PAWN_TO[RED, sq], PAWN_TO[BLACK, sq]]
+        for table in tables:
+            pairs.update((sq, int(to_sq)) for to_sq in table if to_sq != SENTINEL)
+    return np.array(sorted(pairs), dtype=np.intp)
+
+
+# MOVE_SLOTS[i] = (from_sq, to_sq) của cột i trong mask nước đi
+MOVE_SLOTS = _build_move_slots()
+NUM_MOVE_SLOTS = len(MOVE_SLOTS)
+
+# SLOT_INDEX[from_sq, to_sq] -> cột (NUM_MOVE_SLOTS nếu không có cặp này)
+SLOT_INDEX = np.full((BOARD_SIZE, BOARD_SIZE), NUM_MOVE_SLOTS, dtype=np.intp)
+SLOT_INDEX[MOVE_SLOTS[:, 0], MOVE_SLOTS[:, 1]] = np.arange(NUM_MOVE_SLOTS)
+
+# ---------------------------------------------------------------------------
+# Chuyển đổi
+# ---------------------------------------------------------------------------
+
+def encode_positions(items):
+    """
+    Chuyển nhiều position sang mảng cho các hàm batch
+
+    Args:
+        items: Iterable các Position, GameState, FEN hoặc board 10x9
+
+    Returns:
+        tuple: (boards (N, 90) int8, sides (N,) int8)
+
+    Raises:
+        ValueError: FEN không hợp lệ
+    """
+    squares = bytearray()
+    sides = bytearray()
+    for item in items:
+        if isinstance(item, str):
+            position = Position.from_fen(item)
+        elif isinstance(item, Position):
+            position = item
+        elif hasattr(item, 'position'):
+            position = item.position
+        else:
+            position = Position(item)
+        squares += position.squares
+        sides.append(position.side)
+
+    boards = np.frombuffer(bytes(squares), dtype=np.int8).reshape(-1, BOARD_SIZE)
+    return boards.copy(), np.frombuffer(bytes(sides), dtype=np.int8).copy()
+
+
+def slot_moves(mask_row):
+    """Hàng mask (NUM_MOVE_SLOTS,) -> danh sách nước (from_sq, to_sq)"""
+    return [tuple(pair) for pair in MOVE_SLOTS[np.flatnonzero(mask_row)].tolist()]
+
+
+def _check_input(boards, sides=None):
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim != 2 or boards.shape[1] != BOARD_SIZE:
+        raise ValueError(f"boards phải có dạng (N, {BOARD_SIZE}), nhận {boards.shape}")
+    if sides is None:
+        return boards, None
+    sides = np.asarray(sides, dtype=np.int8)
+    if sides.shape != (len(boards),):
+        raise ValueError(f"sides phải có dạng ({len(boards)},), nhận {sides.shape}")
+    return boards, sides
+
+
+def _extend(boards):
+    """Thêm cột ô đệm SENTINEL (luôn trống)"""
+    return np.concatenate(
+        [boards, np.zeros((len(boards), 1), dtype=np.int8)], axis=1)
+
+
+def _gather(ext, table):
+    """ext[n, table[n, ...]] với table cùng số hàng (n, ...) -> (n, ...)"""
+    offsets = np.arange(len(ext)) * ext.shape[1]
+    return ext.ravel()[table + offsets.reshape((-1,) + (1,) * (table.ndim - 1))]
+
+
+# ---------------------------------------------------------------------------
+# Chiếu tướng / tấn công
+# ---------------------------------------------------------------------------
+
+def _attacked(ext, squares, by_sides):
+    """
+    Ô squares[n] có bị quân của by_sides[n] tấn công không (như
+    Position.attackers, gồm tướng đối mặt khi ô đó là tướng bên kia)
+    """
+    color = (by_sides.astype(np.int8) << 3)
+    rook, cannon = ROOK | color, CANNON | color
+    king = KING | color
+    rows = np.arange(len(ext))
+
+    # Quân thứ nhất (xe, tướng đối mặt) và thứ 2 (pháo) trên mỗi tia
+    rays = _gather(ext, RAY_TABLE[squares])                     # (n, 4, 9)
+    occupied = rays != 0
+    count = np.cumsum(occupied, axis=2, dtype=np.int8)
+    first = np.where(occupied & (count == 1), rays, 0)
+    second = np.where(occupied & (count == 2), rays, 0)
+    flying = ext[rows, squares] == KING | (color ^ 8)
+    hit = (first == rook[:, None, None]).any(axis=(1, 2))
+    hit |= flying & (first[:, :2] == king[:, None, None]).any(axis=(1, 2))
+    hit |= (second == cannon[:, None, None]).any(axis=(1, 2))
+
+    horse = _gather(ext, HORSE_FROM[squares]) == (HORSE | color)[:, None]
+    hit |= (horse & (_gather(ext, HORSE_FROM_LEG[squares]) == 0)).any(axis=1)
+
+    pawn = _gather(ext, PAWN_FROM[by_sides, squares]) == (PAWN | color)[:, None]
+    hit |= pawn.any(axis=1)
+    hit |= (_gather(ext, KING_TO[squares]) == king[:, None]).any(axis=1)
+    hit |= (_gather(ext, ADVISOR_TO[squares]) == (ADVISOR | color)[:, None]).any(axis=1)
+
+    elephant = _gather(ext, ELEPHANT_TO[squares]) == (ELEPHANT | color)[:, None]
+    hit |= (elephant & (_gather(ext, ELEPHANT_EYE[squares]) == 0)).any(axis=1)
+    return hit
+
+
+def _king_squares(ext, sides):
+    """(ô tướng của sides, có tướng không) cho mỗi hàng"""
+    is_king = ext == (KING | (sides.astype(np.int8) << 3))[:, None]
+    return is_king.argmax(axis=1), is_king.any(axis=1)
+
+
+def _in_check(ext, sides):
+    king_sq, has_king = _king_squares(ext, sides)
+    return has_king & _attacked(ext, king_sq, sides ^ 1)
+
+
+def in_check(boards, sides, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Tướng của bên sides[n] có đang bị chiếu không (gồm tướng đối mặt)
+
+    Args:
+        boards: (N, 90) int8 mã quân
+        sides: (N,) RED/BLACK
+
+    Returns:
+        np.ndarray: (N,) bool
+    """
+    boards, sides = _check_input(boards, sides)
+    result = np.zeros(len(boards), dtype=bool)
+    for start in range(0, len(boards), chunk_size):
+        end = start + chunk_size
+        result[start:end] = _in_check(_extend(boards[start:end]), sides[start:end])
+    return result
+
+
+def _piece_reach(ext):
+    """
+    Mọi ô mỗi quân trên bàn với tới được (duyệt theo quân, không theo ô)
+
+    Returns:
+        list: Mỗi nhóm quân 1 tuple (rows, from_sq, colors, to_sq, attacks,
+              moves) - 3 mảng đầu (k, 1), còn lại (k, width):
+              attacks: quân tấn công to_sq (như Position.attackers, to_sq có
+              thể là SENTINEL), moves: nước đúng luật di chuyển (chưa xét
+              chiếu tướng)
+    """
+    rows, squares = np.nonzero(ext[:, :BOARD_SIZE])
+    codes = ext[rows, squares]
+    kinds = codes & 7
+    colors = codes >> 3
+    parts = []
+
+    def add(select, targets, attacks, moves):
+        # targets/attacks/moves: (k, width) cho các quân được chọn
+        parts.append((rows[select][:, None], squares[select][:, None],
+                      colors[select][:, None], targets, attacks,
+                      moves & (targets != SENTINEL)))
+
+    flat = ext.ravel()
+    offsets = rows * ext.shape[1]
+
+    def target_values(select, targets):
+        values = flat[targets + offsets[select][:, None]]
+        own = (values != 0) & ((values >> 3) == colors[select][:, None])
+        return values, own
+
+    # Xe, pháo: số quân nằm giữa quân và ô đích trên từng tia
+    select = np.flatnonzero((kinds == ROOK) | (kinds == CANNON))
+    targets = RAY_TABLE[squares[select]].reshape(len(select), -1)
+    values, own = target_values(select, targets)
+    occupied = (values != 0).reshape(-1, 4, 9)
+    between = (np.cumsum(occupied, axis=2, dtype=np.int8) - occupied).reshape(values.shape)
+    occupied = occupied.reshape(values.shape)
+    rook = (kinds[select] == ROOK)[:, None]
+    attacks = np.where(rook, between == 0, between == 1)
+    moves = np.where(rook, attacks & ~own,
+                     ((between == 0) & ~occupied) | (attacks & occupied & ~own))
+    add(select, targets, attacks, moves)
+
+    # Tướng đối mặt: chỉ tính tấn công (không sinh nước đi), quân đầu tiên
+    # trên tia dọc là tướng bên kia
+    select = np.flatnonzero(kinds == KING)
+    targets = RAY_TABLE[squares[select], :2].reshape(len(select), -1)
+    values, _ = target_values(select, targets)
+    occupied = (values != 0).reshape(-1, 2, 9)
+    first = ((np.cumsum(occupied, axis=2, dtype=np.int8) == 1) & occupied).reshape(values.shape)
+    flying = first & (values == (KING | ((colors[select] ^ 1) << 3))[:, None])
+    add(select, targets, flying, np.zeros_like(flying))
+
+    # Mã, tượng: ô chân/mắt phải trống
+    for code, table, blocks in ((HORSE, HORSE_TO, HORSE_LEG),
+                                (ELEPHANT, ELEPHANT_TO, ELEPHANT_EYE)):
+        select = np.flatnonzero(kinds == code)
+        targets = table[squares[select]]
+        _, own = target_values(select, targets)
+        attacks = flat[blocks[squares[select]] + offsets[select][:, None]] == 0
+        add(select, targets, attacks, attacks & ~own)
+
+    # Tướng, sĩ, tốt: chỉ cần ô đích không có quân cùng phe
+    for code, table in ((KING, KING_TO), (ADVISOR, ADVISOR_TO), (PAWN, None)):
+        select = np.flatnonzero(kinds == code)
+        if table is None:
+            targets = PAWN_TO[colors[select], squares[select]]
+        else:
+            targets = table[squares[select]]
+        _, own = target_values(select, targets)
+        add(select, targets, np.ones(targets.shape, dtype=bool), ~own)
+
+    return parts
+
+
+def _attack_counts(ext, reach=None):
+    width = BOARD_SIZE + 1
+    counts = np.zeros(len(ext) * 2 * width, dtype=np.intp)
+    for rows, _, colors, to_sq, attacks, _ in reach or _piece_reach(ext):
+        index = ((rows * 2 + colors) * width + to_sq)[attacks]
+        counts += np.bincount(index, minlength=len(counts))
+    return counts.reshape(len(ext), 2, width)[:, :, :BOARD_SIZE].astype(np.uint8)
+
+
+def attack_counts(boards, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Số quân mỗi bên tấn công từng ô (= len(Position.attackers(sq, side)),
+    tính cả ô có quân cùng phe, tức số quân bảo vệ)
+
+    Returns:
+        np.ndarray: (N, 2, 90) uint8, chỉ số 1 là RED/BLACK
+    """
+    boards, _ = _check_input(boards)
+    result = np.zeros((len(boards), 2, BOARD_SIZE), dtype=np.uint8)
+    for start in range(0, len(boards), chunk_size):
+        end = start + chunk_size
+        result[start:end] = _attack_counts(_extend(boards[start:end]))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Sinh nước đi
+# ---------------------------------------------------------------------------
+
+def _nth_on_rays(ray_squares, rays, count, nth):
+    """(ô, mã quân) của quân thứ nth trên mỗi tia, mã 0 nếu không có"""
+    found = (rays != 0) & (count == nth)
+    index = found.argmax(axis=2)[..., None]
+    squares = np.take_along_axis(ray_squares, index, axis=2)[..., 0]
+    codes = np.where(found.any(axis=2), np.take_along_axis(rays, index, axis=2)[..., 0], 0)
+    return squares, codes
+
+
+def _exposure_squares(ext, king_sq, sides):
+    """
+    Ô có thể làm lộ tướng của sides khi chưa bị chiếu
+
+    Returns:
+        tuple: (from_mask, to_mask) dạng (n, 91) bool - chỉ nước đi khỏi ô
+               trong from_mask (quân bị ghim, chân mã) hoặc đi vào ô trong
+               to_mask (kê ngòi cho pháo) mới cần đi thử
+    """
+    n = len(ext)
+    width = ext.shape[1]
+    offsets = (np.arange(n) * width)[:, None]
+    color = ((sides.astype(np.int8) ^ 1) << 3)[:, None]
+    from_mask = np.zeros(n * width, dtype=bool)
+    to_mask = np.zeros(n * width, dtype=bool)
+
+    ray_squares = RAY_TABLE[king_sq]                              # (n, 4, 9)
+    rays = _gather(ext, ray_squares)
+    count = np.cumsum(rays != 0, axis=2, dtype=np.int8)
+    first_sq, first = _nth_on_rays(ray_squares, rays, count, 1)
+    second_sq, second = _nth_on_rays(ray_squares, rays, count, 2)
+    _, third = _nth_on_rays(ray_squares, rays, count, 3)
+
+    # Quân duy nhất chắn xe (hoặc tướng đối mặt trên hàng dọc)
+    pinned = (second == ROOK | color)
+    pinned[:, :2] |= second[:, :2] == KING | color
+    # 2 quân nằm giữa tướng và pháo
+    screens = third == CANNON | color
+    from_mask[(first_sq + offsets)[pinned | screens]] = True
+    from_mask[(second_sq + offsets)[screens]] = True
+
+    # Ô trống giữa tướng và pháo đối phương: đi vào thành ngòi
+    cannon = (first == CANNON | color)[..., None] & (count == 0)
+    to_mask[(ray_squares + offsets[..., None])[cannon]] = True
+
+    # Chân mã / mắt tượng đối phương đang bị chặn trên đường tới tướng
+    for code, attackers, blocks in ((HORSE, HORSE_FROM, HORSE_FROM_LEG),
+                                    (ELEPHANT, ELEPHANT_TO, ELEPHANT_EYE)):
+        blocks = blocks[king_sq]
+        blocked = ((_gather(ext, attackers[king_sq]) == color + code)
+                   & (_gather(ext, blocks) != 0))
+        from_mask[(blocks + offsets)[blocked]] = True
+    return from_mask.reshape(n, width), to_mask.reshape(n, width)
+
+
+def _legal_mask(ext, sides, reach):
+    parts = []
+    for rows, from_sq, colors, to_sq, _, moves in reach:
+        moves = moves & (colors == sides[rows])
+        shape = to_sq.shape
+        parts.append((np.broadcast_to(rows, shape)[moves],
+                      np.broadcast_to(from_sq, shape)[moves], to_sq[moves]))
+    rows, from_sq, to_sq = (np.concatenate(column) for column in zip(*parts))
+
+    # Chỉ đi thử nước của tướng, nước khi đang bị chiếu và nước có thể làm
+    # lộ tướng; các nước còn lại chắc chắn hợp lệ
+    king_sq, has_king = _king_squares(ext, sides)
+    checked = has_king & _attacked(ext, king_sq, sides ^ 1)
+    exposed_from, exposed_to = _exposure_squares(ext, king_sq, sides)
+    trial = has_king[rows] & (checked[rows] | (from_sq == king_sq[rows])
+                              | exposed_from[rows, from_sq]
+                              | exposed_to[rows, to_sq])
+
+    trial_rows, trial_from, trial_to = rows[trial], from_sq[trial], to_sq[trial]
+    after = ext[trial_rows]
+    index = np.arange(len(trial_rows))
+    after[index, trial_to] = after[index, trial_from]
+    after[index, trial_from] = 0
+    legal = np.ones(len(rows), dtype=bool)
+    legal[np.flatnonzero(trial)] = ~_in_check(after, sides[trial_rows])
+
+    mask = np.zeros((len(ext), NUM_MOVE_SLOTS), dtype=bool)
+    mask[rows[legal], SLOT_INDEX[from_sq[legal], to_sq[legal]]] = True
+    return mask, checked
+
+
+def iter_evaluate(boards, sides, chunk_size=DEFAULT_CHUNK_SIZE, attacks=True):
+    """
+    Đánh giá luật theo từng khối chunk_size position (không giữ toàn bộ
+    mask trong bộ nhớ)
+
+    Args:
+        boards: (N, 90) int8 mã quân
+        sides: (N,) bên tới lượt
+        attacks: Có tính attack_counts không
+
+    Yields:
+        tuple: (start, dict) với dict gồm
+               'legal': (n, NUM_MOVE_SLOTS) bool - nước hợp lệ theo MOVE_SLOTS
+               'move_counts': (n,) int - số nước hợp lệ
+               'in_check': (n,) bool - bên tới lượt đang bị chiếu
+               'attacks': (n, 2, 90) uint8 (nếu attacks=True)
+    """
+    boards, sides = _check_input(boards, sides)
+    for start in range(0, len(boards), chunk_size):
+        ext = _extend(boards[start:start + chunk_size])
+        chunk_sides = sides[start:start + chunk_size]
+        reach = _piece_reach(ext)
+        legal, checked = _legal_mask(ext, chunk_sides, reach)
+        result = {
+            'legal': legal,
+            'move_counts': legal.sum(axis=1),
+            'in_check': checked,
+        }
+        if attacks:
+            result['attacks'] = _attack_counts(ext, reach)
+        yield start, result
+
+
+def legal_move_mask(boards, sides, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Mask nước hợp lệ của bên tới lượt
+
+    Returns:
+        np.ndarray: (N, NUM_MOVE_SLOTS) bool, cột i là nước MOVE_SLOTS[i]
+    """
+    boards, sides = _check_input(boards, sides)
+    result = np.zeros((len(boards), NUM_MOVE_SLOTS), dtype=bool)
+    for start, chunk in iter_evaluate(boards, sides, chunk_size, attacks=False):
+        result[start:start + len(chunk['legal'])] = chunk['legal']
+    return result
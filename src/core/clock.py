@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Clock cho Xiangqi
+Đồng hồ 2 bên đo bằng time.monotonic (độ phân giải dưới 1 ms), không cộng dồn
+theo tick của timer nên không bị trôi
+
+Các chế độ (parse_time_control):
+    ''/'none'       unlimited: chỉ đếm thời gian đã dùng
+    '10+0.1'        fischer: 10 giây, cộng 0.1 giây sau mỗi nước
+    '40/300+0'      fischer theo số nước: 300 giây cho mỗi 40 nước (movestogo)
+    '600:30x3'      byoyomi: 600 giây chính, sau đó 3 khoảng 30 giây/nước
+    'st=5'          fixed: tối đa 5 giây mỗi nước
+"""
+
+import time
+from typing import Callable, Dict, Optional
+
+UNLIMITED = 'unlimited'
+FISCHER = 'fischer'
+BYOYOMI = 'byoyomi'
+FIXED = 'fixed'
+
+SIDES = ('red', 'black')
+
+
+def _seconds_to_ms(text: str) -> int:
+    return int(round(float(text) * 1000))
+
+
+def parse_time_control(text: str) -> Dict[str, object]:
+    """
+    Chuỗi time control -> dict (thời gian tính bằng ms)
+
+    Returns:
+        dict: {'mode', 'time', 'inc', 'moves', 'period', 'periods', 'movetime'}
+
+    Raises:
+        ValueError: Sai định dạng
+    """
+    spec = text.strip().lower()
+    time_control = {'mode': UNLIMITED, 'time': 0, 'inc': 0, 'moves': None,
+                    'period': 0, 'periods': 0, 'movetime': 0}
+    try:
+        if spec in ('', 'none', 'unlimited', '-'):
+            return time_control
+
+        if spec.startswith('st='):
+            time_control.update(mode=FIXED, movetime=_seconds_to_ms(spec[3:]))
+            if time_control['movetime'] <= 0:
+                raise ValueError
+            return time_control
+
+        if ':' in spec:
+            base, _, byoyomi = spec.partition(':')
+            period, _, periods = byoyomi.partition('x')
+            time_control.update(mode=BYOYOMI, time=_seconds_to_ms(base),
+                                period=_seconds_to_ms(period),
+                                periods=int(periods) if periods else 1)
+            if (time_control['time'] < 0 or time_control['period'] <= 0
+                    or time_control['periods'] <= 0):
+                raise ValueError
+            return time_control
+
+        moves, _, rest = spec.rpartition('/')
+        base, _, increment = rest.partition('+')
+        time_control.update(mode=FISCHER, time=_seconds_to_ms(base),
+                            inc=_seconds_to_ms(increment) if increment else 0,
+                            moves=int(moves) if moves else None)
+        if (time_control['time'] <= 0 or time_control['inc'] < 0
+                or (time_control['moves'] is not None and time_control['moves'] <= 0)):
+            raise ValueError
+        return time_control
+    except ValueError:
+        raise ValueError(f"Time control không hợp lệ: {text}") from None
+
+
+def format_time_control(time_control: Dict[str, object]) -> str:
+    """Dict time control -> chuỗi dạng parse_time_control"""
+    mode = time_control['mode']
+
+    def seconds(ms):
+        return f"{ms / 1000:g}"
+
+    if mode == FIXED:
+        return f"st={seconds(time_control['movetime'])}"
+    if mode == BYOYOMI:
+        return (f"{seconds(time_control['time'])}:{seconds(time_control['period'])}"
+                f"x{time_control['periods']}")
+    if mode == FISCHER:
+        text = seconds(time_control['time'])
+        if time_control['inc']:
+            text += f"+{seconds(time_control['inc'])}"
+        if time_control['moves']:
+            text = f"{time_control['moves']}/{text}"
+        return text
+    return 'none'
+
+
+class GameClock:
+    """
+    Đồng hồ ván cờ cho 2 bên 'red'/'black'
+
+    Thời gian trừ khi bấm đồng hồ (press) theo thời điểm monotonic lúc bắt
+    đầu lượt; remaining()/flagged() tính cả lượt đang chạy.
+    """
+
+    def __init__(self, time_control: Dict[str, object] = None,
+                 timer: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            time_control: Kết quả parse_time_control (mặc định unlimited)
+            timer: Hàm thời gian (giây), mặc định time.monotonic
+        """
+        self.time_control = dict(time_control or parse_time_control(''))
+        self.timer = timer
+        self.reset()
+
+    @property
+    def mode(self) -> str:
+        return self.time_control['mode']
+
+    def reset(self):
+        """Về trạng thái đầu ván, đồng hồ dừng, lượt Đỏ"""
+        tc = self.time_control
+        # Thời gian chính còn lại (ms); unlimited: luôn 0
+        self.main = {side: float(tc['time']) for side in SIDES}
+        self.periods = {side: tc['periods'] for side in SIDES}
+        self.used = {side: 0.0 for side in SIDES}
+        self.moves = {side: 0 for side in SIDES}
+        self.side = 'red'
+        self.turn_start = None  # Thời điểm bắt đầu lượt (None = đang dừng)
+        self.flag = None  # Bên đã hết giờ
+
+    @property
+    def running(self) -> bool:
+        return self.turn_start is not None
+
+    def start(self, side: str = None):
+        """Bắt đầu chạy đồng hồ cho side (mặc định bên đang tới lượt)"""
+        if side is not None:
+            self.side = side
+        if self.flag is None:
+            self.turn_start = self.timer()
+
+    def stop(self):
+        """Dừng đồng hồ, trừ thời gian lượt đang chạy (không cộng giờ)"""
+        if self.running:
+            self._charge(self._elapsed())
+            self.turn_start = None
+
+    pause = stop
+
+    def resume(self):
+        """Chạy tiếp sau pause"""
+        if not self.running:
+            self.start()
+
+    def _elapsed(self) -> float:
+        """Thời gian (ms) của lượt đang chạy"""
+        if self.turn_start is None:
+            return 0.0
+        return (self.timer() - self.turn_start) * 1000.0
+
+    def _charge(self, elapsed: float):
+        """Trừ elapsed (ms) vào thời gian chính của bên đang đi"""
+        self.used[self.side] += elapsed
+        if self.mode in (FISCHER, BYOYOMI):
+            self.main[self.side] -= elapsed
+
+    def move_deadline(self, side: str = None) -> Optional[float]:
+        """
+        Thời gian tối đa (ms) cho nước hiện tại của side tính từ đầu lượt
+        (đã trừ phần đã dùng), None nếu không giới hạn
+        """
+        side = side or self.side
+        tc = self.time_control
+        if self.mode == FIXED:
+            return float(tc['movetime'])
+        if self.mode == FISCHER:
+            return max(0.0, self.main[side])
+        if self.mode == BYOYOMI:
+            return max(0.0, self.main[side]) + tc['period'] * self.periods[side]
+        return None
+
+    def remaining(self, side: str) -> Optional[float]:
+        """
+        Thời gian còn lại (ms) của side tính cả lượt đang chạy (byoyomi: thời
+        gian chính, hết thì thời gian của khoảng hiện tại), None nếu unlimited
+        """
+        elapsed = self._elapsed() if side == self.side else 0.0
+        tc = self.time_control
+        if self.mode == FIXED:
+            return max(0.0, tc['movetime'] - elapsed)
+        if self.mode == FISCHER:
+            return max(0.0, self.main[side] - elapsed)
+        if self.mode == BYOYOMI:
+            left = self.main[side] - elapsed
+            if left > 0:
+                return left
+            if self.periods[side] <= 0:
+                return 0.0
+            # Phần đã vượt thời gian chính tính theo khoảng byoyomi hiện tại
+            overflow = -left
+            if overflow >= tc['period'] * self.periods[side]:
+                return 0.0
+            return tc['period'] - overflow % tc['period']
+        return None
+
+    def used_time(self, side: str) -> float:
+        """Tổng thời gian (ms) side đã dùng, tính cả lượt đang chạy"""
+        return self.used[side] + (self._elapsed() if side == self.side else 0.0)
+
+    def flagged(self, grace: float = 0.0) -> Optional[str]:
+        """Bên đã hết giờ (kiểm tra cả lượt đang chạy), grace: thời gian vượt cho phép (ms)"""
+        if self.flag is None and self.running:
+            deadline = self.move_deadline()
+            if deadline is not None and self._elapsed() > deadline + grace:
+                self.flag = self.side
+        return self.flag
+
+    def press(self, grace: float = 0.0) -> bool:
+        """
+        Bên đang đi bấm đồng hồ sau khi đi: trừ giờ, kiểm tra hết giờ, cộng
+        giờ theo chế độ rồi chuyển lượt
+
+        Returns:
+            bool: False nếu bên vừa đi đã hết giờ (đồng hồ dừng)
+        """
+        if self.flag is not None:
+            return False
+        side = self.side
+        elapsed = self._elapsed()
+        deadline = self.move_deadline()
+        if deadline is not None and elapsed > deadline + grace:
+            self._charge(elapsed)
+            self.flag = side
+            self.turn_start = None
+            return False
+
+        self._charge(elapsed)
+        self.moves[side] += 1
+        tc = self.time_control
+        if self.mode == FISCHER:
+            self.main[side] += tc['inc']
+            if tc['moves'] and self.moves[side] % tc['moves'] == 0:
+                self.main[side] += tc['time']
+        elif self.mode == BYOYOMI and self.main[side] < 0:
+            # Mỗi khoảng byoyomi bị vượt quá thì mất khoảng đó
+            overflow = -self.main[side]
+            self.periods[side] -= int(overflow // tc['period'])
+            self.main[side] = 0.0
+
+        self.side = 'black' if side == 'red' else 'red'
+        if self.running:
+            self.turn_start = self.timer()
+        return True
+
+    def snapshot(self) -> Dict[str, object]:
+        """Trạng thái đồng hồ (không gồm lượt đang chạy) để restore khi hoàn tác"""
+        return {'main': dict(self.main), 'periods': dict(self.periods),
+                'used': dict(self.used), 'moves': dict(self.moves), 'side': self.side}
+
+    def restore(self, state: Dict[str, object]):
+        """
+        Quay về trạng thái snapshot() và bỏ cờ hết giờ (hoàn tác nước hết giờ);
+        đồng hồ dừng, gọi start() để chạy tiếp
+        """
+        self.main = dict(state['main'])
+        self.periods = dict(state['periods'])
+        self.used = dict(state['used'])
+        self.moves = dict(state['moves'])
+        self.side = state['side']
+        self.turn_start = None
+        self.flag = None
+
+    def switch_to(self, side: str):
+        """Đổi lượt mà không tính là 1 nước (undo, nhảy tới ply, load position)"""
+        if side == self.side:
+            return
+        running = self.running
+        self.stop()
+        self.side = side
+        if running:
+            self.start()
+
+    def go_arguments(self) -> Dict[str, int]:
+        """
+        Tham số thời gian cho UCCIEngine.go theo trạng thái hiện tại
+
+        byoyomi gửi dạng Fischer: wtime = thời gian chính + 1 khoảng, winc = 1
+        khoảng (engine UCI/UCCI không có byoyomi); unlimited trả về {}
+        """
+        tc = self.time_control
+        if self.mode == FIXED:
+            return {'time_ms': tc['movetime']}
+        if self.mode == FISCHER:
+            arguments = {'wtime': int(self.remaining('red')),
+                         'btime': int(self.remaining('black')),
+                         'winc': tc['inc'], 'binc': tc['inc']}
+            if tc['moves']:
+                arguments['movestogo'] = tc['moves'] - self.moves[self.side] % tc['moves']
+            return arguments
+        if self.mode == BYOYOMI:
+            def budget(side):
+                main = max(0.0, self.main[side] - (self._elapsed() if side == self.side else 0.0))
+                return int(main + (tc['period'] if self.periods[side] > 0 else 0))
+            return {'wtime': budget('red'), 'btime': budget('black'),
+                    'winc': tc['period'], 'binc': tc['period']}
+        return {}
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Game File cho Xiangqi
+Đọc lần lượt (streaming) các ván cờ từ file để xử lý hàng loạt
+
+Hỗ trợ 2 định dạng:
+- PGN với nước đi ICCS ('H2-E2' hoặc 'h2e2'), vị trí đầu lấy từ tag [FEN "..."]
+- File dòng: mỗi dòng 1 ván, '#' là comment
+      startpos moves h2e2 h9g7 ...
+      <FEN> moves h2e2 ...
+      h2e2 h9g7 ...                (từ vị trí ban đầu)
+"""
+
+import os
+import re
+from typing import Iterator, List
+
+from .perft import START_FEN
+
+# Nước đi ICCS/engine: 'h2e2', 'H2-E2'
+MOVE_RE = re.compile(r'^([a-iA-I])([0-9])-?([a-iA-I])([0-9])$')
+
+# Số thứ tự nước trong PGN: '1.', '12...'
+MOVE_NUMBER_RE = re.compile(r'^\d+\.+')
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+TAG_RE = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+
+
+def normalize_move(token: str) -> str:
+    """'H2-E2' -> 'h2e2', ValueError nếu không phải nước ICCS"""
+    match = MOVE_RE.match(token)
+    if not match:
+        raise ValueError(f"Nước đi không hợp lệ: {token}")
+    return ''.join(match.groups()).lower()
+
+
+def normalize_fen(fen: str) -> str:
+    """Chỉ giữ phần bàn cờ và lượt đi ('... w - - 0 1' -> '... w')"""
+    parts = fen.split()
+    if not parts:
+        raise ValueError("FEN rỗng")
+    return ' '.join(parts[:2]) if len(parts) >= 2 else f"{parts[0]} w"
+
+
+def _game(game_id: str, fen: str, moves: List[str], headers: dict = None) -> dict:
+    return {'id': game_id, 'fen': fen, 'moves': moves, 'headers': headers or {}}
+
+
+def _error_game(game_id: str, error: Exception, headers: dict = None) -> dict:
+    game = _game(game_id, None, [], headers)
+    game['error'] = str(error)
+    return game
+
+
+def parse_game_line(line: str) -> dict:
+    """
+    Parse 1 dòng của file dòng
+
+    Returns:
+        dict: {'fen': ..., 'moves': [...]}
+
+    Raises:
+        ValueError: Dòng sai định dạng
+    """
+    head, _, tail = line.partition(' moves ')
+    head = head.strip()
+    if head == 'moves':
+        head, tail = '', ''
+    elif head.startswith('moves '):
+        head, tail = '', head[len('moves '):]
+
+    if head in ('', 'startpos'):
+        fen = START_FEN
+    elif '/' in head:
+        fen = normalize_fen(head)
+    else:
+        # Chỉ có danh sách nước đi
+        fen, tail = START_FEN, line
+    return {'fen': fen, 'moves': [normalize_move(token) for token in tail.split()]}
+
+
+def _movetext_tokens(text: str) -> List[str]:
+    """Token nước đi của movetext PGN (bỏ comment, biến thể, số thứ tự, kết quả)"""
+    tokens = []
+    depth = 0
+    for token in re.sub(r'\{[^}]*\}|;[^\n]*|\$\d+', ' ',
+                        text).replace('(', ' ( ').replace(')', ' ) ').split():
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth = max(0, depth - 1)
+        elif depth == 0 and token not in RESULTS:
+            token = MOVE_NUMBER_RE.sub('', token)
+            if token:
+                tokens.append(token)
+    return tokens
+
+
+def _iter_pgn(lines: Iterator[str], name: str) -> Iterator[dict]:
+    headers = {}
+    movetext = []
+    index = 0
+
+    def finish():
+        game_id = f"{name}:{index}"
+        try:
+            fen = normalize_fen(headers['FEN']) if headers.get('FEN') else START_FEN
+            moves = [normalize_move(token) for token in _movetext_tokens(' '.join(movetext))]
+            return _game(game_id, fen, moves, dict(headers))
+        except ValueError as e:
+            return _error_game(game_id, e, dict(headers))
+
+    for line in lines:
+        line = line.strip()
+        match = TAG_RE.match(line)
+        if match:
+            if movetext:
+                # Tag của ván tiếp theo
+                yield finish()
+                index += 1
+                headers.clear()
+                movetext.clear()
+            headers[match.group(1)] = match.group(2)
+        elif line and not line.startswith('%'):
+            movetext.append(line)
+
+    if headers or movetext:
+        yield finish()
+
+
+def _iter_lines(lines: Iterator[str], name: str) -> Iterator[dict]:
+    index = 0
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        game_id = f"{name}:{index}"
+        try:
+            game = parse_game_line(line)
+            yield _game(game_id, game['fen'], game['moves'])
+        except ValueError as e:
+            yield _error_game(game_id, e)
+        index += 1
+
+
+def iter_games(path: str) -> Iterator[dict]:
+    """
+    Đọc lần lượt các ván trong file (không nạp cả file vào bộ nhớ)
+
+    Định dạng xác định theo phần mở rộng: .pgn là PGN, còn lại là file dòng
+
+    Yields:
+        dict: {'id': '<tên file>:<số thứ tự>', 'fen': FEN đầu ván,
+               'moves': ['h2e2', ...], 'headers': {...}}
+        Ván đọc lỗi có thêm 'error' (fen = None)
+    """
+    name = os.path.basename(path)
+    parse = _iter_pgn if path.lower().endswith('.pgn') else _iter_lines
+    with open(path, encoding='utf-8', errors='replace') as f:
+        yield from parse(f, name)
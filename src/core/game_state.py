@@ -5,17 +5,39 @@ Quản lý trạng thái và logic cơ bản của game cờ tướng
 """
 
 from ..utils.constants import INITIAL_POSITION, BOARD_WIDTH, BOARD_HEIGHT
+from .move_tables import SQUARE_COORDS, square_index
+from .position import (Position, RED, BLACK, SIDE_NAMES, CODE_TO_PIECE,
+                       PIECE_SQUARE_KEYS)
+from .move_log import MoveLog, CHECKPOINT_INTERVAL, FLAG_CHECK, FLAG_CHASE
+from .zobrist import SIDE_KEY
+from .repetition import RepetitionTracker, NO_CAPTURE_DRAW_PLIES, PERPETUAL_CHECK
 
 
 class GameState:
-    """Class quản lý trạng thái game cờ tướng"""
+    """
+    Class quản lý trạng thái game cờ tướng
+
+    Bàn cờ thực sự nằm trong self.position (Position dạng mảng phẳng);
+    GameState giữ API dạng board 10x9 / tọa độ (row, col) cho GUI và engine.
+    """
+
+    def __init__(self, verbose=True):
+        """
+        Khởi tạo game state với position ban đầu
+
+        Args:
+            verbose: In log nước đi/kết quả ra console (tắt khi chạy hàng loạt)
+        """
+        self.verbose = verbose
+        self.position = Position()
+        self._board_view = None
+        self._board_view_key = None
 
-    def __init__(self):
-        """Khởi tạo game state với position ban đầu"""
         self.board = self._create_initial_board()
         self.current_player = 'red'  # 'red' hoặc 'black'
-        self.move_history = []
-        self.game_status = 'playing'  # 'playing', 'checkmate', 'stalemate', 'draw'
+        # 'playing', 'checkmate', 'no_move', 'draw', 'perpetual_check', 'perpetual_chase',
+        # 'timeout' (hết giờ, do đồng hồ của GUI đặt)
+        self.game_status = 'playing'
 
         # FEN attributes
         self.active_color = 'w'  # 'w' for red/white, 'b' for black
@@ -24,23 +46,17 @@ class GameState:
         self.game_over = False
         self.winner = None
 
-        # Move history để undo
-        self.board_history = []  # Lưu trạng thái board sau mỗi nước đi
-        self.captured_pieces = []  # Lưu quân bị bắt để restore
-        self.player_history = []  # Lưu lịch sử lượt chơi
+        # Lịch sử nước đi (delta 32-bit mỗi ply, gồm cả các nước để redo)
+        self.move_log = MoveLog()
 
-        # Redo stacks
-        self.redo_board_history = []
-        self.redo_player_history = []
-        self.redo_captured_pieces = []
-        self.redo_move_history = []
+        # Chỉ mục position theo khóa Zobrist để xử lặp/chiếu dai/đuổi dai
+        self.repetition = RepetitionTracker()
         self.reset()
 
     def reset(self):
         """Reset game state về trạng thái ban đầu"""
         self.board = self._create_initial_board()
         self.current_player = 'red'
-        self.move_history = []
         self.game_status = 'playing'
         self.active_color = 'w'
         self.fullmove_number = 1
@@ -48,18 +64,82 @@ class GameState:
         self.game_over = False
         self.winner = None
 
-        # Clear move history
-        self.board_history = []
-        self.captured_pieces = []
-        self.player_history = []
+        # Clear move history và redo stack
+        self.clear_history()
 
-        # Clear redo stacks
-        self.redo_board_history = []
-        self.redo_player_history = []
-        self.redo_captured_pieces = []
-        self.redo_move_history = []
+        self._log("🔄 GameState reset về trạng thái ban đầu")
 
-        print("🔄 GameState reset về trạng thái ban đầu")
+    def _log(self, message):
+        """In log ra console nếu bật verbose"""
+        if self.verbose:
+            print(message)
+
+    @property
+    def board(self):
+        """
+        Board 10x9 hiện tại (ký tự quân hoặc None)
+
+        Được dựng lại từ position khi position thay đổi; chỉ dùng để đọc,
+        chỉnh sửa trực tiếp từng ô sẽ không có tác dụng - hãy dùng push/pop
+        hoặc gán lại cả board.
+        """
+        key = self.position.key
+        if self._board_view is None or self._board_view_key != key:
+            self._board_view = self.position.to_board()
+            self._board_view_key = key
+        return self._board_view
+
+    @board.setter
+    def board(self, new_board):
+        """Gán board mới (nạp vào position, tính lại khóa Zobrist)"""
+        self.position.set_board(new_board)
+        self._board_view = None
+
+    @property
+    def current_player(self):
+        """Bên tới lượt: 'red' hoặc 'black'"""
+        return SIDE_NAMES[self.position.side]
+
+    @current_player.setter
+    def current_player(self, player):
+        self.position.set_side(BLACK if player == 'black' else RED)
+
+    @property
+    def active_color(self):
+        """Lượt đi dạng FEN: 'w' (Đỏ) hoặc 'b' (Đen)"""
+        return 'b' if self.position.side == BLACK else 'w'
+
+    @active_color.setter
+    def active_color(self, color):
+        self.position.set_side(BLACK if color == 'b' else RED)
+
+    @property
+    def king_positions(self):
+        """Vị trí 2 tướng: {'red': (row, col) | None, 'black': ...}"""
+        return {SIDE_NAMES[side]: SQUARE_COORDS[sq] if sq is not None else None
+                for side, sq in enumerate(self.position.king_squares)}
+
+    @property
+    def move_history(self):
+        """Các nước đã đi dạng 'a9b7' (row theo board), tới ply hiện tại"""
+        return [self._move_notation(from_sq, to_sq)
+                for from_sq, to_sq, _, _, _ in self.move_log.iter_records()]
+
+    @property
+    def captured_pieces(self):
+        """Quân bị bắt ở từng ply (None nếu nước đó không bắt quân)"""
+        return [CODE_TO_PIECE[captured]
+                for _, _, _, captured, _ in self.move_log.iter_records()]
+
+    @property
+    def zobrist_key(self):
+        """
+        Khóa Zobrist 64-bit của position hiện tại (bàn cờ + lượt đi)
+
+        Dùng làm key cho phát hiện lặp, cache phân tích, khai cuộc...
+        thay vì dựng lại FEN mỗi nước.
+        """
+        return self.position.key
 
     def _parse_fen(self, fen):
         """Parse FEN string thành board state"""
@@ -92,40 +172,16 @@ class GameState:
         Returns:
             str: FEN notation
         """
-        try:
-            # Build board part
-            fen_parts = []
-            for row in self.board:
-                rank_str = ""
-                empty_count = 0
-
-                for piece in row:
-                    if piece is None:
-                        empty_count += 1
-                    else:
-                        if empty_count > 0:
-                            rank_str += str(empty_count)
-                            empty_count = 0
-                        rank_str += piece
-
-                # Thêm empty squares cuối rank
-                if empty_count > 0:
-                    rank_str += str(empty_count)
-
-                fen_parts.append(rank_str)
+        return self.position.to_fen()
 
-            board_fen = "/".join(fen_parts)
-
-            # Map current_player sang active_color cho FEN
-            active_color = 'w' if self.current_player == 'red' else 'b'
-
-            # Build complete FEN
-            fen = f"{board_fen} {active_color}"
-            return fen
+    def start_fen(self):
+        """
+        FEN của position gốc (ply 0) của history
 
-        except Exception as e:
-            print(f"❌ Lỗi generate FEN: {e}")
-            return None
+        Gửi engine cặp start_fen() + move_history thay vì FEN hiện tại,
+        vì move_history tính từ position gốc.
+        """
+        return self.move_log.position_at(0).to_fen()
 
     def is_valid_move(self, from_row, from_col, to_row, to_col):
         """
@@ -157,7 +213,10 @@ class GameState:
             return False
 
         # Kiểm tra nước đi theo luật từng quân
-        if not self._is_valid_piece_move(piece, from_row, from_col, to_row, to_col):
+        from_sq = square_index(from_row, from_col)
+        moves = []
+        self.position.piece_moves(from_sq, moves)
+        if (from_sq, square_index(to_row, to_col)) not in moves:
             return False
 
         # Kiểm tra không để vua bị chiếu sau nước đi
@@ -166,7 +225,7 @@ class GameState:
 
         # Kiểm tra không vi phạm quy tắc tướng đối tướng sau nước đi
         if self._would_violate_flying_general_after_move(from_row, from_col, to_row, to_col):
-            print(
+            self._log(
                 f"❌ Nước đi từ ({from_row},{from_col}) đến ({to_row},{to_col}) vi phạm quy tắc tướng đối tướng")
             return False
 
@@ -183,136 +242,6 @@ class GameState:
         else:
             return piece.islower()  # Black pieces are lowercase
 
-    def _is_valid_piece_move(self, piece, from_row, from_col, to_row, to_col):
-        """
-        Kiểm tra nước đi có hợp lệ theo luật của từng quân không
-        """
-        piece_type = piece.lower()
-
-        if piece_type == 'k':  # King/General
-            return self._is_valid_king_move(from_row, from_col, to_row, to_col)
-        elif piece_type == 'a':  # Advisor
-            return self._is_valid_advisor_move(from_row, from_col, to_row, to_col)
-        elif piece_type == 'b':  # Bishop/Elephant
-            return self._is_valid_bishop_move(from_row, from_col, to_row, to_col)
-        elif piece_type == 'n':  # Knight/Horse
-            return self._is_valid_knight_move(from_row, from_col, to_row, to_col)
-        elif piece_type == 'r':  # Rook/Chariot
-            return self._is_valid_rook_move(from_row, from_col, to_row, to_col)
-        elif piece_type == 'c':  # Cannon
-            return self._is_valid_cannon_move(from_row, from_col, to_row, to_col)
-        elif piece_type == 'p':  # Pawn/Soldier
-            return self._is_valid_pawn_move(piece, from_row, from_col, to_row, to_col)
-
-        return False
-
-    def _is_valid_king_move(self, from_row, from_col, to_row, to_col):
-        """Kiểm tra nước đi của Vua/Tướng"""
-        # Chỉ di chuyển 1 ô theo chiều dọc hoặc ngang
-        if abs(from_row - to_row) + abs(from_col - to_col) != 1:
-            return False
-
-        # Phải ở trong cung
-        if not self._is_in_palace(to_row, to_col):
-            return False
-
-        return True
-
-    def _is_valid_advisor_move(self, from_row, from_col, to_row, to_col):
-        """Kiểm tra nước đi của Sĩ"""
-        # Chỉ di chuyển chéo 1 ô
-        if abs(from_row - to_row) != 1 or abs(from_col - to_col) != 1:
-            return False
-
-        # Phải ở trong cung
-        return self._is_in_palace(to_row, to_col)
-
-    def _is_valid_bishop_move(self, from_row, from_col, to_row, to_col):
-        """Kiểm tra nước đi của Tượng/Voi"""
-        # Di chuyển chéo 2 ô
-        if abs(from_row - to_row) != 2 or abs(from_col - to_col) != 2:
-            return False
-
-        # Không được qua sông
-        if not self._is_same_side_of_river(from_row, to_row):
-            return False
-
-        # Kiểm tra có bị chặn không (elephant eye)
-        block_row = from_row + (to_row - from_row) // 2
-        block_col = from_col + (to_col - from_col) // 2
-        return self.board[block_row][block_col] is None
-
-    def _is_valid_knight_move(self, from_row, from_col, to_row, to_col):
-        """Kiểm tra nước đi của Mã"""
-        row_diff = abs(from_row - to_row)
-        col_diff = abs(from_col - to_col)
-
-        # Mã đi chữ L (2-1 hoặc 1-2)
-        if not ((row_diff == 2 and col_diff == 1) or (row_diff == 1 and col_diff == 2)):
-            return False
-
-        # Kiểm tra có bị chặn chân không
-        if row_diff == 2:  # Di chuyển theo chiều dọc
-            block_row = from_row + (1 if to_row > from_row else -1)
-            block_col = from_col
-        else:  # Di chuyển theo chiều ngang
-            block_row = from_row
-            block_col = from_col + (1 if to_col > from_col else -1)
-
-        return self.board[block_row][block_col] is None
-
-    def _is_valid_rook_move(self, from_row, from_col, to_row, to_col):
-        """Kiểm tra nước đi của Xe"""
-        # Chỉ di chuyển theo đường thẳng
-        if from_row != to_row and from_col != to_col:
-            return False
-
-        # Kiểm tra đường đi có bị chặn không
-        return self._is_path_clear(from_row, from_col, to_row, to_col)
-
-    def _is_valid_cannon_move(self, from_row, from_col, to_row, to_col):
-        """Kiểm tra nước đi của Pháo"""
-        # Chỉ di chuyển theo đường thẳng
-        if from_row != to_row and from_col != to_col:
-            return False
-
-        target_piece = self.board[to_row][to_col]
-
-        if target_piece is None:
-            # Di chuyển bình thường - đường phải trống
-            return self._is_path_clear(from_row, from_col, to_row, to_col)
-        else:
-            # Bắn quân - phải có đúng 1 quân làm giá đỡ
-            return self._count_pieces_between(from_row, from_col, to_row, to_col) == 1
-
-    def _is_valid_pawn_move(self, piece, from_row, from_col, to_row, to_col):
-        """Kiểm tra nước đi của Tốt/Binh"""
-        is_red = piece.isupper()
-
-        # Chỉ di chuyển 1 ô
-        if abs(from_row - to_row) + abs(from_col - to_col) != 1:
-            return False
-
-        # Trước khi qua sông chỉ đi thẳng
-        if not self._has_crossed_river(from_row, is_red):
-            # Chỉ được đi thẳng
-            if from_col != to_col:
-                return False
-            # Đi đúng hướng
-            if is_red:
-                return to_row < from_row  # Red moves up (decreasing row)
-            else:
-                return to_row > from_row  # Black moves down (increasing row)
-        else:
-            # Sau khi qua sông có thể đi ngang hoặc tiến
-            if from_row == to_row:  # Di chuyển ngang
-                return True
-            else:  # Di chuyển dọc
-                if is_red:
-                    return to_row < from_row  # Red continues up
-                else:
-                    return to_row > from_row  # Black continues down
-
     def make_move(self, from_row, from_col, to_row, to_col):
         """
         Thực hiện nước đi và lưu history để undo
@@ -330,53 +259,108 @@ class GameState:
 
         # Kiểm tra xem nước đi có để tướng bị chiếu không
         if self._would_be_in_check_after_move(from_row, from_col, to_row, to_col):
-            print("❌ Nước đi này sẽ để tướng bị chiếu")
+            self._log("❌ Nước đi này sẽ để tướng bị chiếu")
             return False
 
         # Kiểm tra quy tắc tướng đối mặt
         if self._would_violate_flying_general_after_move(from_row, from_col, to_row, to_col):
-            print("❌ Nước đi này vi phạm quy tắc tướng đối mặt")
+            self._log("❌ Nước đi này vi phạm quy tắc tướng đối mặt")
             return False
 
-        # Clear redo stacks khi có nước đi mới
-        self.redo_board_history.clear()
-        self.redo_player_history.clear()
-        self.redo_captured_pieces.clear()
-        self.redo_move_history.clear()
-
-        # Lưu trạng thái hiện tại để undo
-        self.board_history.append([row[:]
-                                  for row in self.board])  # Deep copy board
-        self.player_history.append(self.current_player)
-
-        # Lưu quân bị bắt
-        captured_piece = self.board[to_row][to_col]
-        self.captured_pieces.append(captured_piece)
-
-        # Thực hiện nước đi
-        piece = self.board[from_row][from_col]
-        self.board[to_row][to_col] = piece
-        self.board[from_row][from_col] = None
-
-        # Chuyển lượt
+        # Thực hiện nước đi và ghi vào move log (cắt bỏ nhánh redo cũ)
         old_player = self.current_player
-        self.current_player = 'black' if self.current_player == 'red' else 'red'
-        self.active_color = 'b' if self.active_color == 'w' else 'w'
-
-        print(
+        from_sq = square_index(from_row, from_col)
+        to_sq = square_index(to_row, to_col)
+        piece = self.position.squares[from_sq]
+        captured = self.position.apply((from_sq, to_sq))
+        flags = self._move_flags(to_sq)
+        self.move_log.append(self.position, from_sq, to_sq, piece, captured, flags)
+        self._record_move(old_player, captured, flags)
+
+        self._log(
             f"🔄 DEBUG: make_move() - Switch turn: {old_player} → {self.current_player}")
 
-        # Update move history
-        move_notation = f"{chr(ord('a') + from_col)}{from_row}{chr(ord('a') + to_col)}{to_row}"
-        self.move_history.append(move_notation)
+        move_notation = self._move_notation(from_sq, to_sq)
 
-        print(f"✓ GameState: Thực hiện nước đi {move_notation}")
+        self._log(f"✓ GameState: Thực hiện nước đi {move_notation}")
 
         # Kiểm tra game over sau nước đi
         self._check_game_over()
 
         return True
 
+    def push(self, move):
+        """
+        Thực hiện nước đi trực tiếp trên position (không validate)
+
+        Chỉ lưu (from, to, quân bị bắt, lượt cũ) vào undo stack nên có thể
+        dùng cho cả history lẫn các phép thử hợp lệ mà không copy board.
+
+        Args:
+            move: Tuple (from_row, from_col, to_row, to_col)
+
+        Returns:
+            Quân bị bắt hoặc None
+        """
+        from_row, from_col, to_row, to_col = move
+        captured = self.position.push(
+            (square_index(from_row, from_col), square_index(to_row, to_col)))
+        return CODE_TO_PIECE[captured]
+
+    def _move_flags(self, to_sq):
+        """Cờ chiếu/đuổi của nước vừa đi tới to_sq (tính trên position sau nước đi)"""
+        flags = 0
+        if self.is_in_check(self.current_player):
+            flags |= FLAG_CHECK
+        if self.position.chased_pieces(to_sq):
+            flags |= FLAG_CHASE
+        return flags
+
+    def _record_move(self, mover, captured, flags):
+        """
+        Cập nhật đồng hồ nước đi và chỉ mục lặp sau khi đi 1 nước của history
+
+        Args:
+            mover: Bên vừa đi
+            captured: Mã quân bị bắt (EMPTY nếu không bắt)
+            flags: FLAG_CHECK / FLAG_CHASE của nước đi
+        """
+        if captured:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if mover == 'black':
+            self.fullmove_number += 1
+
+        self.repetition.push(self.zobrist_key, mover, bool(flags & FLAG_CHECK),
+                             bool(flags & FLAG_CHASE), self.halfmove_clock)
+
+    def pop(self):
+        """
+        Hoàn tác nước đi cuối cùng đã push
+
+        Returns:
+            tuple: (from_row, from_col, to_row, to_col) của nước vừa hoàn tác
+        """
+        return self._to_board_move(self.position.pop())
+
+    @staticmethod
+    def _to_board_move(move):
+        """(from_sq, to_sq) -> (from_row, from_col, to_row, to_col)"""
+        return SQUARE_COORDS[move[0]] + SQUARE_COORDS[move[1]]
+
+    @staticmethod
+    def _move_notation(from_sq, to_sq):
+        """Ký hiệu nước đi theo board, vd. 'h7e7'"""
+        from_row, from_col = SQUARE_COORDS[from_sq]
+        to_row, to_col = SQUARE_COORDS[to_sq]
+        return f"{chr(ord('a') + from_col)}{from_row}{chr(ord('a') + to_col)}{to_row}"
+
+    @staticmethod
+    def _side_index(player):
+        """'red'/'black' -> RED/BLACK của Position"""
+        return BLACK if player == 'black' else RED
+
     def undo_move(self):
         """
         Hoàn tác nước đi cuối cùng
@@ -384,37 +368,30 @@ class GameState:
         Returns:
             bool: True nếu thành công
         """
-        if not self.board_history:
-            print("❌ Không có nước đi để hoàn tác")
+        if not self.move_log.can_undo():
+            self._log("❌ Không có nước đi để hoàn tác")
             return False
 
-        # Lưu trạng thái hiện tại vào redo stacks
-        self.redo_board_history.append([row[:] for row in self.board])
-        self.redo_player_history.append(self.current_player)
-        self.redo_captured_pieces.append(
-            self.captured_pieces[-1] if self.captured_pieces else None)
-        self.redo_move_history.append(
-            self.move_history[-1] if self.move_history else "unknown")
-
-        # Restore board state
-        self.board = self.board_history.pop()
+        # Restore board và lượt chơi từ delta của record cuối
+        from_sq, to_sq, _, captured, _ = self.move_log.undo()
+        self.position.unapply((from_sq, to_sq), captured)
+        self.halfmove_clock = self.repetition.pop()
+        if self.current_player == 'black':
+            self.fullmove_number = max(1, self.fullmove_number - 1)
 
-        # Restore player
-        self.current_player = self.player_history.pop()
-        self.active_color = 'w' if self.current_player == 'red' else 'b'
+        undone_move = self._move_notation(from_sq, to_sq)
 
-        # Remove captured piece từ history
-        self.captured_pieces.pop()
-
-        # Remove move từ history
-        undone_move = self.move_history.pop() if self.move_history else "unknown"
+        # Position trước đó chắc chắn chưa kết thúc
+        self.game_over = False
+        self.game_status = 'playing'
+        self.winner = None
 
-        print(f"✓ GameState: Hoàn tác nước đi {undone_move}")
+        self._log(f"✓ GameState: Hoàn tác nước đi {undone_move}")
         return True
 
     def can_undo(self):
         """Kiểm tra có thể undo không"""
-        return len(self.board_history) > 0
+        return self.move_log.can_undo()
 
     def redo_move(self):
         """
@@ -423,32 +400,131 @@ class GameState:
         Returns:
             bool: True nếu thành công
         """
-        if not self.redo_board_history:
-            print("❌ Không có nước đi để làm lại")
+        if not self.move_log.can_redo():
+            self._log("❌ Không có nước đi để làm lại")
             return False
 
-        # Lưu trạng thái hiện tại vào undo stacks
-        self.board_history.append([row[:] for row in self.board])
-        self.player_history.append(self.current_player)
-
-        # Restore từ redo stacks
-        self.board = self.redo_board_history.pop()
-        self.current_player = self.redo_player_history.pop()
-        self.active_color = 'w' if self.current_player == 'red' else 'b'
+        from_sq, to_sq, _, _, flags = self.move_log.redo()
+        mover = self.current_player
+        captured = self.position.apply((from_sq, to_sq))
+        self._record_move(mover, captured, flags)
+        redone_move = self._move_notation(from_sq, to_sq)
 
-        # Restore captured piece và move
-        captured_piece = self.redo_captured_pieces.pop()
-        redone_move = self.redo_move_history.pop()
+        self._log(f"✓ GameState: Làm lại nước đi {redone_move}")
 
-        self.captured_pieces.append(captured_piece)
-        self.move_history.append(redone_move)
-
-        print(f"✓ GameState: Làm lại nước đi {redone_move}")
+        # Cập nhật lại trạng thái kết thúc cho position sau redo
+        self._check_game_over()
         return True
 
     def can_redo(self):
         """Kiểm tra có thể redo không"""
-        return len(self.redo_board_history) > 0
+        return self.move_log.can_redo()
+
+    @property
+    def current_ply(self):
+        """Số nửa nước đã đi tính từ position gốc của history"""
+        return self.move_log.ply
+
+    @property
+    def total_plies(self):
+        """Tổng số nửa nước trong history (gồm cả các nước có thể redo)"""
+        return len(self.move_log.records)
+
+    def goto_ply(self, ply):
+        """
+        Nhảy tới position sau ply nửa nước của history (0 = position gốc)
+
+        Các nước phía sau được giữ lại để redo/nhảy tiếp. Nhảy gần áp dụng
+        từng delta, nhảy xa dựng lại từ checkpoint gần nhất của move log.
+
+        Args:
+            ply: 0..total_plies
+
+        Returns:
+            bool: True nếu thành công
+        """
+        log = self.move_log
+        if not 0 <= ply <= len(log.records):
+            self._log(f"❌ Ply {ply} ngoài lịch sử (0..{len(log.records)})")
+            return False
+
+        current = log.ply
+        if ply == current:
+            return True
+
+        # Chỉ mục lặp: lùi thì cắt bớt, tiến thì tính khóa từ record
+        if ply < current:
+            self.repetition.truncate(ply)
+        else:
+            key = self.position.key
+            halfmove_clock = self.repetition.halfmove_clock
+            for index in range(current, ply):
+                from_sq, to_sq, piece, captured, flags = log.record(index)
+                piece_keys = PIECE_SQUARE_KEYS[piece]
+                key ^= piece_keys[from_sq] ^ piece_keys[to_sq] ^ SIDE_KEY
+                if captured:
+                    key ^= PIECE_SQUARE_KEYS[captured][to_sq]
+                    halfmove_clock = 0
+                else:
+                    halfmove_clock += 1
+                self.repetition.push(key, SIDE_NAMES[piece >> 3],
+                                     bool(flags & FLAG_CHECK),
+                                     bool(flags & FLAG_CHASE), halfmove_clock)
+
+        # Bàn cờ
+        if abs(ply - current) > CHECKPOINT_INTERVAL:
+            self.position.load_snapshot(log.position_at(ply).snapshot())
+        elif ply < current:
+            for index in range(current - 1, ply - 1, -1):
+                from_sq, to_sq, _, captured, _ = log.record(index)
+                self.position.unapply((from_sq, to_sq), captured)
+        else:
+            for index in range(current, ply):
+                from_sq, to_sq, _, _, _ = log.record(index)
+                self.position.apply((from_sq, to_sq))
+        log.seek(ply)
+
+        self.halfmove_clock = self.repetition.halfmove_clock
+        root_black = log.checkpoints[0][-1] == BLACK
+        self.fullmove_number = self._root_fullmove_number + (ply + root_black) // 2
+
+        self._log(f"✓ GameState: Nhảy tới ply {ply}/{len(log.records)}")
+        self._check_game_over()
+        return True
+
+    def get_ply_pieces(self, ply):
+        """
+        Quân đã đi và quân bị bắt ở nửa nước thứ ply (0-based), tra O(1)
+
+        Returns:
+            tuple: (quân đi, quân bị bắt hoặc None)
+        """
+        _, _, piece, captured, _ = self.move_log.record(ply)
+        return CODE_TO_PIECE[piece], CODE_TO_PIECE[captured]
+
+    def get_move_table(self, include_redo=False):
+        """
+        Bảng nước đi theo ply
+
+        Args:
+            include_redo: Gồm cả các nước phía sau ply hiện tại
+
+        Returns:
+            list: Mỗi phần tử (from_row, from_col, to_row, to_col, quân đi,
+                  quân bị bắt hoặc None)
+        """
+        end = len(self.move_log.records) if include_redo else None
+        return [SQUARE_COORDS[from_sq] + SQUARE_COORDS[to_sq]
+                + (CODE_TO_PIECE[piece], CODE_TO_PIECE[captured])
+                for from_sq, to_sq, piece, captured, _
+                in self.move_log.iter_records(end)]
+
+    def clear_history(self):
+        """Xóa lịch sử nước đi và redo (giữ nguyên position hiện tại)"""
+        self.position.undo_stack.clear()
+        self.move_log.reset(self.position)
+        self._root_fullmove_number = self.fullmove_number
+        self.repetition.reset(self.zobrist_key, self.halfmove_clock)
 
     def get_possible_moves(self, pos):
         """
@@ -465,13 +541,106 @@ class GameState:
         if not self._is_valid_coords(row, col):
             return []
 
-        piece = self.board[row][col]
-        if piece is None:
+        return [self._coords_to_pos(to_row, to_col)
+                for to_row, to_col in self.get_legal_moves_from(row, col)]
+
+    def get_legal_moves_from(self, row, col):
+        """
+        Lấy các ô đích hợp lệ của quân tại (row, col)
+
+        Args:
+            row, col: Vị trí quân cờ
+
+        Returns:
+            list: Danh sách (to_row, to_col) đã lọc luật chiếu tướng
+        """
+        position = self.position
+        sq = square_index(row, col)
+        code = position.squares[sq]
+        if not code:
             return []
 
-        # TODO: Implement logic cho từng loại quân cờ
-        # Hiện tại return empty list
-        return []
+        side = code >> 3
+        moves = []
+        position.piece_moves(sq, moves)
+        return [SQUARE_COORDS[move[1]] for move in moves
+                if position.is_legal(move, side)]
+
+    def generate_pseudo_legal_moves(self, player=None):
+        """
+        Sinh tất cả nước đi theo luật di chuyển (chưa kiểm tra chiếu tướng)
+
+        Args:
+            player: "red" hoặc "black", None để dùng current_player
+
+        Returns:
+            list: Danh sách tuple (from_row, from_col, to_row, to_col)
+        """
+        if player is None:
+            player = self.current_player
+
+        moves = self.position.pseudo_legal_moves(self._side_index(player))
+        return [self._to_board_move(move) for move in moves]
+
+    def generate_legal_moves(self, player=None):
+        """
+        Sinh tất cả nước đi hợp lệ (không để tướng bị chiếu/đối mặt)
+
+        Args:
+            player: "red" hoặc "black", None để dùng current_player
+
+        Returns:
+            list: Danh sách tuple (from_row, from_col, to_row, to_col)
+        """
+        if player is None:
+            player = self.current_player
+
+        return [self._to_board_move(move) for move in
+                self.position.iter_legal_moves(self._side_index(player))]
+
+    def generate_evasions(self, player=None):
+        """
+        Sinh các nước thoát chiếu: bắt quân chiếu, cản (chặn đường/chân mã,
+        kê thêm ngòi pháo, rút ngòi pháo) hoặc di chuyển tướng
+
+        Args:
+            player: "red" hoặc "black", None để dùng current_player
+
+        Returns:
+            list: Danh sách nước đi hợp lệ (bằng generate_legal_moves nếu
+                  không bị chiếu)
+        """
+        # Position.iter_legal_moves đã chỉ đi thử các nước giải chiếu
+        return self.generate_legal_moves(player)
+
+    def has_legal_move(self, player=None):
+        """
+        Kiểm tra player còn ít nhất 1 nước đi hợp lệ (dừng ngay khi tìm thấy)
+
+        Args:
+            player: "red" hoặc "black", None để dùng current_player
+
+        Returns:
+            bool: True nếu còn nước đi
+        """
+        if player is None:
+            player = self.current_player
+
+        return self.position.has_legal_move(self._side_index(player))
+
+    def _is_legal_for_player(self, move, player):
+        """
+        Kiểm tra nước đi (đã đúng luật di chuyển) không để tướng của player
+        bị chiếu hoặc đối mặt tướng địch
+        """
+        from_row, from_col, to_row, to_col = move
+        return self.position.is_legal(
+            (square_index(from_row, from_col), square_index(to_row, to_col)),
+            self._side_index(player))
+
+    def _kings_facing(self):
+        """Kiểm tra 2 tướng có đối mặt trên cùng cột mà không có quân chặn"""
+        return self.position.kings_facing()
 
     def _pos_to_coords(self, pos):
         """Chuyển đổi position string thành coordinates"""
@@ -491,17 +660,55 @@ class GameState:
         """Kiểm tra game đã kết thúc chưa"""
         current = self.current_player
 
-        if self.is_checkmate(current):
+        # Mỗi thứ chỉ tính 1 lần: chiếu + còn nước đi (dừng sớm)
+        in_check = self.is_in_check(current)
+        has_move = self.has_legal_move(current)
+
+        if in_check and not has_move:
+            winner = 'black' if current == 'red' else 'red'
+            self.game_over = True
+            self.game_status = 'checkmate'
+            self.winner = winner
+            self._log(f"🏆 {winner.upper()} thắng! {current.upper()} bị chiếu bí")
+            return True
+
+        if not has_move:
+            # Cờ tướng: bên hết nước đi (không bị chiếu) cũng thua
             winner = 'black' if current == 'red' else 'red'
-            print(f"🏆 {winner.upper()} thắng! {current.upper()} bị chiếu bí")
+            self.game_over = True
+            self.game_status = 'no_move'
+            self.winner = winner
+            self._log(f"🏆 {winner.upper()} thắng! {current.upper()} hết nước đi")
+            return True
+
+        # Tra chỉ mục lặp (O(1) nếu position chưa lặp đủ số lần)
+        repetition = self.repetition.outcome()
+        if repetition is not None:
+            loser = repetition['loser']
+            self.game_over = True
+            self.game_status = repetition['result']
+            if loser is not None:
+                self.winner = 'black' if loser == 'red' else 'red'
+                rule = 'chiếu dai' if repetition['result'] == PERPETUAL_CHECK else 'đuổi dai'
+                self._log(f"🏆 {self.winner.upper()} thắng! {loser.upper()} phạm luật {rule}")
+            else:
+                self.winner = None
+                self._log("🤝 Hòa cờ! Position lặp lại 3 lần")
             return True
 
-        if self.is_stalemate(current):
-            print("🤝 Hòa cờ! Không có nước đi hợp lệ")
+        if self.halfmove_clock >= NO_CAPTURE_DRAW_PLIES:
+            self.game_over = True
+            self.game_status = 'draw'
+            self.winner = None
+            self._log(f"🤝 Hòa cờ! {NO_CAPTURE_DRAW_PLIES // 2} nước không bắt quân")
             return True
 
-        if self.is_in_check(current):
-            print(f"⚠️  {current.upper()} đang bị chiếu!")
+        self.game_over = False
+        self.game_status = 'playing'
+        self.winner = None
+
+        if in_check:
+            self._log(f"⚠️  {current.upper()} đang bị chiếu!")
 
         return False
 
@@ -518,41 +725,22 @@ class GameState:
         if player is None:
             player = self.current_player
 
-        # Tìm vua của player
-        king_piece = 'K' if player == 'red' else 'k'
-        king_pos = None
-
-        for row in range(10):
-            for col in range(9):
-                if self.board[row][col] == king_piece:
-                    king_pos = (row, col)
-                    break
-
-        if not king_pos:
-            return False  # Không tìm thấy vua
-
-        # Kiểm tra có quân đối phương nào có thể tấn công vua không
-        opponent_player = 'black' if player == 'red' else 'red'
+        # Tra vị trí tướng từ cache rồi nhìn ngược ra từ ô tướng
+        return self.position.is_in_check(self._side_index(player))
 
-        for row in range(10):
-            for col in range(9):
-                enemy_piece = self.board[row][col]
-                if enemy_piece and self._is_player_piece(enemy_piece, opponent_player):
-                    # Tạm thời set current_player để kiểm tra
-                    old_player = self.current_player
-                    self.current_player = opponent_player
-
-                    # Kiểm tra quân địch có thể tấn công vua không
-                    can_attack = self._is_valid_piece_move(
-                        enemy_piece, row, col, king_pos[0], king_pos[1])
-
-                    # Restore
-                    self.current_player = old_player
+    def get_attackers(self, row, col, attacker):
+        """
+        Lấy danh sách quân của attacker đang tấn công ô (row, col)
 
-                    if can_attack:
-                        return True  # Bị chiếu
+        Args:
+            row, col: Ô bị tấn công
+            attacker: 'red' hoặc 'black'
 
-        return False  # Không bị chiếu
+        Returns:
+            list: Danh sách (row, col) của các quân tấn công
+        """
+        return [SQUARE_COORDS[sq] for sq in self.position.attackers(
+            square_index(row, col), self._side_index(attacker))]
 
     def get_board_copy(self):
         """Lấy copy của board hiện tại"""
@@ -594,16 +782,21 @@ class GameState:
                 elif self.active_color == 'b':
                     self.current_player = 'black'  # Black = Black
 
+            if len(parts) >= 5 and parts[4].isdigit():
+                self.halfmove_clock = int(parts[4])
             if len(parts) >= 6:
                 self.fullmove_number = int(parts[5])
 
-            print(f"✓ Load FEN thành công: {fen_string[:50]}...")
-            print(
+            # Lịch sử nước đi và lặp bắt đầu lại từ position vừa load
+            self.clear_history()
+
+            self._log(f"✓ Load FEN thành công: {fen_string[:50]}...")
+            self._log(
                 f"✓ Active color: {self.active_color} → Current player: {self.current_player}")
             return True
 
         except Exception as e:
-            print(f"❌ Lỗi parse FEN: {e}")
+            self._log(f"❌ Lỗi parse FEN: {e}")
             return False
 
     def _parse_board_from_fen(self, board_fen):
@@ -622,7 +815,7 @@ class GameState:
 
             ranks = board_fen.split('/')
             if len(ranks) != 10:  # Xiangqi có 10 hàng
-                print(f"❌ FEN sai: cần 10 ranks, có {len(ranks)}")
+                self._log(f"❌ FEN sai: cần 10 ranks, có {len(ranks)}")
                 return None
 
             for rank_idx, rank in enumerate(ranks):
@@ -634,21 +827,21 @@ class GameState:
                     else:
                         # Quân cờ
                         if col_idx >= 9:  # Xiangqi có 9 cột
-                            print(
+                            self._log(
                                 f"❌ FEN sai: quá nhiều pieces ở rank {rank_idx}")
                             return None
                         board[rank_idx][col_idx] = char
                         col_idx += 1
 
                 if col_idx != 9:
-                    print(
+                    self._log(
                         f"❌ FEN sai: rank {rank_idx} có {col_idx} columns thay vì 9")
                     return None
 
             return board
 
         except Exception as e:
-            print(f"❌ Lỗi parse board FEN: {e}")
+            self._log(f"❌ Lỗi parse board FEN: {e}")
             return None
 
     def _create_initial_board(self):
@@ -668,175 +861,34 @@ class GameState:
 
         return board
 
-    def _is_in_palace(self, row, col):
-        """Kiểm tra vị trí có trong cung không"""
-        # Red palace: rows 7-9, cols 3-5
-        # Black palace: rows 0-2, cols 3-5
-        return (3 <= col <= 5) and ((0 <= row <= 2) or (7 <= row <= 9))
-
-    def _is_same_side_of_river(self, from_row, to_row):
-        """Kiểm tra có cùng bên sông không (cho tượng/voi)"""
-        # River is between rows 4 and 5
-        return (from_row <= 4 and to_row <= 4) or (from_row >= 5 and to_row >= 5)
-
-    def _has_crossed_river(self, row, is_red):
-        """Kiểm tra tốt/binh đã qua sông chưa"""
-        if is_red:
-            return row <= 4  # Red crosses at row 4
-        else:
-            return row >= 5  # Black crosses at row 5
-
-    def _is_path_clear(self, from_row, from_col, to_row, to_col):
-        """Kiểm tra đường đi có trống không (cho xe)"""
-        if from_row == to_row:  # Horizontal move
-            start_col = min(from_col, to_col) + 1
-            end_col = max(from_col, to_col)
-            for col in range(start_col, end_col):
-                if self.board[from_row][col] is not None:
-                    return False
-        else:  # Vertical move
-            start_row = min(from_row, to_row) + 1
-            end_row = max(from_row, to_row)
-            for row in range(start_row, end_row):
-                if self.board[row][from_col] is not None:
-                    return False
-        return True
-
-    def _count_pieces_between(self, from_row, from_col, to_row, to_col):
-        """Đếm số quân cờ giữa 2 vị trí (cho pháo)"""
-        count = 0
-        if from_row == to_row:  # Horizontal
-            start_col = min(from_col, to_col) + 1
-            end_col = max(from_col, to_col)
-            for col in range(start_col, end_col):
-                if self.board[from_row][col] is not None:
-                    count += 1
-        else:  # Vertical
-            start_row = min(from_row, to_row) + 1
-            end_row = max(from_row, to_row)
-            for row in range(start_row, end_row):
-                if self.board[row][from_col] is not None:
-                    count += 1
-        return count
-
     def _check_flying_general_rule(self, from_row, from_col, to_row, to_col):
-        """Kiểm tra luật tướng đối tướng"""
-        # Tạo board tạm thời sau nước đi
-        temp_board = [row[:] for row in self.board]
-        temp_board[to_row][to_col] = temp_board[from_row][from_col]
-        temp_board[from_row][from_col] = None
-
-        # Tìm vị trí 2 vua
-        red_king_pos = None
-        black_king_pos = None
-
-        for row in range(10):
-            for col in range(9):
-                piece = temp_board[row][col]
-                if piece == 'K':
-                    red_king_pos = (row, col)
-                elif piece == 'k':
-                    black_king_pos = (row, col)
-
-        if not red_king_pos or not black_king_pos:
-            # Không tìm thấy vua (không bình thường nhưng không block move)
-            return True
-
-        # Kiểm tra có cùng cột và không có quân nào chặn giữa
-        if red_king_pos[1] == black_king_pos[1]:  # Same column
-            start_row = min(red_king_pos[0], black_king_pos[0]) + 1
-            end_row = max(red_king_pos[0], black_king_pos[0])
-            for row in range(start_row, end_row):
-                if temp_board[row][red_king_pos[1]] is not None:
-                    return True  # Có quân chặn giữa, OK
-            return False  # Không có quân chặn, vi phạm luật
-
-        return True  # Không cùng cột, OK
+        """Kiểm tra luật tướng đối tướng (True nếu nước đi không vi phạm)"""
+        return not self._would_violate_flying_general_after_move(
+            from_row, from_col, to_row, to_col)
 
     def _would_be_in_check_after_move(self, from_row, from_col, to_row, to_col):
         """Kiểm tra sau nước đi có bị chiếu không"""
-        # Tạo board tạm thời
-        temp_board = [row[:] for row in self.board]
-        piece = temp_board[from_row][from_col]
-        temp_board[to_row][to_col] = piece
-        temp_board[from_row][from_col] = None
-
-        # Tìm vua của mình
-        king_piece = 'K' if self.current_player == 'red' else 'k'
-        king_pos = None
-
-        for row in range(10):
-            for col in range(9):
-                if temp_board[row][col] == king_piece:
-                    king_pos = (row, col)
-                    break
-
-        if not king_pos:
-            print(f"⚠️ Không tìm thấy vua {king_piece} trên bàn cờ")
-            return False  # Không tìm thấy vua
-
-        # Kiểm tra có quân đối phương nào có thể tấn công vua không
-        opponent_player = 'black' if self.current_player == 'red' else 'red'
-
-        for row in range(10):
-            for col in range(9):
-                enemy_piece = temp_board[row][col]
-                if enemy_piece and self._is_player_piece(enemy_piece, opponent_player):
-                    # Tạm thời set board để kiểm tra
-                    old_board = self.board
-                    self.board = temp_board
-                    old_player = self.current_player
-                    self.current_player = opponent_player
-
-                    # Kiểm tra quân địch có thể tấn công vua không
-                    can_attack = self._is_valid_piece_move(
-                        enemy_piece, row, col, king_pos[0], king_pos[1])
-
-                    # Restore
-                    self.board = old_board
-                    self.current_player = old_player
-
-                    if can_attack:
-                        print(
-                            f"🚨 Nước đi từ ({from_row},{from_col}) đến ({to_row},{to_col}) sẽ để {king_piece} tại {king_pos} bị chiếu bởi {enemy_piece} tại ({row},{col})")
-                        return True  # Bị chiếu
-
-        return False  # Không bị chiếu
+        player = self.current_player
 
-    def _would_violate_flying_general_after_move(self, from_row, from_col, to_row, to_col):
-        """Kiểm tra sau nước đi có vi phạm quy tắc tướng đối mặt không"""
-        # Tạo board tạm thời
-        temp_board = [row[:] for row in self.board]
-        piece = temp_board[from_row][from_col]
-        temp_board[to_row][to_col] = piece
-        temp_board[from_row][from_col] = None
-
-        # Tìm vị trí 2 vua
-        red_king_pos = None
-        black_king_pos = None
-
-        for row in range(10):
-            for col in range(9):
-                piece = temp_board[row][col]
-                if piece == 'K':
-                    red_king_pos = (row, col)
-                elif piece == 'k':
-                    black_king_pos = (row, col)
-
-        if not red_king_pos or not black_king_pos:
-            # Không tìm thấy vua (không bình thường nhưng không block move)
-            return False
+        # Đi thử trên board rồi pop lại, không copy board
+        self.push((from_row, from_col, to_row, to_col))
+        try:
+            in_check = self.is_in_check(player)
+        finally:
+            self.pop()
 
-        # Kiểm tra có cùng cột và không có quân nào chặn giữa
-        if red_king_pos[1] == black_king_pos[1]:  # Same column
-            start_row = min(red_king_pos[0], black_king_pos[0]) + 1
-            end_row = max(red_king_pos[0], black_king_pos[0])
-            for row in range(start_row, end_row):
-                if temp_board[row][red_king_pos[1]] is not None:
-                    return False  # Có quân chặn giữa, OK
-            return True  # Không có quân chặn, vi phạm luật tướng đối mặt
+        if in_check:
+            self._log(
+                f"🚨 Nước đi từ ({from_row},{from_col}) đến ({to_row},{to_col}) sẽ để tướng {player} bị chiếu")
+        return in_check
 
-        return False  # Không cùng cột, OK
+    def _would_violate_flying_general_after_move(self, from_row, from_col, to_row, to_col):
+        """Kiểm tra sau nước đi có vi phạm quy tắc tướng đối mặt không"""
+        self.push((from_row, from_col, to_row, to_col))
+        try:
+            return self._kings_facing()
+        finally:
+            self.pop()
 
     def is_checkmate(self, player=None):
         """
@@ -855,41 +907,18 @@ class GameState:
         if not self.is_in_check(player):
             return False
 
-        # Thử tất cả nước đi có thể của player
-        for from_row in range(10):
-            for from_col in range(9):
-                piece = self.board[from_row][from_col]
-                if piece and self._is_player_piece(piece, player):
-                    # Thử tất cả vị trí có thể đi đến
-                    for to_row in range(10):
-                        for to_col in range(9):
-                            # Kiểm tra nước đi có hợp lệ không
-                            if self.is_valid_move(from_row, from_col, to_row, to_col):
-                                # Thử nước đi tạm thời
-                                temp_board = [row[:] for row in self.board]
-                                temp_board[to_row][to_col] = temp_board[from_row][from_col]
-                                temp_board[from_row][from_col] = None
-
-                                # Kiểm tra sau nước đi có còn bị chiếu không
-                                old_board = self.board
-                                self.board = temp_board
-                                still_in_check = self.is_in_check(player)
-                                self.board = old_board
-
-                                if not still_in_check:
-                                    return False  # Có nước đi thoát được, không phải checkmate
-
-        return True  # Không có nước đi nào thoát được, checkmate
+        # Chỉ thử các nước giải chiếu, dừng ngay khi có 1 nước thoát được
+        return not self.has_legal_move(player)
 
     def is_stalemate(self, player=None):
         """
-        Kiểm tra có bị hòa cờ (stalemate) không
+        Kiểm tra hết nước đi mà không bị chiếu (cờ tướng: bên đó thua, không hòa)
 
         Args:
             player: "red" hoặc "black", None để dùng current_player
 
         Returns:
-            bool: True nếu bị stalemate
+            bool: True nếu hết nước đi
         """
         if player is None:
             player = self.current_player
@@ -898,16 +927,4 @@ class GameState:
         if self.is_in_check(player):
             return False
 
-        # Thử tất cả nước đi có thể của player
-        for from_row in range(10):
-            for from_col in range(9):
-                piece = self.board[from_row][from_col]
-                if piece and self._is_player_piece(piece, player):
-                    # Thử tất cả vị trí có thể đi đến
-                    for to_row in range(10):
-                        for to_col in range(9):
-                            # Kiểm tra nước đi có hợp lệ không
-                            if self.is_valid_move(from_row, from_col, to_row, to_col):
-                                return False  # Có nước đi hợp lệ, không phải stalemate
-
-        return True  # Không có nước đi hợp lệ nào, stalemate
+        return not self.has_legal_move(player)
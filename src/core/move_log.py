@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Move Log cho Xiangqi
+Lịch sử nước đi dạng delta: mỗi nửa nước là 1 số 32-bit trong array('I'),
+kèm checkpoint định kỳ để dựng lại position ở ply bất kỳ
+"""
+
+from array import array
+
+from .position import Position
+
+# Cứ mỗi CHECKPOINT_INTERVAL ply lưu 1 bản chụp position (91 byte)
+CHECKPOINT_INTERVAL = 16
+
+# Bố cục record: from_sq | to_sq << 7 | piece << 14 | captured << 18 | flags << 22
+_SQUARE_MASK = 0x7F
+_CODE_MASK = 0xF
+
+# Cờ của nửa nước
+FLAG_CHECK = 1  # Nước đi chiếu tướng
+FLAG_CHASE = 2  # Nước đi đuổi bắt quân
+
+
+def pack_record(from_sq, to_sq, piece, captured, flags=0):
+    """Đóng gói 1 nửa nước thành số nguyên 24 bit"""
+    return from_sq | (to_sq << 7) | (piece << 14) | (captured << 18) | (flags << 22)
+
+
+def unpack_record(record):
+    """
+    Returns:
+        tuple: (from_sq, to_sq, piece, captured, flags) - piece/captured là
+               mã quân của Position (captured = EMPTY nếu không bắt quân)
+    """
+    return (record & _SQUARE_MASK, (record >> 7) & _SQUARE_MASK,
+            (record >> 14) & _CODE_MASK, (record >> 18) & _CODE_MASK,
+            record >> 22)
+
+
+class MoveLog:
+    """
+    Log nước đi có con trỏ ply
+
+    records chứa cả các nước đã hoàn tác phía sau con trỏ để redo; đi nước
+    mới sẽ cắt bỏ phần đó. Undo/redo chỉ áp dụng delta của 1 record.
+    """
+
+    def __init__(self, root=None):
+        """
+        Args:
+            root: Position gốc (ply 0), None để dùng bàn trống
+        """
+        self.reset(root if root is not None else Position())
+
+    def reset(self, root):
+        """Bắt đầu log mới từ Position root"""
+        self.records = array('I')
+        self.ply = 0
+        self.checkpoints = {0: root.snapshot()}
+
+    def __len__(self):
+        """Số nửa nước tới con trỏ hiện tại"""
+        return self.ply
+
+    def can_undo(self):
+        return self.ply > 0
+
+    def can_redo(self):
+        return self.ply < len(self.records)
+
+    def append(self, position, from_sq, to_sq, piece, captured, flags=0):
+        """
+        Ghi nước vừa apply lên position tại con trỏ (cắt bỏ nhánh redo)
+
+        Args:
+            position: Position SAU nước đi (để lưu checkpoint khi tới kỳ)
+            flags: FLAG_CHECK / FLAG_CHASE của nước đi
+        """
+        if self.ply < len(self.records):
+            del self.records[self.ply:]
+            for ply in [ply for ply in self.checkpoints if ply > self.ply]:
+                del self.checkpoints[ply]
+
+        self.records.append(pack_record(from_sq, to_sq, piece, captured, flags))
+        self.ply += 1
+        if self.ply % CHECKPOINT_INTERVAL == 0:
+            self.checkpoints[self.ply] = position.snapshot()
+
+    def undo(self):
+        """Lùi con trỏ 1 ply, trả về record (đã unpack) cần hoàn tác"""
+        self.ply -= 1
+        return unpack_record(self.records[self.ply])
+
+    def redo(self):
+        """Tiến con trỏ 1 ply, trả về record (đã unpack) cần áp dụng lại"""
+        record = unpack_record(self.records[self.ply])
+        self.ply += 1
+        return record
+
+    def seek(self, ply):
+        """Đặt con trỏ tới ply (0..len(records)), không đụng tới position"""
+        if not 0 <= ply <= len(self.records):
+            raise IndexError(f"ply {ply} ngoài log (0..{len(self.records)})")
+        self.ply = ply
+
+    def record(self, ply):
+        """Record (đã unpack) của nửa nước thứ ply (0-based)"""
+        return unpack_record(self.records[ply])
+
+    def iter_records(self, end=None):
+        """Duyệt các record (đã unpack) từ ply 0 tới end (mặc định con trỏ)"""
+        if end is None:
+            end = self.ply
+        for ply in range(end):
+            yield unpack_record(self.records[ply])
+
+    def position_at(self, ply):
+        """
+        Dựng Position sau ply nửa nước (0 <= ply <= len(records))
+
+        Bắt đầu từ checkpoint gần nhất phía trước rồi áp dụng tối đa
+        CHECKPOINT_INTERVAL - 1 record.
+        """
+        if not 0 <= ply <= len(self.records):
+            raise IndexError(f"ply {ply} ngoài log (0..{len(self.records)})")
+
+        start = ply - ply % CHECKPOINT_INTERVAL
+        while start not in self.checkpoints:
+            start -= CHECKPOINT_INTERVAL
+
+        position = Position.from_snapshot(self.checkpoints[start])
+        for index in range(start, ply):
+            record = self.records[index]
+            position.apply((record & _SQUARE_MASK, (record >> 7) & _SQUARE_MASK))
+        return position
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Move Tables cho Xiangqi
+Bảng nước đi tính sẵn cho từng ô (cung, mắt tượng, chân mã, tia xe/pháo)
+"""
+
+from ..utils.constants import BOARD_WIDTH, BOARD_HEIGHT
+
+# 4 hướng đi thẳng: lên, xuống, trái, phải
+ORTHOGONAL_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+# 4 hướng chéo
+DIAGONAL_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+# Mã: (bước hàng, bước cột, chân hàng, chân cột) - chân nằm cạnh ô xuất phát
+HORSE_OFFSETS = (
+    (-2, -1, -1, 0), (-2, 1, -1, 0),
+    (2, -1, 1, 0), (2, 1, 1, 0),
+    (-1, -2, 0, -1), (1, -2, 0, -1),
+    (-1, 2, 0, 1), (1, 2, 0, 1),
+)
+
+
+def is_on_board(row, col):
+    """Kiểm tra ô có nằm trong bàn cờ không"""
+    return 0 <= row < BOARD_HEIGHT and 0 <= col < BOARD_WIDTH
+
+
+def is_in_palace(row, col):
+    """Kiểm tra ô có nằm trong cung (của bất kỳ bên nào) không"""
+    return (3 <= col <= 5) and ((0 <= row <= 2) or (7 <= row <= 9))
+
+
+def _same_side_of_river(from_row, to_row):
+    """Tượng không được qua sông (sông nằm giữa hàng 4 và 5)"""
+    return (from_row <= 4) == (to_row <= 4)
+
+
+def _build_table(builder):
+    """Tạo bảng [row][col] -> tuple các nước đi"""
+    return tuple(
+        tuple(tuple(builder(row, col)) for col in range(BOARD_WIDTH))
+        for row in range(BOARD_HEIGHT))
+
+
+def _king_steps(row, col):
+    if not is_in_palace(row, col):
+        return []
+    return [(row + dr, col + dc) for dr, dc in ORTHOGONAL_DIRECTIONS
+            if is_in_palace(row + dr, col + dc)]
+
+
+def _advisor_steps(row, col):
+    if not is_in_palace(row, col):
+        return []
+    return [(row + dr, col + dc) for dr, dc in DIAGONAL_DIRECTIONS
+            if is_in_palace(row + dr, col + dc)]
+
+
+def _elephant_hops(row, col):
+    hops = []
+    for dr, dc in DIAGONAL_DIRECTIONS:
+        to_row, to_col = row + 2 * dr, col + 2 * dc
+        if is_on_board(to_row, to_col) and _same_side_of_river(row, to_row):
+            hops.append((to_row, to_col, row + dr, col + dc))
+    return hops
+
+
+def _horse_hops(row, col):
+    hops = []
+    for dr, dc, leg_dr, leg_dc in HORSE_OFFSETS:
+        to_row, to_col = row + dr, col + dc
+        if is_on_board(to_row, to_col):
+            hops.append((to_row, to_col, row + leg_dr, col + leg_dc))
+    return hops
+
+
+def _rays(row, col):
+    rays = []
+    for dr, dc in ORTHOGONAL_DIRECTIONS:
+        ray = []
+        r, c = row + dr, col + dc
+        while is_on_board(r, c):
+            ray.append((r, c))
+            r, c = r + dr, c + dc
+        rays.append(tuple(ray))
+    return rays
+
+
+def _pawn_steps(is_red):
+    forward = -1 if is_red else 1
+
+    def builder(row, col):
+        steps = []
+        if is_on_board(row + forward, col):
+            steps.append((row + forward, col))
+        crossed = row <= 4 if is_red else row >= 5
+        if crossed:
+            for dc in (-1, 1):
+                if is_on_board(row, col + dc):
+                    steps.append((row, col + dc))
+        return steps
+
+    return builder
+
+
+# Tướng: 1 bước thẳng trong cung
+KING_STEPS = _build_table(_king_steps)
+
+# Sĩ: 1 bước chéo trong cung
+ADVISOR_STEPS = _build_table(_advisor_steps)
+
+# Tượng: (to_row, to_col, eye_row, eye_col), không qua sông
+ELEPHANT_HOPS = _build_table(_elephant_hops)
+
+# Mã: (to_row, to_col, leg_row, leg_col)
+HORSE_HOPS = _build_table(_horse_hops)
+
+# Xe/Pháo: 4 tia theo thứ tự ORTHOGONAL_DIRECTIONS, mỗi tia đi từ gần ra xa
+RAYS = _build_table(_rays)
+
+# Tốt: bước đi theo phe ('red' đi lên, 'black' đi xuống)
+PAWN_STEPS = {
+    'red': _build_table(_pawn_steps(True)),
+    'black': _build_table(_pawn_steps(False)),
+}
+
+
+def _horse_attackers(row, col):
+    # Mã đứng ở from tấn công (row, col) nếu chân (cạnh from) trống
+    attackers = []
+    for dr, dc, leg_dr, leg_dc in HORSE_OFFSETS:
+        from_row, from_col = row - dr, col - dc
+        if is_on_board(from_row, from_col):
+            attackers.append(
+                (from_row, from_col, from_row + leg_dr, from_col + leg_dc))
+    return attackers
+
+
+def _pawn_attackers(steps):
+    # Đảo ngược bảng PAWN_STEPS: ô nào có tốt thì đi tới được (row, col)
+    attackers = [[[] for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
+    for row in range(BOARD_HEIGHT):
+        for col in range(BOARD_WIDTH):
+            for to_row, to_col in steps[row][col]:
+                attackers[to_row][to_col].append((row, col))
+    return tuple(tuple(tuple(cell) for cell in board_row)
+                 for board_row in attackers)
+
+
+# Tra ngược cho kiểm tra chiếu: (from_row, from_col, leg_row, leg_col)
+HORSE_ATTACKERS = _build_table(_horse_attackers)
+
+# Tra ngược theo phe của tốt tấn công: PAWN_ATTACKERS[color][row][col]
+PAWN_ATTACKERS = {
+    'red': _pawn_attackers(PAWN_STEPS['red']),
+    'black': _pawn_attackers(PAWN_STEPS['black']),
+}
+
+
+# ---------------------------------------------------------------------------
+# Bảng theo chỉ số ô phẳng (sq = row * BOARD_WIDTH + col) cho Position
+# ---------------------------------------------------------------------------
+
+BOARD_SIZE = BOARD_WIDTH * BOARD_HEIGHT
+
+
+def square_index(row, col):
+    """Chỉ số ô phẳng 0..89 của (row, col)"""
+    return row * BOARD_WIDTH + col
+
+
+# SQUARE_COORDS[sq] -> (row, col)
+SQUARE_COORDS = tuple(divmod(sq, BOARD_WIDTH) for sq in range(BOARD_SIZE))
+
+
+def _flatten(table):
+    """Chuyển bảng [row][col] -> tuple các ô (row, col, ...) thành bảng [sq]
+    chứa tuple các chỉ số ô (mỗi cặp row, col thành 1 chỉ số)"""
+    def convert(entry):
+        indexes = tuple(square_index(entry[i], entry[i + 1])
+                        for i in range(0, len(entry), 2))
+        return indexes[0] if len(indexes) == 1 else indexes
+
+    return tuple(tuple(convert(entry) for entry in table[row][col])
+                 for row, col in SQUARE_COORDS)
+
+
+KING_STEPS_SQ = _flatten(KING_STEPS)
+ADVISOR_STEPS_SQ = _flatten(ADVISOR_STEPS)
+
+# (to_sq, eye_sq) / (to_sq, leg_sq) / (from_sq, leg_sq)
+ELEPHANT_HOPS_SQ = _flatten(ELEPHANT_HOPS)
+HORSE_HOPS_SQ = _flatten(HORSE_HOPS)
+HORSE_ATTACKERS_SQ = _flatten(HORSE_ATTACKERS)
+
+# RAYS_SQ[sq] -> 4 tuple chỉ số ô (2 tia đầu là hàng dọc)
+RAYS_SQ = tuple(tuple(tuple(square_index(row, col) for row, col in ray)
+                      for ray in RAYS[r][c])
+                for r, c in SQUARE_COORDS)
+
+# Theo chỉ số phe: 0 = Đỏ, 1 = Đen
+PAWN_STEPS_SQ = (_flatten(PAWN_STEPS['red']), _flatten(PAWN_STEPS['black']))
+PAWN_ATTACKERS_SQ = (_flatten(PAWN_ATTACKERS['red']),
+                     _flatten(PAWN_ATTACKERS['black']))
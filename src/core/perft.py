@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Perft cho Xiangqi
+Đếm số node cây nước đi theo độ sâu để kiểm tra bộ sinh nước đi
+
+Chạy trực tiếp:
+    python -m src.core.perft --depth 4
+    python -m src.core.perft --fen "<fen>" --depth 3 --divide
+"""
+
+import argparse
+import sys
+import time
+
+from .move_tables import SQUARE_COORDS
+from .position import Position
+
+START_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w"
+
+
+def move_to_engine_notation(move):
+    """(from_sq, to_sq) -> nước dạng engine, vd. 'h2e2' (rank = 9 - row)"""
+    notation = ''
+    for sq in move:
+        row, col = SQUARE_COORDS[sq]
+        notation += f"{chr(ord('a') + col)}{9 - row}"
+    return notation
+
+
+def engine_notation_to_move(notation):
+    """Nước dạng engine 'h2e2' -> (from_sq, to_sq), ValueError nếu sai định dạng"""
+    if len(notation) < 4:
+        raise ValueError(f"Nước đi không hợp lệ: {notation}")
+    squares = []
+    for file_char, rank_char in (notation[0:2], notation[2:4]):
+        col = ord(file_char) - ord('a')
+        row = 9 - int(rank_char) if rank_char.isdigit() else -1
+        if not (0 <= col < 9 and 0 <= row < 10):
+            raise ValueError(f"Nước đi không hợp lệ: {notation}")
+        squares.append(row * 9 + col)
+    return tuple(squares)
+
+
+def _get_position(state):
+    """Nhận GameState hoặc Position, trả về Position bên dưới"""
+    return getattr(state, 'position', state)
+
+
+def perft(state, depth):
+    """
+    Đếm số node lá ở độ sâu depth
+
+    Args:
+        state: GameState hoặc Position (được push/pop tại chỗ và trả lại
+               nguyên trạng)
+        depth: Độ sâu (>= 0)
+
+    Returns:
+        int: Số node
+    """
+    position = _get_position(state)
+    if depth <= 0:
+        return 1
+    return _perft(position, depth)
+
+
+def _perft(position, depth):
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        position.push(move)
+        nodes += _perft(position, depth - 1)
+        position.pop()
+    return nodes
+
+
+def perft_divide(state, depth):
+    """
+    Perft tách theo từng nước đi đầu tiên
+
+    Returns:
+        dict: {nước dạng engine: số node}
+    """
+    position = _get_position(state)
+    result = {}
+    for move in position.legal_moves():
+        position.push(move)
+        result[move_to_engine_notation(move)] = perft(position, depth - 1)
+        position.pop()
+    return result
+
+
+def main(argv=None):
+    """CLI: in số node, thời gian, nodes/s (và divide nếu được yêu cầu)"""
+    parser = argparse.ArgumentParser(description="Perft cho bộ sinh nước đi Xiangqi")
+    parser.add_argument('--fen', default=START_FEN, help="Position (mặc định: ban đầu)")
+    parser.add_argument('--depth', type=int, default=3, help="Độ sâu")
+    parser.add_argument('--divide', action='store_true',
+                        help="In số node theo từng nước đầu tiên")
+    args = parser.parse_args(argv)
+
+    try:
+        position = Position.from_fen(args.fen)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    start = time.perf_counter()
+    if args.divide:
+        divide = perft_divide(position, args.depth)
+        for move in sorted(divide):
+            print(f"{move}: {divide[move]}")
+        nodes = sum(divide.values())
+    else:
+        nodes = perft(position, args.depth)
+    elapsed = time.perf_counter() - start
+
+    nps = int(nodes / elapsed) if elapsed > 0 else 0
+    print(f"Nodes searched: {nodes}")
+    print(f"Time: {elapsed:.3f}s  ({nps} nodes/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
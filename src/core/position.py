@@ -0,0 +1,611 @@
+# -*- coding: utf-8 -*-
+"""
+Position cho Xiangqi
+Lõi biểu diễn bàn cờ gọn: 1 bytearray 90 ô, mã quân số nguyên nhỏ,
+danh sách quân theo phe và khóa Zobrist cập nhật tăng dần
+"""
+
+from ..utils.constants import BOARD_WIDTH, BOARD_HEIGHT
+from .move_tables import (BOARD_SIZE, SQUARE_COORDS, KING_STEPS_SQ,
+                          ADVISOR_STEPS_SQ, ELEPHANT_HOPS_SQ, HORSE_HOPS_SQ,
+                          HORSE_ATTACKERS_SQ, RAYS_SQ, PAWN_STEPS_SQ,
+                          PAWN_ATTACKERS_SQ)
+from .zobrist import PIECE_KEYS, SIDE_KEY
+
+# Phe: chỉ số dùng cho các bảng theo phe
+RED = 0
+BLACK = 1
+SIDE_NAMES = ('red', 'black')
+
+# Loại quân (3 bit thấp), bit 8 đánh dấu quân Đen; 0 là ô trống
+EMPTY = 0
+KING = 1
+ADVISOR = 2
+ELEPHANT = 3
+HORSE = 4
+ROOK = 5
+CANNON = 6
+PAWN = 7
+BLACK_FLAG = 8
+
+# Ký tự quân <-> mã quân
+CODE_TO_PIECE = (None, 'K', 'A', 'B', 'N', 'R', 'C', 'P',
+                 None, 'k', 'a', 'b', 'n', 'r', 'c', 'p')
+PIECE_TO_CODE = {piece: code for code, piece in enumerate(CODE_TO_PIECE)
+                 if piece is not None}
+
+# PIECE_SQUARE_KEYS[code][sq], dùng lại khóa của zobrist.PIECE_KEYS nên
+# khóa của Position trùng với compute_key trên board 10x9
+PIECE_SQUARE_KEYS = tuple(
+    tuple(key for row_keys in PIECE_KEYS[piece] for key in row_keys)
+    if piece is not None else None
+    for piece in CODE_TO_PIECE)
+
+
+def _exposure_squares(king_sq):
+    # Quân khác tướng chỉ có thể làm lộ tướng khi đi khỏi/đi vào hàng, cột
+    # của tướng (xe, pháo, tướng đối mặt) hoặc rời ô chéo cạnh tướng (chân mã)
+    king_row, king_col = SQUARE_COORDS[king_sq]
+    return frozenset(
+        sq for sq, (row, col) in enumerate(SQUARE_COORDS)
+        if row == king_row or col == king_col
+        or (abs(row - king_row) == 1 and abs(col - king_col) == 1))
+
+
+# EXPOSURE_SQUARES[king_sq]: nước không chạm các ô này luôn hợp lệ khi
+# tướng không bị chiếu, khỏi phải đi thử
+EXPOSURE_SQUARES = tuple(_exposure_squares(sq) for sq in range(BOARD_SIZE))
+
+
+class Position:
+    """
+    Position cờ tướng dạng mảng phẳng
+
+    Ô được đánh chỉ số sq = row * 9 + col (row 0 là phía Đen). Nước đi là
+    tuple (from_sq, to_sq). push/pop cập nhật tại chỗ nên không cần copy
+    bàn cờ khi thử nước; snapshot() cho bản sao bất biến 91 byte.
+    """
+
+    __slots__ = ('squares', 'side', 'key', 'piece_lists', 'king_squares',
+                 'undo_stack')
+
+    def __init__(self, board=None, side=RED):
+        """
+        Args:
+            board: Board 10x9 (ký tự quân hoặc None), None để tạo bàn trống
+            side: RED hoặc BLACK - bên tới lượt
+        """
+        self.squares = bytearray(BOARD_SIZE)
+        self.side = RED
+        self.key = 0
+        self.piece_lists = ([], [])
+        self.king_squares = [None, None]
+        # Mỗi phần tử: (from_sq, to_sq, captured, side, key) trước nước đi
+        self.undo_stack = []
+
+        if board is not None:
+            self.set_board(board)
+        self.set_side(side)
+
+    # ------------------------------------------------------------------
+    # Nạp / xuất
+    # ------------------------------------------------------------------
+
+    def set_board(self, board):
+        """Nạp board 10x9 (ký tự quân hoặc None), giữ nguyên lượt đi"""
+        squares = bytearray(BOARD_SIZE)
+        for row in range(BOARD_HEIGHT):
+            board_row = board[row]
+            base = row * BOARD_WIDTH
+            for col in range(BOARD_WIDTH):
+                piece = board_row[col]
+                if piece is not None:
+                    squares[base + col] = PIECE_TO_CODE[piece]
+        self.load_squares(squares)
+
+    def load_squares(self, squares):
+        """Nạp mảng 90 mã quân rồi dựng lại danh sách quân, vị trí tướng, khóa"""
+        self.squares = bytearray(squares)
+        self.piece_lists = ([], [])
+        self.king_squares = [None, None]
+        self.undo_stack = []
+
+        key = SIDE_KEY if self.side == BLACK else 0
+        for sq, code in enumerate(self.squares):
+            if code:
+                side = code >> 3
+                self.piece_lists[side].append(sq)
+                if code & 7 == KING:
+                    self.king_squares[side] = sq
+                key ^= PIECE_SQUARE_KEYS[code][sq]
+        self.key = key
+
+    def set_side(self, side):
+        """Đổi bên tới lượt (cập nhật khóa Zobrist)"""
+        if side != self.side:
+            self.side = side
+            self.key ^= SIDE_KEY
+
+    def to_board(self):
+        """Dựng board 10x9 (ký tự quân hoặc None) từ mảng phẳng"""
+        pieces = [CODE_TO_PIECE[code] for code in self.squares]
+        return [pieces[row * BOARD_WIDTH:(row + 1) * BOARD_WIDTH]
+                for row in range(BOARD_HEIGHT)]
+
+    @classmethod
+    def from_fen(cls, fen):
+        """
+        Tạo Position từ FEN (phần bàn cờ + lượt đi nếu có)
+
+        Raises:
+            ValueError: FEN sai định dạng
+        """
+        parts = fen.strip().split()
+        ranks = parts[0].split('/') if parts else []
+        if len(ranks) != BOARD_HEIGHT:
+            raise ValueError(f"FEN sai: cần {BOARD_HEIGHT} ranks, có {len(ranks)}")
+
+        squares = bytearray(BOARD_SIZE)
+        for row, rank in enumerate(ranks):
+            col = 0
+            for char in rank:
+                if char.isdigit():
+                    col += int(char)
+                    continue
+                if col >= BOARD_WIDTH or char not in PIECE_TO_CODE:
+                    raise ValueError(f"FEN sai ở rank {row}: {rank}")
+                squares[row * BOARD_WIDTH + col] = PIECE_TO_CODE[char]
+                col += 1
+            if col != BOARD_WIDTH:
+                raise ValueError(
+                    f"FEN sai: rank {row} có {col} columns thay vì {BOARD_WIDTH}")
+
+        position = cls()
+        position.load_squares(squares)
+        position.set_side(BLACK if len(parts) >= 2 and parts[1] == 'b' else RED)
+        return position
+
+    def to_fen(self):
+        """FEN dạng '<bàn cờ> <w|b>'"""
+        ranks = []
+        squares = self.squares
+        for row in range(BOARD_HEIGHT):
+            rank = ''
+            empty = 0
+            for sq in range(row * BOARD_WIDTH, (row + 1) * BOARD_WIDTH):
+                code = squares[sq]
+                if code:
+                    if empty:
+                        rank += str(empty)
+                        empty = 0
+                    rank += CODE_TO_PIECE[code]
+                else:
+                    empty += 1
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        return f"{'/'.join(ranks)} {'b' if self.side == BLACK else 'w'}"
+
+    def copy(self):
+        """Bản sao độc lập (không gồm undo stack)"""
+        position = Position.__new__(Position)
+        position.squares = self.squares[:]
+        position.side = self.side
+        position.key = self.key
+        position.piece_lists = (self.piece_lists[0][:], self.piece_lists[1][:])
+        position.king_squares = self.king_squares[:]
+        position.undo_stack = []
+        return position
+
+    def snapshot(self):
+        """Bản chụp bất biến: 90 byte bàn cờ + 1 byte lượt đi"""
+        return bytes(self.squares) + bytes((self.side,))
+
+    def load_snapshot(self, data):
+        """Nạp lại bản chụp của snapshot() vào chính position này"""
+        self.load_squares(data[:BOARD_SIZE])
+        self.set_side(data[BOARD_SIZE])
+
+    @classmethod
+    def from_snapshot(cls, data):
+        """Tạo Position từ bản chụp của snapshot()"""
+        position = cls()
+        position.load_snapshot(data)
+        return position
+
+    # ------------------------------------------------------------------
+    # Đi / hoàn tác nước
+    # ------------------------------------------------------------------
+
+    def push(self, move):
+        """
+        Thực hiện nước (from_sq, to_sq) tại chỗ, không kiểm tra hợp lệ
+
+        Returns:
+            int: Mã quân bị bắt (EMPTY nếu không bắt)
+        """
+        self.undo_stack.append(
+            (move[0], move[1], self.squares[move[1]], self.side, self.key))
+        return self.apply(move)
+
+    def pop(self):
+        """
+        Hoàn tác nước cuối cùng đã push
+
+        Returns:
+            tuple: (from_sq, to_sq)
+        """
+        from_sq, to_sq, captured, side, key = self.undo_stack.pop()
+        self.unapply((from_sq, to_sq), captured)
+        self.side = side
+        self.key = key
+        return (from_sq, to_sq)
+
+    def apply(self, move):
+        """
+        Thực hiện nước đi nhưng không ghi undo stack (dùng cho log nước đi
+        tự lưu quân bị bắt, hoàn tác bằng unapply)
+
+        Returns:
+            int: Mã quân bị bắt (EMPTY nếu không bắt)
+        """
+        from_sq, to_sq = move
+        squares = self.squares
+        code = squares[from_sq]
+        captured = squares[to_sq]
+        side = code >> 3
+
+        squares[to_sq] = code
+        squares[from_sq] = EMPTY
+
+        pieces = self.piece_lists[side]
+        pieces[pieces.index(from_sq)] = to_sq
+
+        piece_keys = PIECE_SQUARE_KEYS[code]
+        key = self.key ^ piece_keys[from_sq] ^ piece_keys[to_sq] ^ SIDE_KEY
+        if captured:
+            captured_side = captured >> 3
+            self.piece_lists[captured_side].remove(to_sq)
+            key ^= PIECE_SQUARE_KEYS[captured][to_sq]
+            if captured & 7 == KING:
+                self.king_squares[captured_side] = None
+        self.key = key
+
+        if code & 7 == KING:
+            self.king_squares[side] = to_sq
+
+        self.side ^= 1
+        return captured
+
+    def unapply(self, move, captured):
+        """Hoàn tác nước đã apply, cần biết quân bị bắt (EMPTY nếu không có)"""
+        from_sq, to_sq = move
+        squares = self.squares
+        code = squares[to_sq]
+        moved_side = code >> 3
+
+        squares[from_sq] = code
+        squares[to_sq] = captured
+
+        pieces = self.piece_lists[moved_side]
+        pieces[pieces.index(to_sq)] = from_sq
+
+        piece_keys = PIECE_SQUARE_KEYS[code]
+        key = self.key ^ piece_keys[from_sq] ^ piece_keys[to_sq] ^ SIDE_KEY
+        if captured:
+            captured_side = captured >> 3
+            self.piece_lists[captured_side].append(to_sq)
+            key ^= PIECE_SQUARE_KEYS[captured][to_sq]
+            if captured & 7 == KING:
+                self.king_squares[captured_side] = to_sq
+        self.key = key
+
+        if code & 7 == KING:
+            self.king_squares[moved_side] = from_sq
+
+        self.side ^= 1
+
+    # ------------------------------------------------------------------
+    # Sinh nước đi
+    # ------------------------------------------------------------------
+
+    def piece_moves(self, sq, moves):
+        """Thêm các nước theo luật di chuyển của quân tại sq vào moves"""
+        squares = self.squares
+        code = squares[sq]
+        color = code & BLACK_FLAG
+        kind = code & 7
+
+        if kind == ROOK:
+            for ray in RAYS_SQ[sq]:
+                for to_sq in ray:
+                    target = squares[to_sq]
+                    if not target:
+                        moves.append((sq, to_sq))
+                        continue
+                    if target & BLACK_FLAG != color:
+                        moves.append((sq, to_sq))
+                    break
+
+        elif kind == CANNON:
+            for ray in RAYS_SQ[sq]:
+                screened = False
+                for to_sq in ray:
+                    target = squares[to_sq]
+                    if not screened:
+                        if not target:
+                            moves.append((sq, to_sq))
+                        else:
+                            screened = True  # Quân đầu tiên là ngòi
+                    elif target:
+                        if target & BLACK_FLAG != color:
+                            moves.append((sq, to_sq))
+                        break
+
+        elif kind == HORSE or kind == ELEPHANT:
+            hops = HORSE_HOPS_SQ[sq] if kind == HORSE else ELEPHANT_HOPS_SQ[sq]
+            for to_sq, block_sq in hops:
+                if not squares[block_sq]:
+                    target = squares[to_sq]
+                    if not target or target & BLACK_FLAG != color:
+                        moves.append((sq, to_sq))
+
+        else:
+            if kind == PAWN:
+                steps = PAWN_STEPS_SQ[code >> 3][sq]
+            elif kind == KING:
+                steps = KING_STEPS_SQ[sq]
+            else:
+                steps = ADVISOR_STEPS_SQ[sq]
+            for to_sq in steps:
+                target = squares[to_sq]
+                if not target or target & BLACK_FLAG != color:
+                    moves.append((sq, to_sq))
+
+    def pseudo_legal_moves(self, side=None):
+        """Tất cả nước theo luật di chuyển (chưa lọc chiếu tướng)"""
+        if side is None:
+            side = self.side
+        moves = []
+        for sq in self.piece_lists[side]:
+            self.piece_moves(sq, moves)
+        return moves
+
+    def legal_moves(self, side=None):
+        """Tất cả nước hợp lệ của side"""
+        return list(self.iter_legal_moves(side))
+
+    def has_legal_move(self, side=None):
+        """side còn ít nhất 1 nước hợp lệ (dừng ngay khi tìm thấy)"""
+        for _ in self.iter_legal_moves(side):
+            return True
+        return False
+
+    def iter_legal_moves(self, side=None):
+        """
+        Duyệt lần lượt các nước hợp lệ của side
+
+        Khi đang bị chiếu chỉ đi thử các nước có thể giải chiếu: bắt quân
+        chiếu, chặn đường/chân mã, kê thêm hoặc rút ngòi pháo, di chuyển tướng.
+        """
+        if side is None:
+            side = self.side
+        king_sq = self.king_squares[side]
+
+        evasion_filters = None
+        if king_sq is not None:
+            checkers = self.attackers(king_sq, side ^ 1)
+            if checkers:
+                evasion_filters = [self._check_resolution(checker, king_sq)
+                                   for checker in checkers]
+
+        # Khi không bị chiếu chỉ cần đi thử các nước chạm ô nhạy cảm
+        sensitive = (EXPOSURE_SQUARES[king_sq]
+                     if king_sq is not None and not evasion_filters else None)
+
+        moves = []
+        # Copy vì push/pop đổi thứ tự trong danh sách quân
+        for sq in tuple(self.piece_lists[side]):
+            moves.clear()
+            self.piece_moves(sq, moves)
+            is_king = sq == king_sq
+            filtered = evasion_filters and not is_king
+            from_safe = sensitive is not None and not is_king and sq not in sensitive
+
+            for move in moves:
+                if filtered and not all(move[1] in targets or sq in screens
+                                        for targets, screens in evasion_filters):
+                    continue
+                if (from_safe and move[1] not in sensitive) or self.is_legal(move, side):
+                    yield move
+
+    def is_legal(self, move, side=None):
+        """Nước (đã đúng luật di chuyển) không để tướng side bị chiếu/đối mặt"""
+        if side is None:
+            side = self.side
+        self.push(move)
+        try:
+            return not self.is_in_check(side)
+        finally:
+            self.pop()
+
+    def _check_resolution(self, checker_sq, king_sq):
+        """
+        Tập ô có thể giải 1 nước chiếu (không tính nước đi của tướng)
+
+        Returns:
+            tuple: (targets, screens) - nước tới ô trong targets hoặc xuất
+                   phát từ ô trong screens mới có thể giải chiếu
+        """
+        kind = self.squares[checker_sq] & 7
+        targets = {checker_sq}
+        screens = set()
+
+        if kind == ROOK or kind == CANNON or kind == KING:
+            checker_row, checker_col = SQUARE_COORDS[checker_sq]
+            king_row, king_col = SQUARE_COORDS[king_sq]
+            if checker_row == king_row:
+                step = 1 if king_col > checker_col else -1
+            else:
+                step = BOARD_WIDTH if king_row > checker_row else -BOARD_WIDTH
+            between = range(checker_sq + step, king_sq, step)
+            targets.update(between)
+
+            if kind == CANNON:
+                # Rút ngòi pháo cũng giải chiếu
+                screens.update(sq for sq in between if self.squares[sq])
+
+        elif kind == HORSE:
+            # Chặn chân mã
+            for from_sq, leg_sq in HORSE_ATTACKERS_SQ[king_sq]:
+                if from_sq == checker_sq:
+                    targets.add(leg_sq)
+
+        return targets, screens
+
+    # ------------------------------------------------------------------
+    # Chiếu tướng
+    # ------------------------------------------------------------------
+
+    def is_in_check(self, side=None):
+        """Tướng của side đang bị chiếu (gồm cả tướng đối mặt)"""
+        if side is None:
+            side = self.side
+        king_sq = self.king_squares[side]
+        if king_sq is None:
+            return False
+        return bool(self.attackers(king_sq, side ^ 1, first_only=True))
+
+    def attackers(self, sq, by_side, first_only=False):
+        """
+        Các ô có quân của by_side đang tấn công sq (duyệt ngược từ sq)
+
+        Args:
+            sq: Ô bị tấn công
+            by_side: RED hoặc BLACK
+            first_only: Dừng ngay khi tìm thấy 1 quân
+
+        Returns:
+            list: Danh sách chỉ số ô của các quân tấn công
+        """
+        squares = self.squares
+        color = by_side << 3
+        rook = ROOK | color
+        cannon = CANNON | color
+        horse = HORSE | color
+        king = KING | color
+        result = []
+
+        # Tướng đối mặt chỉ tính khi sq là tướng bên kia
+        flying = squares[sq] == KING | (color ^ BLACK_FLAG)
+
+        # Xe, pháo (và tướng đối mặt) theo 4 tia, 2 tia đầu là hàng dọc
+        for direction, ray in enumerate(RAYS_SQ[sq]):
+            screened = False
+            for ray_sq in ray:
+                code = squares[ray_sq]
+                if not code:
+                    continue
+                if not screened:
+                    if code == rook or (flying and code == king and direction < 2):
+                        result.append(ray_sq)
+                        if first_only:
+                            return result
+                    screened = True
+                else:
+                    if code == cannon:
+                        result.append(ray_sq)
+                        if first_only:
+                            return result
+                    break
+
+        # Mã: chân nằm cạnh ô của mã
+        for from_sq, leg_sq in HORSE_ATTACKERS_SQ[sq]:
+            if squares[from_sq] == horse and not squares[leg_sq]:
+                result.append(from_sq)
+                if first_only:
+                    return result
+
+        # Tốt, tướng, sĩ (bảng đối xứng trong cung)
+        for table, code in ((PAWN_ATTACKERS_SQ[by_side], PAWN | color),
+                            (KING_STEPS_SQ, king),
+                            (ADVISOR_STEPS_SQ, ADVISOR | color)):
+            for from_sq in table[sq]:
+                if squares[from_sq] == code:
+                    result.append(from_sq)
+                    if first_only:
+                        return result
+
+        # Tượng (bảng đối xứng, cùng mắt tượng)
+        elephant = ELEPHANT | color
+        for from_sq, eye_sq in ELEPHANT_HOPS_SQ[sq]:
+            if squares[from_sq] == elephant and not squares[eye_sq]:
+                result.append(from_sq)
+                if first_only:
+                    return result
+
+        return result
+
+    def chased_pieces(self, sq):
+        """
+        Các quân đối phương bị quân tại sq đuổi bắt (dùng xét đuổi dai)
+
+        Tướng và tốt được phép đuổi. Quân bị đuổi là quân khác tướng, tốt chưa
+        qua sông, bị bắt được hợp lệ và: là xe bị quân khác xe đuổi, hoặc
+        không có quân bảo vệ (không ăn lại được sau khi bị bắt).
+
+        Returns:
+            list: Chỉ số ô của các quân bị đuổi
+        """
+        squares = self.squares
+        code = squares[sq]
+        kind = code & 7
+        if not code or kind == KING or kind == PAWN:
+            return []
+
+        side = code >> 3
+        moves = []
+        self.piece_moves(sq, moves)
+
+        chased = []
+        for move in moves:
+            to_sq = move[1]
+            target = squares[to_sq]
+            if not target:
+                continue
+            target_kind = target & 7
+            if target_kind == KING:
+                continue
+            if target_kind == PAWN:
+                row = to_sq // BOARD_WIDTH
+                if (row >= 5) != (side == RED):
+                    continue  # Tốt chưa qua sông
+
+            if target_kind == ROOK and kind != ROOK:
+                if self.is_legal(move, side):
+                    chased.append(to_sq)
+                continue
+
+            self.push(move)
+            try:
+                unprotected = (not self.is_in_check(side)
+                               and not self.attackers(to_sq, side ^ 1, first_only=True))
+            finally:
+                self.pop()
+            if unprotected:
+                chased.append(to_sq)
+        return chased
+
+    def kings_facing(self):
+        """2 tướng đối mặt trên cùng cột mà không có quân chặn"""
+        red_king, black_king = self.king_squares
+        if red_king is None or black_king is None:
+            return False
+        if red_king % BOARD_WIDTH != black_king % BOARD_WIDTH:
+            return False
+        squares = self.squares
+        top, bottom = min(red_king, black_king), max(red_king, black_king)
+        for sq in range(top + BOARD_WIDTH, bottom, BOARD_WIDTH):
+            if squares[sq]:
+                return False
+        return True
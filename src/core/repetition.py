@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Repetition cho Xiangqi
+Chỉ mục lịch sử position theo khóa Zobrist để phát hiện lặp lại,
+chiếu dai (trường chiếu) và đuổi dai (trường tróc) với chi phí O(1) mỗi nước
+"""
+
+from array import array
+
+# Số lần xuất hiện cùng position để xử lặp
+REPETITION_COUNT = 3
+
+# Số nửa nước liên tiếp không bắt quân thì xử hòa
+NO_CAPTURE_DRAW_PLIES = 120
+
+# Kết quả xử lặp
+REPETITION_DRAW = 'draw'
+PERPETUAL_CHECK = 'perpetual_check'
+PERPETUAL_CHASE = 'perpetual_chase'
+
+
+class RepetitionTracker:
+    """
+    Lưu khóa position sau mỗi nửa nước cùng cờ chiếu/đuổi của nước đó
+    (mảng số nguyên gọn, không giữ object theo từng ply)
+
+    index: {khóa: [các ply có khóa này]} - push/pop chỉ append/pop cuối
+    danh sách nên tra cứu và hoàn tác đều O(1).
+    """
+
+    def __init__(self, root_key=0):
+        self.reset(root_key)
+
+    def reset(self, root_key, halfmove_clock=0):
+        """Bắt đầu lịch sử mới từ position có khóa root_key (ply 0)"""
+        self.keys = array('Q', [root_key])
+        # Bit 0: bên vừa đi là Đen, bit 1: chiếu, bit 2: đuổi
+        self.flags = array('B', [0])
+        self.halfmove_clocks = array('I', [halfmove_clock])
+        self.index = {root_key: [0]}
+
+    def __len__(self):
+        """Số nửa nước đã ghi"""
+        return len(self.keys) - 1
+
+    def push(self, key, mover, is_check, is_chase, halfmove_clock):
+        """
+        Ghi nửa nước vừa đi
+
+        Args:
+            key: Khóa Zobrist của position sau nước đi
+            mover: 'red' hoặc 'black' - bên vừa đi
+            is_check: Nước đi chiếu tướng đối phương
+            is_chase: Nước đi đuổi bắt quân đối phương
+            halfmove_clock: Số nửa nước không bắt quân sau nước đi
+        """
+        ply = len(self.keys)
+        self.keys.append(key)
+        self.flags.append((mover == 'black') | (is_check << 1) | (is_chase << 2))
+        self.halfmove_clocks.append(halfmove_clock)
+        self.index.setdefault(key, []).append(ply)
+
+    def pop(self):
+        """Bỏ nửa nước cuối cùng, trả về halfmove_clock trước nước đó"""
+        if len(self.keys) <= 1:
+            return 0
+
+        key = self.keys.pop()
+        self.flags.pop()
+        self.halfmove_clocks.pop()
+
+        plies = self.index[key]
+        plies.pop()
+        if not plies:
+            del self.index[key]
+        return self.halfmove_clocks[-1]
+
+    def truncate(self, ply):
+        """Bỏ mọi nửa nước sau ply (dùng khi nhảy lùi trong history)"""
+        while len(self.keys) > ply + 1:
+            self.pop()
+
+    @property
+    def halfmove_clock(self):
+        """Số nửa nước không bắt quân tính tới position hiện tại"""
+        return self.halfmove_clocks[-1]
+
+    def repetition_count(self):
+        """Số lần position hiện tại đã xuất hiện (tính cả hiện tại)"""
+        return len(self.index.get(self.keys[-1], ()))
+
+    def outcome(self):
+        """
+        Xử kết quả nếu position hiện tại lặp đủ REPETITION_COUNT lần
+
+        Xét chu kỳ từ lần xuất hiện trước đó tới hiện tại:
+        - chỉ 1 bên chiếu ở mọi nước trong chu kỳ -> bên đó thua (chiếu dai)
+        - ngược lại chỉ 1 bên đuổi ở mọi nước -> bên đó thua (đuổi dai)
+        - còn lại (cả 2 cùng phạm hoặc không ai phạm) -> hòa
+
+        Returns:
+            dict hoặc None: {'result': ..., 'loser': 'red'|'black'|None,
+                             'cycle_start': ply}
+        """
+        plies = self.index.get(self.keys[-1])
+        if not plies or len(plies) < REPETITION_COUNT:
+            return None
+
+        start = plies[-2]
+        end = len(self.keys) - 1
+
+        perpetual_check = {}
+        perpetual_chase = {}
+        for ply in range(start + 1, end + 1):
+            flags = self.flags[ply]
+            mover = 'black' if flags & 1 else 'red'
+            perpetual_check[mover] = perpetual_check.get(mover, True) and bool(flags & 2)
+            perpetual_chase[mover] = perpetual_chase.get(mover, True) and bool(flags & 4)
+
+        for flags, result in ((perpetual_check, PERPETUAL_CHECK),
+                              (perpetual_chase, PERPETUAL_CHASE)):
+            offenders = [mover for mover, flag in flags.items() if flag]
+            if len(offenders) == 1:
+                return {'result': result, 'loser': offenders[0], 'cycle_start': start}
+            if offenders:
+                break  # Cả 2 bên cùng phạm -> hòa
+
+        return {'result': REPETITION_DRAW, 'loser': None, 'cycle_start': start}
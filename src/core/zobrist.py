@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Zobrist hashing cho Xiangqi
+Khóa 64-bit định danh position, cập nhật tăng dần theo từng nước đi
+"""
+
+import random
+
+from ..utils.constants import BOARD_WIDTH, BOARD_HEIGHT
+
+PIECE_CHARS = 'KABNRCPkabnrcp'
+
+# Seed cố định để khóa ổn định giữa các lần chạy (dùng được cho cache trên đĩa)
+_rng = random.Random(0x58494E47)
+
+# PIECE_KEYS[piece][row][col] -> số ngẫu nhiên 64-bit
+PIECE_KEYS = {
+    piece: tuple(tuple(_rng.getrandbits(64) for _ in range(BOARD_WIDTH))
+                 for _ in range(BOARD_HEIGHT))
+    for piece in PIECE_CHARS
+}
+
+# XOR thêm khi tới lượt Đen
+SIDE_KEY = _rng.getrandbits(64)
+
+
+def compute_board_key(board):
+    """
+    Tính khóa Zobrist của phần bàn cờ (không tính lượt đi)
+
+    Args:
+        board: Board 10x9 chứa ký tự quân hoặc None
+
+    Returns:
+        int: Khóa 64-bit
+    """
+    key = 0
+    for row in range(BOARD_HEIGHT):
+        for col in range(BOARD_WIDTH):
+            piece = board[row][col]
+            if piece is not None:
+                key ^= PIECE_KEYS[piece][row][col]
+    return key
+
+
+def compute_key(board, player):
+    """
+    Tính khóa Zobrist đầy đủ của position
+
+    Args:
+        board: Board 10x9
+        player: 'red' hoặc 'black' - bên tới lượt
+
+    Returns:
+        int: Khóa 64-bit
+    """
+    key = compute_board_key(board)
+    if player == 'black':
+        key ^= SIDE_KEY
+    return key
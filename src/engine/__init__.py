@@ -2,3 +2,5 @@
 
 from .ucci_protocol import UCCIEngine, UCCIEngineManager
 from .multi_engine_manager import MultiEngineManager, EngineWorker
+from .builtin_engine import BuiltinEngine, BuiltinEngineWorker
+from .engine_pool import EnginePool
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Cache cho Xiangqi
+Lưu kết quả phân tích tốt nhất (sâu nhất) của từng engine theo khóa Zobrist
+của position vào SQLite trên đĩa, loại bỏ theo LRU khi vượt giới hạn
+
+Khi quay lại position đã phân tích (undo/redo/nhảy ply), kết quả hiện ngay
+từ cache và engine chỉ cần tìm sâu hơn độ sâu đã lưu.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import List, Optional
+
+from ..core.perft import engine_notation_to_move
+from ..core.position import Position
+
+# File cache mặc định (thư mục cache/ cạnh main.py, không đưa vào git)
+DEFAULT_CACHE_PATH = os.path.join("cache", "analysis_cache.sqlite3")
+
+# Số entry tối đa trước khi loại bỏ entry ít dùng nhất
+DEFAULT_MAX_ENTRIES = 200000
+
+# Loại bỏ thêm một phần để không phải xóa sau mỗi lần ghi
+EVICT_SLACK = 0.1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    engine TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    evaluation REAL NOT NULL,
+    bestmove TEXT,
+    ponder TEXT,
+    pv TEXT NOT NULL,
+    nodes INTEGER NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (engine, key)
+);
+CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis (last_used);
+"""
+
+
+def engine_identity(name: str, path: str = None) -> str:
+    """
+    Định danh engine cho cache: cùng file engine (đường dẫn thật, kích thước,
+    thời điểm sửa) thì dùng chung kết quả; thay binary thì cache cũ tự hết hiệu lực
+    """
+    if not path:
+        return name
+    real_path = os.path.realpath(path)
+    try:
+        stat = os.stat(real_path)
+    except OSError:
+        return real_path
+    return f"{real_path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def position_after_moves(fen: str, moves: List[str] = None) -> Optional[Position]:
+    """Position sau khi đi moves (dạng engine) từ fen, None nếu không hợp lệ"""
+    try:
+        position = Position.from_fen(fen)
+        for notation in moves or []:
+            move = engine_notation_to_move(notation)
+            if move not in position.legal_moves():
+                return None
+            position.apply(move)
+    except (ValueError, IndexError, KeyError):
+        return None
+    return position
+
+
+def is_valid_pv(position: Position, pv: List[str]) -> bool:
+    """PV đi được hết từ position (lọc kết quả cũ của position trước đó)"""
+    played = []
+    try:
+        for notation in pv:
+            move = engine_notation_to_move(notation)
+            if move not in position.legal_moves():
+                return False
+            played.append((move, position.apply(move)))
+        return bool(played)
+    except ValueError:
+        return False
+    finally:
+        for move, captured in reversed(played):
+            position.unapply(move, captured)
+
+
+def _to_signed(key):
+    # SQLite INTEGER là số có dấu 64-bit
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class AnalysisCache:
+    """
+    Cache kết quả phân tích trên SQLite (dùng chung giữa các thread)
+
+    Mỗi (engine, khóa position) giữ 1 entry: kết quả có depth lớn nhất.
+    last_used tăng dần theo mỗi lần đọc/ghi để loại bỏ theo LRU.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(_SCHEMA)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        row = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(MAX(last_used), 0) FROM analysis").fetchone()
+        self.entry_count, self.clock = row
+
+        print(f"💾 Analysis cache: {path} ({self.entry_count} entries)")
+
+    def __len__(self):
+        return self.entry_count
+
+    def _tick(self):
+        self.clock += 1
+        return self.clock
+
+    def lookup(self, engine_id: str, key: int) -> Optional[dict]:
+        """
+        Kết quả đã lưu của engine cho position
+
+        Returns:
+            dict hoặc None: {'bestmove', 'ponder', 'evaluation', 'depth',
+                             'nodes', 'pv'}
+        """
+        key = _to_signed(key)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT depth, evaluation, bestmove, ponder, pv, nodes "
+                "FROM analysis WHERE engine = ? AND key = ?",
+                (engine_id, key)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE analysis SET last_used = ? WHERE engine = ? AND key = ?",
+                (self._tick(), engine_id, key))
+            self.connection.commit()
+
+        depth, evaluation, bestmove, ponder, pv, nodes = row
+        return {
+            'bestmove': bestmove,
+            'ponder': ponder,
+            'evaluation': evaluation,
+            'depth': depth,
+            'nodes': nodes,
+            'pv': pv.split() if pv else []
+        }
+
+    def store(self, engine_id: str, key: int, result: dict) -> bool:
+        """
+        Lưu kết quả nếu sâu hơn (hoặc bằng) entry đang có
+
+        Returns:
+            bool: True nếu đã ghi
+        """
+        depth = result.get('depth', 0)
+        pv = result.get('pv') or []
+        if depth <= 0 or not pv:
+            return False
+
+        key = _to_signed(key)
+        values = (engine_id, key, depth, float(result.get('evaluation', 0.0)),
+                  result.get('bestmove') or pv[0],
+                  result.get('ponder') or (pv[1] if len(pv) > 1 else None),
+                  " ".join(pv), result.get('nodes', 0))
+        with self.lock:
+            existing = self.connection.execute(
+                "SELECT depth FROM analysis WHERE engine = ? AND key = ?",
+                (engine_id, key)).fetchone()
+            if existing is not None and existing[0] > depth:
+                return False
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO analysis (engine, key, depth, evaluation, "
+                "bestmove, ponder, pv, nodes, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values + (self._tick(),))
+            if existing is None:
+                self.entry_count += 1
+                if self.entry_count > self.max_entries:
+                    self._evict()
+            self.connection.commit()
+        return True
+
+    def _evict(self):
+        """Xóa các entry lâu không dùng nhất (gọi khi đang giữ lock)"""
+        excess = self.entry_count - int(self.max_entries * (1 - EVICT_SLACK))
+        self.connection.execute(
+            "DELETE FROM analysis WHERE rowid IN "
+            "(SELECT rowid FROM analysis ORDER BY last_used LIMIT ?)", (excess,))
+        self.entry_count -= excess
+        print(f"🧹 Analysis cache: evicted {excess} entries")
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        with self.lock:
+            self.connection.execute("DELETE FROM analysis")
+            self.connection.commit()
+            self.entry_count = 0
+
+    def close(self):
+        """Đóng kết nối SQLite"""
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+"""
+Batch Annotator cho Xiangqi
+Phân tích hàng loạt ván cờ không cần GUI (không tạo QApplication): đọc lần lượt
+các ván từ file, chia từng position cho nhiều process engine (depth hoặc
+movetime cố định) và ghi điểm, bestmove, PV, mức độ sai lầm của từng nước
+
+- Mỗi engine 1 worker asyncio trên EngineLoop dùng chung, lấy position từ hàng
+  đợi có giới hạn nên file lớn không bị nạp hết vào bộ nhớ
+- Mặc định số engine = số core, Threads/Hash chia theo engine_resources
+- Output JSONL, mỗi dòng 1 nước; ván được ghi khi đã phân tích xong mọi nước
+- Checkpoint JSONL ghi nối tiếp {'game', 'offset'} sau mỗi ván: chạy lại với
+  cùng checkpoint sẽ bỏ qua các ván đã xong và cắt output về offset cuối
+
+CLI: python annotate.py games.pgn --depth 12 --output annotations.jsonl
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..core.game_file import iter_games
+from ..core.perft import engine_notation_to_move
+from ..core.position import Position, RED
+from .engine_loop import EngineLoop, get_engine_loop
+from .info_parser import parse_bestmove, parse_info
+from .ucci_protocol import UCCIEngine, HANDSHAKE_TIMEOUT
+
+# Điểm quy đổi của chiếu bí: mate n -> ±(MATE_SCORE - n) centipawn
+MATE_SCORE = 30000
+
+# Ngưỡng điểm mất (centipawn) để xếp loại nước đi, xét từ mức nặng nhất
+DEFAULT_THRESHOLDS = {
+    'blunder': 300,
+    'mistake': 100,
+    'inaccuracy': 50
+}
+
+# Các trường cần lấy từ dòng info
+ANNOTATION_INFO_FIELDS = frozenset(('depth', 'multipv', 'score', 'pv'))
+
+
+def score_to_cp(info: dict) -> Optional[int]:
+    """Điểm centipawn theo góc nhìn bên đi (chiếu bí quy về ±MATE_SCORE)"""
+    if 'mate' in info:
+        mate = info['mate']
+        # mate 0: bên đi đã bị chiếu bí
+        return MATE_SCORE - mate if mate > 0 else -MATE_SCORE - mate
+    return info.get('score')
+
+
+def classify(loss: Optional[int], thresholds: Dict[str, int] = None) -> Optional[str]:
+    """Loại sai lầm ('blunder', 'mistake', 'inaccuracy') theo điểm mất, None nếu không"""
+    if not loss:
+        return None
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    for label, threshold in sorted(thresholds.items(), key=lambda item: -item[1]):
+        if loss >= threshold:
+            return label
+    return None
+
+
+def prepare_game(game: dict) -> bool:
+    """
+    Kiểm tra các nước của ván có hợp lệ không
+
+    Returns:
+        bool: True nếu vị trí cuối ván không còn nước đi (bên đi đã thua)
+
+    Raises:
+        ValueError: FEN sai hoặc có nước không hợp lệ
+    """
+    position = Position.from_fen(game['fen'])
+    for ply, notation in enumerate(game['moves'], 1):
+        move = engine_notation_to_move(notation)
+        if move not in position.legal_moves():
+            raise ValueError(f"Nước {ply} không hợp lệ: {notation}")
+        position.push(move)
+    return not position.has_legal_move()
+
+
+def annotate_moves(game: dict, results: List[dict],
+                   thresholds: Dict[str, int] = None) -> List[dict]:
+    """
+    Ghép kết quả phân tích của các position (results[i] là position trước
+    nước i+1, phần tử cuối là vị trí cuối ván) thành record cho từng nước
+
+    Điểm mất = điểm của nước tốt nhất - điểm sau nước đã đi (cùng góc nhìn bên đi)
+    """
+    side = Position.from_fen(game['fen']).side
+    records = []
+    for ply, move in enumerate(game['moves']):
+        before, after = results[ply], results[ply + 1]
+        score = before['score']
+        played_score = -after['score'] if after['score'] is not None else None
+
+        loss = None
+        if move == before['bestmove']:
+            loss = 0
+        elif score is not None and played_score is not None:
+            loss = max(0, score - played_score)
+
+        records.append({
+            'game': game['id'],
+            'ply': ply + 1,
+            'side': 'red' if side == RED else 'black',
+            'move': move,
+            'score': score,
+            'played_score': played_score,
+            'loss': loss,
+            'class': classify(loss, thresholds),
+            'bestmove': before['bestmove'],
+            'depth': before['depth'],
+            'pv': before['pv']
+        })
+        side ^= 1
+    return records
+
+
+def load_checkpoint(path: str) -> Tuple[set, int]:
+    """
+    Đọc checkpoint
+
+    Returns:
+        tuple: (tập id ván đã xong, offset output sau ván cuối cùng)
+    """
+    done = set()
+    offset = 0
+    if not path or not os.path.exists(path):
+        return done, offset
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Dòng ghi dở khi bị ngắt
+                continue
+            done.add(entry['game'])
+            offset = entry['offset']
+    return done, offset
+
+
+class AnalysisEngine:
+    """
+    Phân tích từng position trên 1 process engine (depth/movetime cố định)
+
+    Hỗ trợ ponder cho chế độ đấu: ponder() chạy 'go ponder' trên nước đoán trước
+    trong lượt đối thủ; đối thủ đi đúng thì ponderhit() lấy kết quả của search
+    đang chạy, đi khác thì cancel_ponder() dừng search rồi analyse() lại.
+    """
+
+    def __init__(self, engine: UCCIEngine):
+        self.engine = engine
+        self.info = None
+        self.future = None
+        self.ponder_move = None  # Nước đoán trước đang ponder (None = không ponder)
+        engine.on_info = self._handle_info
+        engine.on_bestmove = self._handle_bestmove
+
+    async def analyse(self, fen: str, moves: List[str], depth: int = None,
+                      movetime: int = None, timeout: float = None, **clock) -> dict:
+        """
+        Args:
+            fen, moves: Position cần phân tích
+            depth, movetime: Giới hạn tìm kiếm
+            timeout: Thời gian chờ bestmove tối đa (giây), None = không giới hạn
+            clock: wtime/btime/winc/binc/movestogo gửi kèm lệnh go
+
+        Returns:
+            dict: {'score': cp (góc nhìn bên đi) | None, 'bestmove', 'ponder', 'pv', 'depth'}
+
+        Raises:
+            RuntimeError: Engine đã thoát
+            asyncio.TimeoutError: Quá timeout (engine cần synchronize trước khi dùng lại)
+        """
+        self._start(fen, moves, depth=depth, time_ms=movetime, **clock)
+        return await self._wait(timeout)
+
+    def ponder(self, fen: str, moves: List[str], ponder_move: str, depth: int = None,
+               movetime: int = None, **clock):
+        """
+        Bắt đầu 'go ponder' trên position sau nước đoán trước của đối thủ (không chờ)
+
+        Args:
+            fen, moves: Position đối thủ sắp đi
+            ponder_move: Nước đoán trước (ponder của bestmove vừa đi)
+            depth, movetime, clock: Như analyse (engine áp dụng sau ponderhit)
+
+        Raises:
+            RuntimeError: Engine đã thoát
+        """
+        self._start(fen, list(moves) + [ponder_move], depth=depth, time_ms=movetime,
+                    ponder=True, **clock)
+        self.ponder_move = ponder_move
+
+    async def ponderhit(self, timeout: float = None) -> dict:
+        """Đối thủ đi đúng ponder_move: search tiếp, trả kết quả như analyse"""
+        self.ponder_move = None
+        self.engine.ponderhit()
+        return await self._wait(timeout)
+
+    async def cancel_ponder(self, timeout: float = None):
+        """Đối thủ đi nước khác: dừng search ponder và bỏ bestmove của nó"""
+        self.ponder_move = None
+        self.engine.stop_search()
+        await self._wait(timeout)
+
+    def _start(self, fen: str, moves: List[str], **go):
+        engine = self.engine
+        if not engine.is_running:
+            raise RuntimeError("Engine đã dừng")
+
+        self.info = {}
+        self.future = asyncio.get_running_loop().create_future()
+        engine.set_position(fen, moves)
+        engine.go(**go)
+
+    async def _wait(self, timeout: float = None) -> dict:
+        """Chờ bestmove của search đang chạy"""
+        engine = self.engine
+        # Engine thoát giữa chừng thì reader_task kết thúc trước bestmove
+        await asyncio.wait((self.future, engine.reader_task), timeout=timeout,
+                           return_when=asyncio.FIRST_COMPLETED)
+        if not self.future.done():
+            self.future.cancel()
+            if engine.reader_task.done():
+                raise RuntimeError("Engine đã thoát khi đang phân tích")
+            engine.stop_search()
+            raise asyncio.TimeoutError()
+
+        bestmove, ponder = parse_bestmove(self.future.result())
+        info = self.info
+        return {
+            'score': score_to_cp(info),
+            'bestmove': bestmove,
+            'ponder': ponder,
+            'pv': info.get('pv') or ([bestmove] if bestmove else []),
+            'depth': info.get('depth')
+        }
+
+    def _handle_info(self, line: str):
+        info = parse_info(line, ANNOTATION_INFO_FIELDS)
+        if not info or info.get('multipv', 1) != 1:
+            return
+        if 'score' in info or 'mate' in info:
+            self.info = info
+
+    def _handle_bestmove(self, line: str):
+        if self.future is not None and not self.future.done():
+            self.future.set_result(line)
+
+
+class BatchAnnotator:
+    """Phân tích hàng loạt ván cờ trên nhiều process engine"""
+
+    def __init__(self, engine_path: str, engines: int = 1, depth: int = None,
+                 movetime: int = None, options: Dict[str, object] = None,
+                 thresholds: Dict[str, int] = None, loop: EngineLoop = None,
+                 handshake_timeout: float = HANDSHAKE_TIMEOUT):
+        """
+        Args:
+            engine_path: Đường dẫn engine
+            engines: Số process engine chạy song song
+            depth: Độ sâu cố định cho mỗi position
+            movetime: Thời gian cố định cho mỗi position (ms)
+            options: Option gửi cho mỗi engine (Threads, Hash...)
+            thresholds: Ngưỡng xếp loại sai lầm (mặc định DEFAULT_THRESHOLDS)
+            loop: EngineLoop chạy I/O (mặc định loop dùng chung)
+            handshake_timeout: Thời gian chờ tối đa mỗi bước handshake (giây)
+        """
+        if not depth and not movetime:
+            raise ValueError("Cần depth hoặc movetime")
+        self.engine_path = engine_path
+        self.engine_count = max(1, engines)
+        self.depth = depth
+        self.movetime = movetime
+        self.options = dict(options or {})
+        self.thresholds = thresholds or DEFAULT_THRESHOLDS
+        self.loop = loop or get_engine_loop()
+        self.handshake_timeout = handshake_timeout
+        self.engines: List[UCCIEngine] = []
+
+        self.output = None
+        self.checkpoint = None
+        self.stats = {}
+        self.start_time = 0.0
+
+    def run(self, paths: Iterable[str], output_path: str,
+            checkpoint_path: str = None, resume: bool = True) -> dict:
+        """
+        Phân tích mọi ván trong các file paths (gọi từ thread khác thread của loop)
+
+        Args:
+            paths: Các file ván cờ (xem src/core/game_file)
+            output_path: File JSONL kết quả
+            checkpoint_path: File checkpoint (None = không checkpoint)
+            resume: Tiếp tục từ checkpoint nếu có
+
+        Returns:
+            dict: Thống kê {'games', 'skipped', 'errors', 'positions', 'elapsed', 'classes'}
+        """
+        future = self.loop.submit(self.run_async(paths, output_path, checkpoint_path, resume))
+        try:
+            return future.result()
+        except KeyboardInterrupt:
+            future.cancel()
+            self.loop.run(self._stop_engines())
+            raise
+
+    async def run_async(self, paths: Iterable[str], output_path: str,
+                        checkpoint_path: str = None, resume: bool = True) -> dict:
+        """Phân tích hàng loạt (chạy trong loop)"""
+        done, offset = load_checkpoint(checkpoint_path) if resume else (set(), 0)
+        self.stats = {'games': 0, 'skipped': 0, 'errors': 0, 'positions': 0,
+                      'elapsed': 0.0, 'classes': {label: 0 for label in self.thresholds}}
+        self.start_time = time.monotonic()
+
+        if not await self._start_engines():
+            raise RuntimeError(f"Không khởi động được engine: {self.engine_path}")
+
+        self._open_output(output_path, checkpoint_path, done, offset)
+        try:
+            queue = asyncio.Queue(maxsize=2 * len(self.engines))
+            producer = asyncio.ensure_future(self._produce(paths, done, queue))
+            workers = [asyncio.ensure_future(self._work(AnalysisEngine(engine), queue))
+                       for engine in self.engines]
+            await asyncio.gather(*workers)
+            if not producer.done():
+                # Mọi engine đã thoát, các ván dở sẽ được phân tích lại khi resume
+                print("❌ Batch annotator: tất cả engine đã dừng, dừng phân tích")
+                producer.cancel()
+            else:
+                producer.result()
+        finally:
+            self._close_output()
+            await self._stop_engines()
+
+        self.stats['elapsed'] = time.monotonic() - self.start_time
+        return self.stats
+
+    async def _start_engines(self) -> bool:
+        async def start():
+            engine = UCCIEngine(self.engine_path, "auto", self.loop,
+                                self.handshake_timeout, self.options)
+            engine.echo = False
+            if not await engine.start_async():
+                return None
+            if not await engine.wait_ready():
+                print(f"⚠️ Batch annotator: {os.path.basename(self.engine_path)} no "
+                      f"readyok within {engine.handshake_timeout}s, continuing anyway")
+            return engine
+
+        engines = await asyncio.gather(*(start() for _ in range(self.engine_count)))
+        self.engines = [engine for engine in engines if engine is not None]
+        if self.engines:
+            print(f"🚀 Batch annotator: {len(self.engines)} engine "
+                  f"{os.path.basename(self.engine_path)} ({self.options})")
+        return bool(self.engines)
+
+    async def _stop_engines(self):
+        engines, self.engines = self.engines, []
+        await asyncio.gather(*(engine.stop_async() for engine in engines),
+                             return_exceptions=True)
+
+    def _open_output(self, output_path: str, checkpoint_path: str, done: set, offset: int):
+        if done and os.path.exists(output_path):
+            # Bỏ phần output của ván đang ghi dở lúc bị ngắt
+            with open(output_path, 'r+b') as f:
+                f.truncate(offset)
+            self.output = open(output_path, 'a', encoding='utf-8')
+            print(f"♻️ Batch annotator: resume, bỏ qua {len(done)} ván đã xong")
+        else:
+            self.output = open(output_path, 'w', encoding='utf-8')
+        if checkpoint_path:
+            if done:
+                # Bỏ dòng checkpoint ghi dở (nếu có) trước khi ghi tiếp
+                with open(checkpoint_path, 'r+b') as f:
+                    data = f.read()
+                    f.truncate(data.rfind(b"\n") + 1)
+            self.checkpoint = open(checkpoint_path, 'a' if done else 'w', encoding='utf-8')
+
+    def _close_output(self):
+        for f in (self.output, self.checkpoint):
+            if f is not None:
+                f.close()
+        self.output = None
+        self.checkpoint = None
+
+    async def _produce(self, paths: Iterable[str], done: set, queue: asyncio.Queue):
+        """Đọc lần lượt các ván và đưa từng position vào hàng đợi"""
+        for path in paths:
+            for game in iter_games(path):
+                if game['id'] in done:
+                    self.stats['skipped'] += 1
+                    continue
+
+                error = game.get('error')
+                terminal = False
+                if error is None:
+                    try:
+                        terminal = prepare_game(game)
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    print(f"⚠️ Batch annotator: bỏ qua {game['id']}: {error}")
+                    self.stats['errors'] += 1
+                    self._write_game(game['id'], [{'game': game['id'], 'error': error}])
+                    continue
+
+                plies = len(game['moves']) + 1
+                job = {'game': game, 'results': [None] * plies, 'remaining': plies}
+                if terminal:
+                    # Vị trí cuối không còn nước đi: không cần hỏi engine
+                    job['results'][-1] = {'score': -MATE_SCORE, 'bestmove': None,
+                                          'pv': [], 'depth': 0}
+                    job['remaining'] -= 1
+                    plies -= 1
+                for ply in range(plies):
+                    await queue.put((job, ply))
+
+        for _ in self.engines:
+            await queue.put(None)
+
+    async def _work(self, analysis: AnalysisEngine, queue: asyncio.Queue):
+        """Worker của 1 engine: phân tích position trong hàng đợi tới khi hết"""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            job, ply = item
+            game = job['game']
+            try:
+                result = await analysis.analyse(game['fen'], game['moves'][:ply],
+                                                self.depth, self.movetime)
+            except RuntimeError as e:
+                print(f"❌ Batch annotator: {e}, trả position về hàng đợi")
+                await queue.put(item)
+                return
+
+            self.stats['positions'] += 1
+            job['results'][ply] = result
+            job['remaining'] -= 1
+            if job['remaining'] == 0:
+                self._finish_game(job)
+
+    def _finish_game(self, job: dict):
+        game = job['game']
+        records = annotate_moves(game, job['results'], self.thresholds)
+        self._write_game(game['id'], records)
+
+        self.stats['games'] += 1
+        counts = self.stats['classes']
+        for record in records:
+            if record['class']:
+                counts[record['class']] = counts.get(record['class'], 0) + 1
+
+        rate = self.stats['positions'] / max(1e-9, time.monotonic() - self.start_time)
+        blunders = sum(1 for record in records if record['class'] == 'blunder')
+        print(f"✅ {game['id']}: {len(records)} nước, {blunders} blunder "
+              f"({self.stats['games']} ván, {rate:.1f} position/s)")
+
+    def _write_game(self, game_id: str, records: List[dict]):
+        """Ghi record của 1 ván rồi ghi checkpoint (sau khi output đã flush)"""
+        for record in records:
+            self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.output.flush()
+        if self.checkpoint is not None:
+            entry = {'game': game_id, 'offset': self.output.tell()}
+            self.checkpoint.write(json.dumps(entry) + "\n")
+            self.checkpoint.flush()
@@ -0,0 +1,659 @@
+# -*- coding: utf-8 -*-
+"""
+Built-in Engine cho Xiangqi
+Engine tìm kiếm viết bằng Python chạy ngay trong tiến trình GUI: iterative
+deepening, alpha-beta, bảng chuyển vị, sắp xếp nước theo killer/history và
+hàm đánh giá vật chất + bảng vị trí (PST)
+
+Dùng làm phương án dự phòng khi chưa cấu hình engine ngoài hoặc engine ngoài
+còn đang dò giao thức; kết quả có cùng dạng dict với EngineWorker.last_result.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from ..core.game_state import GameState
+from ..core.move_tables import BOARD_SIZE, SQUARE_COORDS
+from ..core.perft import (START_FEN, engine_notation_to_move,
+                          move_to_engine_notation)
+from ..core.position import (RED, KING, ADVISOR, ELEPHANT, HORSE, ROOK,
+                             CANNON, PAWN, BLACK_FLAG)
+
+BUILTIN_ENGINE_NAME = "Built-in"
+BUILTIN_PROTOCOL = "builtin"
+
+# Điểm chiếu bí (trừ đi số ply để ưu tiên chiếu bí nhanh)
+MATE_SCORE = 30000
+MATE_BOUND = MATE_SCORE - 1000
+INFINITY = 32000
+
+MAX_PLY = 64
+DEFAULT_MAX_DEPTH = 32
+
+# Thời gian tối đa cho 1 lần lấy gợi ý (giây)
+HINT_TIME_LIMIT = 1.5
+
+# Số entry tối đa của bảng chuyển vị trước khi xóa làm lại
+TT_MAX_ENTRIES = 1 << 18
+
+# Cờ của entry trong bảng chuyển vị
+TT_EXACT = 0
+TT_LOWER = 1
+TT_UPPER = 2
+
+# Giá trị quân (centipawn)
+PIECE_VALUES = {
+    KING: 0,
+    ADVISOR: 120,
+    ELEPHANT: 120,
+    HORSE: 270,
+    ROOK: 600,
+    CANNON: 285,
+    PAWN: 30,
+}
+
+# Bảng vị trí nhìn từ phía Đỏ (hàng 0 là đáy bên Đen, hàng 9 là đáy bên Đỏ)
+_ZERO_ROW = (0, 0, 0, 0, 0, 0, 0, 0, 0)
+
+PIECE_SQUARE_TABLES = {
+    KING: (
+        _ZERO_ROW, _ZERO_ROW, _ZERO_ROW, _ZERO_ROW, _ZERO_ROW,
+        _ZERO_ROW, _ZERO_ROW,
+        (0, 0, 0, -15, -15, -15, 0, 0, 0),
+        (0, 0, 0, -8, -8, -8, 0, 0, 0),
+        (0, 0, 0, 1, 5, 1, 0, 0, 0),
+    ),
+    ADVISOR: (
+        _ZERO_ROW, _ZERO_ROW, _ZERO_ROW, _ZERO_ROW, _ZERO_ROW,
+        _ZERO_ROW, _ZERO_ROW,
+        (0, 0, 0, -2, 0, -2, 0, 0, 0),
+        (0, 0, 0, 0, 3, 0, 0, 0, 0),
+        _ZERO_ROW,
+    ),
+    ELEPHANT: (
+        _ZERO_ROW, _ZERO_ROW, _ZERO_ROW, _ZERO_ROW, _ZERO_ROW,
+        (0, 0, -2, 0, 0, 0, -2, 0, 0),
+        _ZERO_ROW,
+        (-2, 0, 0, 0, 3, 0, 0, 0, -2),
+        _ZERO_ROW,
+        _ZERO_ROW,
+    ),
+    HORSE: (
+        (4, 8, 16, 12, 4, 12, 16, 8, 4),
+        (4, 10, 28, 16, 8, 16, 28, 10, 4),
+        (12, 14, 16, 20, 18, 20, 16, 14, 12),
+        (8, 24, 18, 24, 20, 24, 18, 24, 8),
+        (6, 16, 14, 18, 16, 18, 14, 16, 6),
+        (4, 12, 16, 14, 12, 14, 16, 12, 4),
+        (2, 6, 8, 6, 10, 6, 8, 6, 2),
+        (4, 2, 8, 8, 4, 8, 8, 2, 4),
+        (0, 2, 4, 4, -2, 4, 4, 2, 0),
+        (0, -4, 0, 0, 0, 0, 0, -4, 0),
+    ),
+    ROOK: (
+        (14, 14, 12, 18, 16, 18, 12, 14, 14),
+        (16, 20, 18, 24, 26, 24, 18, 20, 16),
+        (12, 12, 12, 18, 18, 18, 12, 12, 12),
+        (12, 18, 16, 22, 22, 22, 16, 18, 12),
+        (12, 14, 12, 18, 18, 18, 12, 14, 12),
+        (12, 16, 14, 20, 20, 20, 14, 16, 12),
+        (6, 10, 8, 14, 14, 14, 8, 10, 6),
+        (4, 8, 6, 14, 12, 14, 6, 8, 4),
+        (8, 4, 8, 16, 8, 16, 8, 4, 8),
+        (-2, 10, 6, 14, 12, 14, 6, 10, -2),
+    ),
+    CANNON: (
+        (6, 4, 0, -10, -12, -10, 0, 4, 6),
+        (2, 2, 0, -4, -14, -4, 0, 2, 2),
+        (2, 2, 0, -10, -8, -10, 0, 2, 2),
+        (0, 0, -2, 4, 10, 4, -2, 0, 0),
+        (0, 0, 0, 2, 8, 2, 0, 0, 0),
+        (-2, 0, 4, 2, 6, 2, 4, 0, -2),
+        (0, 0, 0, 2, 4, 2, 0, 0, 0),
+        (4, 0, 8, 6, 10, 6, 8, 0, 4),
+        (0, 2, 4, 6, 6, 6, 4, 2, 0),
+        (0, 0, 2, 6, 6, 6, 2, 0, 0),
+    ),
+    PAWN: (
+        (0, 3, 6, 9, 12, 9, 6, 3, 0),
+        (18, 36, 56, 80, 120, 80, 56, 36, 18),
+        (14, 26, 42, 60, 80, 60, 42, 26, 14),
+        (10, 20, 30, 34, 40, 34, 30, 20, 10),
+        (6, 12, 18, 18, 20, 18, 18, 12, 6),
+        (2, 0, 8, 0, 8, 0, 8, 0, 2),
+        (0, 0, -2, 0, 4, 0, -2, 0, 0),
+        _ZERO_ROW, _ZERO_ROW, _ZERO_ROW,
+    ),
+}
+
+
+def _build_score_table():
+    """SCORE[code][sq]: điểm quân tại ô theo góc nhìn Đỏ (quân Đen mang dấu âm)"""
+    table = [[0] * BOARD_SIZE for _ in range(16)]
+    for kind, pst in PIECE_SQUARE_TABLES.items():
+        value = PIECE_VALUES[kind]
+        for sq, (row, col) in enumerate(SQUARE_COORDS):
+            table[kind][sq] = value + pst[row][col]
+            table[kind | BLACK_FLAG][sq] = -(value + pst[9 - row][col])
+    return tuple(tuple(row) for row in table)
+
+
+SCORE = _build_score_table()
+
+# Giá trị dùng cho MVV-LVA
+_ORDER_VALUES = (0, 7, 2, 2, 4, 6, 5, 1)
+
+
+class BuiltinEngine:
+    """
+    Engine alpha-beta thuần Python trên Position
+
+    search() chạy đồng bộ; stop() có thể gọi từ thread khác để dừng sớm,
+    kết quả là độ sâu cuối cùng đã tìm xong.
+    """
+
+    def __init__(self):
+        self.position = None
+        # Khóa các position đã xuất hiện trong ván trước position gốc (xử lặp)
+        self.game_keys = set()
+        self.tt = {}
+        self.history = [0] * (BOARD_SIZE * BOARD_SIZE)
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.nodes = 0
+        self.stopped = False
+        self.deadline = None
+        self.node_limit = None
+        self.set_position(START_FEN)
+
+    def set_position(self, fen: str, moves: List[str] = None) -> bool:
+        """
+        Đặt position gốc từ FEN và danh sách nước dạng engine
+
+        Returns:
+            bool: True nếu FEN và mọi nước đều hợp lệ
+        """
+        state = GameState(verbose=False)
+        if not state.load_from_fen(fen):
+            return False
+
+        position = state.position.copy()
+        keys = set()
+        for notation in moves or []:
+            try:
+                move = engine_notation_to_move(notation)
+            except ValueError as e:
+                print(f"❌ Built-in engine: {e}")
+                return False
+            if move not in position.legal_moves():
+                print(f"❌ Built-in engine: nước đi không hợp lệ {notation}")
+                return False
+            keys.add(position.key)
+            position.apply(move)
+
+        self.position = position
+        self.game_keys = keys
+        return True
+
+    def new_game(self):
+        """Xóa bảng chuyển vị và bảng sắp xếp nước"""
+        self.tt.clear()
+        self.history = [0] * (BOARD_SIZE * BOARD_SIZE)
+
+    def stop(self):
+        """Yêu cầu dừng tìm kiếm (an toàn khi gọi từ thread khác)"""
+        self.stopped = True
+
+    # ------------------------------------------------------------------
+    # Tìm kiếm
+    # ------------------------------------------------------------------
+
+    def search(self, max_depth: int = DEFAULT_MAX_DEPTH, movetime: float = None,
+               node_limit: int = None,
+               on_iteration: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Iterative deepening tới max_depth hoặc khi hết thời gian/node
+
+        Args:
+            max_depth: Độ sâu tối đa
+            movetime: Giới hạn thời gian (giây), None = không giới hạn
+            node_limit: Giới hạn số node, None = không giới hạn
+            on_iteration: Gọi với dict kết quả sau mỗi độ sâu tìm xong
+
+        Returns:
+            dict: Cùng dạng EngineWorker.last_result
+        """
+        self.stopped = False
+        self.nodes = 0
+        self.deadline = time.monotonic() + movetime if movetime else None
+        self.node_limit = node_limit
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [value >> 2 for value in self.history]
+        if len(self.tt) > TT_MAX_ENTRIES:
+            self.tt.clear()
+
+        position = self.position
+        result = self._make_result(0, 0, [])
+        if not position.legal_moves():
+            # Hết nước đi là thua (cờ tướng không có hòa pat)
+            result['evaluation'] = float('-inf')
+            return result
+
+        start = time.monotonic()
+        score = self._static_score()
+        for depth in range(1, max(1, min(max_depth, MAX_PLY)) + 1):
+            value = self._alpha_beta(depth, -INFINITY, INFINITY, 0, score, set())
+            if self.stopped and depth > 1:
+                break  # Bỏ kết quả độ sâu chưa tìm xong
+
+            pv = self._extract_pv(depth)
+            result = self._make_result(depth, value, pv)
+            elapsed = time.monotonic() - start
+            print(f"🧠 {BUILTIN_ENGINE_NAME}: depth {depth} score {value} "
+                  f"nodes {self.nodes} ({elapsed:.2f}s) pv {' '.join(pv[:5])}")
+            if on_iteration:
+                on_iteration(result)
+
+            if self.stopped or abs(value) >= MATE_BOUND:
+                break
+            if self.deadline and elapsed * 2 > self.deadline - start:
+                break  # Độ sâu tiếp theo chắc chắn không kịp
+
+        return result
+
+    def _make_result(self, depth, score, pv):
+        if score >= MATE_BOUND:
+            evaluation = float('inf')
+        elif score <= -MATE_BOUND:
+            evaluation = float('-inf')
+        else:
+            evaluation = score / 100.0
+        return {
+            'bestmove': pv[0] if pv else None,
+            'ponder': pv[1] if len(pv) > 1 else None,
+            'evaluation': evaluation,
+            'depth': depth,
+            'nodes': self.nodes,
+            'pv': pv,
+            'protocol': BUILTIN_PROTOCOL,
+            'status': 'ready',
+            'generation': 0
+        }
+
+    def _static_score(self):
+        """Điểm vật chất + PST theo góc nhìn Đỏ"""
+        squares = self.position.squares
+        return sum(SCORE[code][sq] for sq, code in enumerate(squares) if code)
+
+    def _check_limits(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.stopped = True
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+
+    def _alpha_beta(self, depth, alpha, beta, ply, score, path):
+        """
+        Negamax alpha-beta
+
+        Args:
+            score: Điểm tĩnh theo góc nhìn Đỏ, cập nhật tăng dần theo nước đi
+            path: Khóa các position trên đường tìm kiếm (xử lặp là hòa)
+        """
+        position = self.position
+        in_check = position.is_in_check()
+        if in_check:
+            depth += 1  # Mở rộng khi bị chiếu
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiesce(alpha, beta, ply, score)
+
+        self.nodes += 1
+        if not self.nodes & 1023:
+            self._check_limits()
+        if self.stopped:
+            return 0
+
+        key = position.key
+        if ply and (key in path or key in self.game_keys):
+            return 0
+
+        tt_move = None
+        entry = self.tt.get(key)
+        if entry is not None:
+            entry_depth, flag, entry_score, tt_move = entry
+            if ply and entry_depth >= depth:
+                entry_score = self._score_from_tt(entry_score, ply)
+                if (flag == TT_EXACT
+                        or (flag == TT_LOWER and entry_score >= beta)
+                        or (flag == TT_UPPER and entry_score <= alpha)):
+                    return entry_score
+
+        moves = position.legal_moves()
+        if not moves:
+            return -MATE_SCORE + ply
+
+        self._order_moves(moves, tt_move, ply)
+        squares = position.squares
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        path.add(key)
+
+        for move in moves:
+            from_sq, to_sq = move
+            code = squares[from_sq]
+            captured = position.apply(move)
+            child_score = (score + SCORE[code][to_sq] - SCORE[code][from_sq]
+                           - SCORE[captured][to_sq])
+            value = -self._alpha_beta(depth - 1, -beta, -alpha, ply + 1,
+                                      child_score, path)
+            position.unapply(move, captured)
+            if self.stopped:
+                break
+
+            if value > best_score:
+                best_score = value
+                best_move = move
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        if not captured:
+                            self._update_quiet_stats(move, depth, ply)
+                        break
+
+        path.discard(key)
+        if self.stopped and best_move is None:
+            return 0
+
+        if not self.stopped:
+            if best_score <= original_alpha:
+                flag = TT_UPPER
+            elif best_score >= beta:
+                flag = TT_LOWER
+            else:
+                flag = TT_EXACT
+            self.tt[key] = (depth, flag, self._score_to_tt(best_score, ply), best_move)
+        return best_score
+
+    def _quiesce(self, alpha, beta, ply, score):
+        """Chỉ xét nước bắt quân (hoặc mọi nước khi bị chiếu) tới khi yên tĩnh"""
+        self.nodes += 1
+        if not self.nodes & 1023:
+            self._check_limits()
+        if self.stopped:
+            return 0
+
+        position = self.position
+        side = position.side
+        stand_pat = score if side == RED else -score
+        if ply >= MAX_PLY:
+            return stand_pat
+
+        in_check = position.is_in_check()
+        if not in_check:
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+
+        squares = position.squares
+        if in_check:
+            moves = position.legal_moves()
+            if not moves:
+                return -MATE_SCORE + ply
+        else:
+            moves = [move for move in position.pseudo_legal_moves(side)
+                     if squares[move[1]]]
+        moves.sort(key=lambda move: _ORDER_VALUES[squares[move[1]] & 7] * 8
+                   - _ORDER_VALUES[squares[move[0]] & 7], reverse=True)
+
+        best_score = stand_pat if not in_check else -INFINITY
+        for move in moves:
+            from_sq, to_sq = move
+            code = squares[from_sq]
+            captured = position.apply(move)
+            if not in_check and position.is_in_check(side):
+                position.unapply(move, captured)
+                continue
+            child_score = (score + SCORE[code][to_sq] - SCORE[code][from_sq]
+                           - SCORE[captured][to_sq])
+            value = -self._quiesce(-beta, -alpha, ply + 1, child_score)
+            position.unapply(move, captured)
+            if self.stopped:
+                break
+
+            if value > best_score:
+                best_score = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _order_moves(self, moves, tt_move, ply):
+        """Sắp xếp tại chỗ: nước TT, bắt quân (MVV-LVA), killer, history"""
+        squares = self.position.squares
+        first_killer, second_killer = self.killers[ply]
+        history = self.history
+
+        def priority(move):
+            if move == tt_move:
+                return 1 << 30
+            from_sq, to_sq = move
+            captured = squares[to_sq]
+            if captured:
+                return ((1 << 24) + _ORDER_VALUES[captured & 7] * 16
+                        - _ORDER_VALUES[squares[from_sq] & 7])
+            if move == first_killer:
+                return (1 << 22) + 1
+            if move == second_killer:
+                return 1 << 22
+            return min(history[from_sq * BOARD_SIZE + to_sq], (1 << 22) - 1)
+
+        moves.sort(key=priority, reverse=True)
+
+    def _update_quiet_stats(self, move, depth, ply):
+        """Ghi nhận nước yên tĩnh gây cắt tỉa beta vào killer/history"""
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[move[0] * BOARD_SIZE + move[1]] += depth * depth
+
+    @staticmethod
+    def _score_to_tt(score, ply):
+        # Điểm chiếu bí lưu theo khoảng cách từ node hiện tại
+        if score >= MATE_BOUND:
+            return score + ply
+        if score <= -MATE_BOUND:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_tt(score, ply):
+        if score >= MATE_BOUND:
+            return score - ply
+        if score <= -MATE_BOUND:
+            return score + ply
+        return score
+
+    def _extract_pv(self, max_length):
+        """Dựng biến chính bằng cách đi theo nước tốt nhất trong bảng chuyển vị"""
+        position = self.position
+        played = []
+        seen = set()
+        while len(played) < max_length and position.key not in seen:
+            seen.add(position.key)
+            entry = self.tt.get(position.key)
+            if entry is None or entry[3] is None or entry[3] not in position.legal_moves():
+                break
+            move = entry[3]
+            played.append((move, position.apply(move)))
+
+        pv = [move_to_engine_notation(move) for move, _ in played]
+        for move, captured in reversed(played):
+            position.unapply(move, captured)
+        return pv
+
+
+class BuiltinEngineWorker(threading.Thread):
+    """Worker chạy BuiltinEngine, cùng giao diện lệnh/kết quả với EngineWorker"""
+
+    def __init__(self, engine_name: str = BUILTIN_ENGINE_NAME,
+                 result_callback: Callable = None):
+        super().__init__(daemon=True)
+        self.engine_name = engine_name
+        # Đổi mã nguồn engine thì kết quả cache cũ hết hiệu lực
+        self.engine_path = __file__
+        self.result_callback = result_callback
+
+        self.running = True
+        self.command_queue = queue.Queue()
+
+        self.engine = BuiltinEngine()
+        self.search_thread = None
+
+        self.last_result = {
+            'bestmove': None,
+            'ponder': None,
+            'evaluation': 0.0,
+            'depth': 0,
+            'nodes': 0,
+            'pv': [],
+            'protocol': BUILTIN_PROTOCOL,
+            'status': 'ready',
+            'generation': 0,
+            # Khóa Zobrist của position đã search (khóa lưu analysis cache)
+            'key': None
+        }
+        self.result_lock = threading.Lock()
+
+        # Độ sâu của kết quả lấy từ analysis cache cho position hiện tại
+        self.cached_depth = 0
+        self.generation = 0
+
+        print(f"📱 Created built-in worker: {engine_name}")
+
+    def run(self):
+        """Vòng lặp xử lý lệnh (search chạy ở thread riêng để dừng được)"""
+        try:
+            while self.running:
+                command = self.command_queue.get()
+                try:
+                    self._process_command(command)
+                except Exception as e:
+                    print(f"❌ Error processing command for {self.engine_name}: {e}")
+        finally:
+            self._stop_search()
+            print(f"🧹 Cleaned up worker for {self.engine_name}")
+
+    def _process_command(self, command: dict):
+        cmd_type = command.get('type')
+
+        if cmd_type == 'set_position':
+            was_analyzing = self.last_result.get('status') == 'analyzing'
+            self._stop_search()
+            if self.engine.set_position(command.get('fen'), command.get('moves', [])):
+                with self.result_lock:
+                    self.last_result.update({'bestmove': None, 'ponder': None,
+                                             'evaluation': 0.0, 'depth': 0,
+                                             'nodes': 0, 'pv': [],
+                                             'key': None})
+                print(f"📍 {self.engine_name}: Set position")
+
+                cached = command.get('cached')
+                self.cached_depth = cached['depth'] if cached else 0
+                if cached:
+                    with self.result_lock:
+                        self.last_result.update(cached)
+                        self.last_result['key'] = self.engine.position.key
+                    self._send_result_update()
+                if was_analyzing:
+                    self._start_search('analyzing')
+
+        elif cmd_type == 'get_hint' and command.get('depth', 8) <= self.cached_depth:
+            print(f"💾 {self.engine_name}: Hint from cache (depth {self.cached_depth})")
+            self._send_result_update()
+
+        elif cmd_type == 'get_hint':
+            self._start_search('thinking', max_depth=command.get('depth', 8),
+                               movetime=HINT_TIME_LIMIT)
+            print(f"🤖 {self.engine_name}: Requested hint "
+                  f"(depth {command.get('depth', 8)}, {HINT_TIME_LIMIT}s)")
+
+        elif cmd_type == 'start_analysis':
+            self._start_search('analyzing')
+            print(f"🔍 {self.engine_name}: Started analysis")
+
+        elif cmd_type == 'stop_analysis':
+            self._stop_search()
+            with self.result_lock:
+                self.last_result['status'] = 'ready'
+            print(f"⏹️ {self.engine_name}: Stopped analysis")
+
+        elif cmd_type == 'stop':
+            self.running = False
+
+    def _start_search(self, status, max_depth=DEFAULT_MAX_DEPTH, movetime=None):
+        self._stop_search()
+        self.generation += 1
+        with self.result_lock:
+            self.last_result['status'] = status
+        self.search_thread = threading.Thread(
+            target=self._search,
+            args=(status, max_depth, movetime, self.generation, self.engine.position.key),
+            daemon=True)
+        self.search_thread.start()
+
+    def _stop_search(self):
+        if self.search_thread is not None:
+            self.engine.stop()
+            self.search_thread.join()
+            self.search_thread = None
+
+    def _search(self, status, max_depth, movetime, generation, key):
+        def on_iteration(result):
+            if result['depth'] <= self.cached_depth:
+                return  # Chưa sâu hơn kết quả đã cache
+            with self.result_lock:
+                self.last_result.update(result)
+                self.last_result['status'] = status
+                self.last_result['generation'] = generation
+                self.last_result['key'] = key
+            self._send_result_update()
+
+        try:
+            self.engine.search(max_depth, movetime, on_iteration=on_iteration)
+        except Exception as e:
+            print(f"❌ Error in built-in search: {e}")
+
+        # Gợi ý xong thì về 'ready'; phân tích giữ 'analyzing' tới khi bị dừng
+        if status != 'analyzing':
+            with self.result_lock:
+                self.last_result['status'] = 'ready'
+            self._send_result_update()
+
+    def _send_result_update(self):
+        if self.result_callback:
+            with self.result_lock:
+                result_copy = self.last_result.copy()
+            self.result_callback(self.engine_name, result_copy)
+
+    def send_command(self, command: dict):
+        """Gửi lệnh cho worker"""
+        self.command_queue.put(command)
+
+    def get_result(self) -> dict:
+        """Kết quả hiện tại (thread-safe)"""
+        with self.result_lock:
+            return self.last_result.copy()
+
+    def is_ready(self) -> bool:
+        """Engine trong tiến trình luôn sẵn sàng"""
+        return True
+
+    def stop(self):
+        """Dừng worker"""
+        self.running = False
+        self.engine.stop()
+        self.send_command({'type': 'stop'})
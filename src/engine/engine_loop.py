@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Engine Loop cho Xiangqi
+Một event loop asyncio duy nhất chạy trong 1 thread riêng, phục vụ I/O của
+mọi engine (đọc stdout, gửi lệnh, hàng đợi lệnh của worker, hẹn giờ)
+
+GUI Qt gọi vào loop qua submit()/call_soon(); kết quả quay về GUI qua
+pyqtSignal (queued connection) như trước.
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import sys
+import threading
+from typing import Any, Callable, Coroutine, Optional
+
+
+class EngineLoop:
+    """Event loop asyncio chạy trong 1 daemon thread"""
+
+    def __init__(self, name: str = "engine-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+        self._started.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        _install_child_watcher(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+    def in_loop_thread(self) -> bool:
+        """Đang chạy trong thread của loop"""
+        return threading.get_ident() == self.thread.ident
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Chạy coroutine trên loop, trả về Future dùng được từ thread khác"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Chạy coroutine và chờ kết quả (không gọi từ thread của loop)"""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("EngineLoop.run() không được gọi từ thread của loop")
+        return self.submit(coro).result(timeout)
+
+    def call_soon(self, callback: Callable, *args):
+        """Gọi callback trong thread của loop (gọi ngay nếu đang ở trong loop)"""
+        if self.in_loop_thread():
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+
+def _install_child_watcher(loop):
+    """
+    Python < 3.12 mặc định dùng ThreadedChildWatcher (1 thread cho mỗi
+    subprocess); dùng pidfd để theo dõi mọi engine ngay trong loop
+    """
+    if sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    try:
+        watcher = asyncio.PidfdChildWatcher()
+        watcher.attach_loop(loop)
+        asyncio.set_child_watcher(watcher)
+    except (AttributeError, OSError, NotImplementedError) as e:
+        print(f"⚠️ Engine loop: pidfd child watcher unavailable ({e})")
+
+
+_engine_loop = None
+_engine_loop_lock = threading.Lock()
+
+
+def get_engine_loop() -> EngineLoop:
+    """EngineLoop dùng chung của ứng dụng (tạo khi dùng lần đầu)"""
+    global _engine_loop
+    with _engine_loop_lock:
+        if _engine_loop is None:
+            _engine_loop = EngineLoop()
+        return _engine_loop
+
+
+# Tần suất tối đa gửi kết quả engine lên GUI (lần/giây)
+DEFAULT_UPDATE_RATE = 20.0
+
+
+class UpdateCoalescer:
+    """
+    Gộp các yêu cầu cập nhật: gọi flush tối đa max_rate lần/giây
+
+    flush đọc trạng thái mới nhất tại thời điểm gọi nên các bản trung gian
+    bị bỏ qua; force=True (đổi depth, bestmove...) gọi ngay lập tức.
+    Chỉ dùng trong thread của loop.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, flush: Callable,
+                 max_rate: float = DEFAULT_UPDATE_RATE):
+        self.loop = loop
+        self.flush = flush
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.last_flush = float('-inf')
+        self.timer = None
+
+    def request(self, force: bool = False):
+        """Yêu cầu cập nhật (gộp với yêu cầu đang chờ nếu có)"""
+        due = self.last_flush + self.interval
+        if force or self.loop.time() >= due:
+            self._flush()
+        elif self.timer is None:
+            self.timer = self.loop.call_at(due, self._flush)
+
+    def cancel(self):
+        """Bỏ cập nhật đang chờ"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def _flush(self):
+        self.cancel()
+        self.last_flush = self.loop.time()
+        self.flush()
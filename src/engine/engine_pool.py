@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Engine Pool cho Xiangqi
+Giữ sẵn các process engine đã handshake xong (warm standby) theo binary và bộ
+option, để thêm/bỏ engine không phải khởi động lại process và nạp lại NNUE
+
+- acquire: lấy engine rảnh (ưu tiên engine có đúng bộ option, nếu không thì
+  chỉ gửi các option khác), hết engine rảnh thì khởi động mới; sau đó bổ sung
+  engine dự phòng chạy nền cho lần sau
+- release: dừng search, ucinewgame/uccinewgame, xóa hash rồi trả về pool
+- Engine dự phòng/rảnh chỉ giữ Threads/Hash tối thiểu (IDLE_RESOURCES), giá
+  trị thật gửi lại khi acquire, nên không vượt ngân sách RAM/core của
+  split_resources (chỉ tính các engine đang dùng)
+
+Mọi hàm async chạy trên EngineLoop dùng chung.
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+from .engine_loop import EngineLoop, get_engine_loop
+from .ucci_protocol import UCCIEngine, HANDSHAKE_TIMEOUT, option_key
+
+# Số engine dự phòng giữ sẵn cho mỗi binary đang dùng
+DEFAULT_STANDBY = 1
+
+# Số engine rảnh tối đa giữ lại cho mỗi binary
+DEFAULT_MAX_IDLE = 2
+
+# Tài nguyên của engine dự phòng/rảnh (giá trị spin được kẹp lên min của engine)
+IDLE_RESOURCES = {'threads': 1, 'hash': 1}
+
+
+def idle_options(options: Dict[str, object]) -> Dict[str, object]:
+    """options với Threads/Hash hạ xuống IDLE_RESOURCES (giữ nguyên tên option)"""
+    return {name: IDLE_RESOURCES.get(option_key(name), value)
+            for name, value in options.items()}
+
+
+class EnginePool:
+    """Pool process engine đã handshake, phân theo binary (đường dẫn thật)"""
+
+    def __init__(self, loop: EngineLoop = None, standby: int = DEFAULT_STANDBY,
+                 max_idle: int = DEFAULT_MAX_IDLE,
+                 handshake_timeout: float = HANDSHAKE_TIMEOUT):
+        """
+        Args:
+            loop: EngineLoop chạy I/O (mặc định loop dùng chung)
+            standby: Số engine dự phòng khởi động sẵn sau mỗi lần acquire
+            max_idle: Số engine rảnh tối đa giữ lại cho mỗi binary
+            handshake_timeout: Thời gian chờ tối đa mỗi bước handshake (giây)
+        """
+        self.loop = loop or get_engine_loop()
+        self.standby = max(0, standby)
+        self.max_idle = max(self.standby, max_idle)
+        self.handshake_timeout = handshake_timeout
+        self.idle: Dict[str, List[UCCIEngine]] = {}
+        # Task khởi động engine dự phòng theo binary
+        self.warming: Dict[str, List[asyncio.Task]] = {}
+        self.closed = False
+
+    @staticmethod
+    def _binary_key(path: str) -> str:
+        return os.path.realpath(path)
+
+    async def acquire(self, path: str, options: Dict[str, object] = None,
+                      handshake_timeout: float = None) -> Optional[UCCIEngine]:
+        """
+        Lấy engine đã sẵn sàng cho binary path với bộ option options
+
+        Returns:
+            UCCIEngine hoặc None nếu không khởi động được engine
+        """
+        options = options or {}
+        key = self._binary_key(path)
+        engines = self.idle.setdefault(key, [])
+        engines[:] = [engine for engine in engines if engine.is_running]
+
+        engine = None
+        if engines:
+            # Engine cần đổi ít option nhất (0 = đúng bộ option)
+            engine = min(reversed(engines),
+                         key=lambda candidate: len(candidate.changed_options(options)))
+            engines.remove(engine)
+            applied = engine.apply_options(options)
+            if applied:
+                await engine.synchronize()
+            print(f"♻️ Engine pool: reuse {os.path.basename(path)}"
+                  + (f" (options {applied})" if applied else ""))
+        else:
+            engine = await self._spawn(path, options, handshake_timeout)
+
+        self._refill(path, options)
+        return engine
+
+    async def release(self, engine: UCCIEngine):
+        """Trả engine về pool (dừng search, ván mới, xóa hash); dư thì tắt"""
+        engine.on_bestmove = None
+        engine.on_info = None
+        engine.on_ready = None
+        if not engine.is_running:
+            return
+
+        key = self._binary_key(engine.engine_path)
+        engines = self.idle.setdefault(key, [])
+        if self.closed or len(engines) >= self.max_idle:
+            await engine.stop_async()
+            return
+
+        engine.stop_search()
+        engine.new_game()
+        # Trả lại core/RAM khi rảnh (đổi Hash cũng xóa bảng hash)
+        shrink = {engine.options[key]['name']: value
+                  for key, value in IDLE_RESOURCES.items() if key in engine.options}
+        resized = {option_key(name) for name in engine.apply_options(shrink)}
+        if "hash" not in resized and "clear_hash" in engine.options:
+            engine.set_option("Clear Hash", None)
+        # Kiểm tra lại sau await: các engine khác có thể vừa được trả về
+        if (await engine.synchronize() and not self.closed
+                and len(engines) < self.max_idle):
+            engines.append(engine)
+            print(f"♻️ Engine pool: recycled {os.path.basename(engine.engine_path)} "
+                  f"({len(engines)} idle)")
+        else:
+            await engine.stop_async()
+
+    async def _spawn(self, path: str, options: Dict[str, object],
+                     handshake_timeout: float = None) -> Optional[UCCIEngine]:
+        """Khởi động engine mới và chờ handshake"""
+        engine = UCCIEngine(path, "auto", self.loop,
+                            handshake_timeout or self.handshake_timeout, options)
+        if not await engine.start_async():
+            return None
+        if not await engine.wait_ready():
+            print(f"⚠️ Engine pool: {os.path.basename(path)} no readyok within "
+                  f"{engine.handshake_timeout}s, continuing anyway")
+        return engine
+
+    def _refill(self, path: str, options: Dict[str, object]):
+        """Khởi động nền engine dự phòng cho đủ standby"""
+        key = self._binary_key(path)
+        warming = self.warming.setdefault(key, [])
+        warming[:] = [task for task in warming if not task.done()]
+        missing = self.standby - len(self.idle.get(key, [])) - len(warming)
+        for _ in range(max(0, missing)):
+            warming.append(asyncio.ensure_future(self._warm(path, idle_options(options))))
+
+    async def _warm(self, path: str, options: Dict[str, object]):
+        engine = await self._spawn(path, options)
+        if engine is None:
+            return
+        engines = self.idle.setdefault(self._binary_key(path), [])
+        if self.closed or len(engines) >= self.max_idle:
+            await engine.stop_async()
+        else:
+            engines.append(engine)
+            print(f"🔥 Engine pool: warm standby ready for {os.path.basename(path)}")
+
+    def idle_count(self, path: str = None) -> int:
+        """Số engine rảnh (của binary path, hoặc tất cả)"""
+        if path is not None:
+            return len(self.idle.get(self._binary_key(path), []))
+        return sum(len(engines) for engines in self.idle.values())
+
+    async def close_async(self):
+        """Tắt mọi engine rảnh và engine dự phòng đang khởi động"""
+        self.closed = True
+        tasks = [task for tasks in self.warming.values() for task in tasks]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        engines = [engine for engines in self.idle.values() for engine in engines]
+        self.idle.clear()
+        for engine in engines:
+            await engine.stop_async()
+
+    def close(self):
+        """Tắt pool (gọi từ thread khác thread của loop)"""
+        self.loop.run(self.close_async())
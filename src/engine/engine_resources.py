@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Engine Resources cho Xiangqi
+Chia số core và RAM của máy cho các engine đang chạy đồng thời (Threads/Hash)
+và gộp với option cấu hình trong config/engines.json
+
+engine_settings trong config/engines.json:
+    "options": {...}            option chung cho mọi engine
+    "resources": {
+        "auto": true,           tự chia Threads/Hash theo số engine
+        "reserve_cores": 1,     số core để lại cho GUI
+        "memory_fraction": 0.25 tỉ lệ RAM dành cho hash của tất cả engine
+        "min_hash_mb": 16, "max_hash_mb": 4096
+    }
+Mỗi engine trong "engines" có thể có "options" riêng (ưu tiên cao nhất).
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+DEFAULT_RESOURCE_POLICY = {
+    'auto': True,
+    'reserve_cores': 1,
+    'memory_fraction': 0.25,
+    'min_hash_mb': 16,
+    'max_hash_mb': 4096
+}
+
+
+def total_memory_mb() -> Optional[int]:
+    """RAM vật lý của máy (MB), None nếu không đọc được"""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def available_cores() -> int:
+    """Số core process được phép dùng"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def split_resources(engine_count: int, policy: dict = None,
+                    cores: int = None, memory_mb: int = None) -> Dict[str, int]:
+    """
+    Threads/Hash cho mỗi engine khi engine_count engine chạy cùng lúc
+
+    Args:
+        engine_count: Số engine ngoài đang chạy
+        policy: Chính sách (mặc định DEFAULT_RESOURCE_POLICY)
+        cores: Số core (mặc định số core của máy)
+        memory_mb: RAM (MB) (mặc định RAM của máy)
+
+    Returns:
+        dict: {'Threads': n, 'Hash': mb} hoặc {} nếu tắt chế độ tự chia
+    """
+    policy = dict(DEFAULT_RESOURCE_POLICY, **(policy or {}))
+    if not policy['auto'] or engine_count <= 0:
+        return {}
+
+    if cores is None:
+        cores = available_cores()
+    threads = max(1, (cores - policy['reserve_cores']) // engine_count)
+    resources = {'Threads': threads}
+
+    if memory_mb is None:
+        memory_mb = total_memory_mb()
+    if memory_mb:
+        hash_mb = int(memory_mb * policy['memory_fraction']) // engine_count
+        hash_mb = min(policy['max_hash_mb'], hash_mb)
+        # Làm tròn xuống lũy thừa của 2 (kích thước bảng hash quen thuộc của engine)
+        if hash_mb >= 1:
+            hash_mb = 1 << (hash_mb.bit_length() - 1)
+        resources['Hash'] = max(policy['min_hash_mb'], hash_mb)
+
+    return resources
+
+
+def find_engine_config(engines_config: dict, name: str, path: str = None) -> dict:
+    """Mục cấu hình của engine trong engines.json (khớp đường dẫn trước, rồi tên)"""
+    engines = (engines_config or {}).get('engines', [])
+    if path:
+        real_path = os.path.realpath(path)
+        for engine in engines:
+            if engine.get('path') and os.path.realpath(engine['path']) == real_path:
+                return engine
+    for engine in engines:
+        if engine.get('name') == name:
+            return engine
+    return {}
+
+
+def engine_options(engines_config: dict, name: str, path: str = None,
+                   resources: Dict[str, int] = None) -> Dict[str, object]:
+    """
+    Option gửi cho engine: tài nguyên tự chia < option chung < option của engine
+
+    Args:
+        engines_config: Nội dung config/engines.json (Settings.load_engines_config)
+        name: Tên engine
+        path: Đường dẫn engine
+        resources: Kết quả split_resources
+    """
+    engine_settings = (engines_config or {}).get('engine_settings', {})
+    options = dict(resources or {})
+    options.update(engine_settings.get('options', {}))
+    options.update(find_engine_config(engines_config, name, path).get('options', {}))
+    return options
+
+
+def resolve_engine(engines_config: dict, engine: str = None) -> Tuple[str, str]:
+    """
+    Tên engine trong engines.json hoặc đường dẫn -> (tên, đường dẫn)
+
+    Mặc định là default_engine của engines.json
+
+    Raises:
+        ValueError: Không tìm thấy engine
+    """
+    engine = engine or (engines_config or {}).get('default_engine')
+    if engine and os.path.exists(engine):
+        entry = find_engine_config(engines_config, None, engine)
+        return entry.get('name') or os.path.basename(engine), engine
+    entry = find_engine_config(engines_config, engine)
+    if not entry.get('path'):
+        raise ValueError(f"Không tìm thấy engine: {engine}")
+    return entry['name'], entry['path']
+
+
+def parse_option_assignment(text: str) -> Tuple[str, str]:
+    """'Hash=64' -> ('Hash', '64') (cho tham số --option của CLI), ValueError nếu sai dạng"""
+    name, sep, value = text.partition('=')
+    if not sep or not name.strip():
+        raise ValueError(f"Option cần dạng NAME=VALUE: {text}")
+    return name.strip(), value.strip()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Info Parser cho Xiangqi
+Đọc các dòng 'info' / 'bestmove' của engine UCI/UCCI, chỉ lấy các trường
+được yêu cầu. Kết quả khớp cách parse cũ của EngineWorker
+
+Dùng chung cho EngineWorker, MultiEngineManager cũ trong ucci_protocol và
+BatchAnnotator. Không nhanh hơn cách parse cũ (split + duyệt token, chậm hơn
+~10% trên mẫu đi kèm); regex cả dòng hay str.find từng trường còn chậm hơn nữa.
+Benchmark: python benchmarks/info_parser_bench.py
+"""
+
+from typing import FrozenSet, Optional, Tuple
+
+# Các trường số nguyên dạng '<tên> <số>'
+INT_FIELDS = frozenset(('depth', 'seldepth', 'multipv', 'nodes', 'nps', 'time', 'hashfull'))
+
+# Mọi trường parse được ('score' gồm cả 'score cp', 'score mate' và UCCI 'score <n>')
+INFO_FIELDS = INT_FIELDS | {'score', 'pv'}
+
+# Các trường mà kết quả engine (depth, evaluation, nodes, pv, thứ hạng PV) dùng tới
+RESULT_INFO_FIELDS = frozenset(('depth', 'multipv', 'score', 'nodes', 'pv'))
+
+
+def parse_info(line: str, fields: FrozenSet[str] = INFO_FIELDS) -> Optional[dict]:
+    """
+    Parse 1 dòng info
+
+    Split 1 lần rồi duyệt token; trường không có trong fields thì bỏ qua,
+    gặp pv thì cắt phần còn lại và dừng
+
+    Args:
+        line: Dòng output của engine (đã strip)
+        fields: Tập trường cần lấy (mặc định INFO_FIELDS)
+
+    Returns:
+        dict hoặc None (không phải dòng info, hoặc 'info string'):
+        {'depth': 12, 'nodes': ..., 'score': 35 (cp) | 'mate': -3,
+         'pv': ['h2e2', ...], ...} - chỉ gồm các trường có trong dòng
+    """
+    if not line.startswith("info ") or line.startswith("info string"):
+        return None
+
+    parts = line.split()
+    last = len(parts) - 1
+    info = {}
+
+    i = 1  # Bỏ qua "info"
+    while i < last:
+        token = parts[i]
+        if token not in fields:
+            i += 1
+        elif token == 'pv':
+            # pv luôn là trường cuối của dòng
+            info['pv'] = parts[i + 1:]
+            break
+        elif token == 'score':
+            score_type = parts[i + 1]
+            if score_type == 'cp' or score_type == 'mate':
+                if i + 1 < last:
+                    info['mate' if score_type == 'mate' else 'score'] = int(parts[i + 2])
+                i += 3
+            else:
+                # UCCI: 'score 12'
+                info['score'] = int(score_type)
+                i += 2
+        else:
+            info[token] = int(parts[i + 1])
+            i += 2
+    return info
+
+
+def score_to_evaluation(info: dict) -> Optional[float]:
+    """Điểm (tốt) theo góc nhìn bên đi; chiếu bí -> ±inf; None nếu dòng không có điểm"""
+    if 'mate' in info:
+        return float('inf') if info['mate'] > 0 else float('-inf')
+    if 'score' in info:
+        return info['score'] / 100.0
+    return None
+
+
+def parse_bestmove(line: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    'bestmove h2e2 ponder h9g7' -> ('h2e2', 'h9g7')
+
+    'nobestmove' (UCCI), 'bestmove (none)' hoặc 'bestmove none' -> (None, None)
+    """
+    parts = line.split()
+    bestmove = parts[1] if len(parts) >= 2 and parts[0] == "bestmove" else None
+    if bestmove in ("none", "(none)"):
+        return None, None
+    ponder = parts[3] if len(parts) >= 4 and parts[2] == "ponder" else None
+    return bestmove, ponder
@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+"""
+Match Runner cho Xiangqi
+Cho các engine đấu với nhau không cần GUI: ghép cặp vòng tròn, mỗi khai cuộc
+đánh 2 ván đổi màu, nhiều ván chạy song song (mặc định số ván = số core vì mỗi
+ván chỉ 1 engine tìm kiếm tại 1 thời điểm)
+
+- Xử ván bằng GameState (chiếu bí, hết nước, lặp/chiếu dai/đuổi dai, 60 nước
+  không bắt quân), thêm thua do hết giờ, nước sai, engine chết và hòa khi quá
+  max_plies
+- Thời gian theo GameClock (Fischer, byoyomi, cố định mỗi nước) gửi qua
+  'go wtime/btime' (UCCI: 'go time/opptime'), hoặc depth/movetime cố định
+- Ponder (tùy chọn): sau mỗi nước engine 'go ponder' trên nước đoán trước của
+  đối thủ; đoán đúng thì 'ponderhit' và search tiếp, sai thì 'stop' rồi search
+  lại position thật (khi ponder cả 2 engine cùng search nên giảm số ván song song)
+- Process engine lấy từ EnginePool riêng, trả về sau mỗi ván (ván mới, xóa hash)
+- Kết quả: W/D/L từng cặp, Elo ± khoảng tin cậy 95%, LOS và SPRT (GSPRT theo
+  Elo logistic) khi chỉ có 2 engine; SPRT ngã ngũ thì không bắt đầu ván mới
+
+CLI: python match.py --engine A --engine B --tc 10+0.1 --openings openings.txt
+"""
+
+import asyncio
+import itertools
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..core.clock import UNLIMITED, GameClock
+from ..core.game_file import iter_games
+from ..core.game_state import GameState
+from ..core.move_tables import SQUARE_COORDS
+from ..core.perft import START_FEN, engine_notation_to_move
+from .batch_annotator import AnalysisEngine, prepare_game
+from .engine_loop import EngineLoop, get_engine_loop
+from .engine_pool import EnginePool
+from .ucci_protocol import HANDSHAKE_TIMEOUT, option_key
+
+# Số nửa nước tối đa mỗi ván (tính cả khai cuộc), quá thì xử hòa
+DEFAULT_MAX_PLIES = 400
+
+# Thời gian vượt quá cho phép trước khi xử thua do hết giờ (ms)
+DEFAULT_TIME_MARGIN = 100
+
+DEFAULT_SPRT = {'elo0': 0.0, 'elo1': 5.0, 'alpha': 0.05, 'beta': 0.05}
+
+RESULT_SCORES = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+
+
+def _score_variance(wins: int, draws: int, losses: int) -> Tuple[int, float, float]:
+    """(số ván, điểm trung bình, phương sai điểm mỗi ván)"""
+    games = wins + draws + losses
+    if not games:
+        return 0, 0.5, 0.0
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2
+                + losses * score ** 2) / games
+    return games, score, variance
+
+
+def elo_from_score(score: float) -> float:
+    """Chênh lệch Elo ứng với tỉ lệ điểm (±inf khi thắng/thua tuyệt đối)"""
+    if score <= 0.0:
+        return float('-inf')
+    if score >= 1.0:
+        return float('inf')
+    return 400.0 * math.log10(score / (1.0 - score))
+
+
+def elo_estimate(wins: int, draws: int, losses: int) -> dict:
+    """
+    Ước lượng Elo của bên thứ nhất
+
+    Returns:
+        dict: {'games', 'score', 'elo', 'error' (nửa khoảng tin cậy 95%), 'los'}
+    """
+    games, score, variance = _score_variance(wins, draws, losses)
+    elo = elo_from_score(score)
+    error = float('nan')
+    if games:
+        margin = 1.959964 * math.sqrt(variance / games)
+        error = (elo_from_score(score + margin) - elo_from_score(score - margin)) / 2
+    decisive = wins + losses
+    los = (0.5 * (1 + math.erf((wins - losses) / math.sqrt(2.0 * decisive)))
+           if decisive else 0.5)
+    return {'games': games, 'score': score, 'elo': elo, 'error': error, 'los': los}
+
+
+def sprt_bounds(alpha: float, beta: float) -> Tuple[float, float]:
+    """Ngưỡng LLR (chấp nhận H0, chấp nhận H1)"""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def sprt_llr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """
+    Log-likelihood ratio H1 (elo1) / H0 (elo0) theo xấp xỉ GSPRT (chuẩn hóa
+    bằng phương sai điểm thực tế)
+    """
+    games, score, variance = _score_variance(wins, draws, losses)
+    if not games or variance <= 0:
+        return 0.0
+    score0 = 1.0 / (1.0 + 10 ** (-elo0 / 400.0))
+    score1 = 1.0 / (1.0 + 10 ** (-elo1 / 400.0))
+    return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+
+def load_openings(paths: Iterable[str]) -> List[dict]:
+    """
+    Các khai cuộc hợp lệ trong các file (định dạng của game_file), bỏ khai cuộc
+    sai hoặc đã kết thúc; không có file thì dùng vị trí ban đầu
+    """
+    openings = []
+    for path in paths or []:
+        for game in iter_games(path):
+            try:
+                if game.get('error'):
+                    raise ValueError(game['error'])
+                if prepare_game(game):
+                    raise ValueError("khai cuộc đã kết thúc")
+            except ValueError as e:
+                print(f"⚠️ Match: bỏ khai cuộc {game['id']}: {e}")
+                continue
+            openings.append(game)
+    if not openings:
+        openings.append({'id': 'startpos', 'fen': START_FEN, 'moves': [], 'headers': {}})
+    return openings
+
+
+def game_to_pgn(game: dict, event: str = "Engine match") -> str:
+    """Ván đấu -> PGN (nước ICCS, đọc lại được bằng game_file)"""
+    tags = [('Event', event), ('Round', str(game['round'])), ('Red', game['red']),
+            ('Black', game['black']), ('Result', game['result'])]
+    if game['fen'] != START_FEN:
+        tags.append(('FEN', game['fen']))
+    tags.append(('Opening', game['opening']))
+    tags.append(('Termination', game['reason']))
+
+    black_first = game['fen'].split()[1:2] == ['b']
+    tokens = []
+    for ply, move in enumerate(game['moves'], 2 if black_first else 1):
+        iccs = f"{move[:2]}-{move[2:4]}".upper()
+        if ply % 2 == 1:
+            tokens.append(f"{ply // 2 + 1}. {iccs}")
+        elif not tokens:
+            tokens.append(f"{ply // 2}... {iccs}")
+        else:
+            tokens.append(iccs)
+    tokens.append(game['result'])
+
+    header = "\n".join(f'[{name} "{value}"]' for name, value in tags)
+    return f"{header}\n\n{' '.join(tokens)}\n\n"
+
+
+class MatchRunner:
+    """Cho các engine đấu vòng tròn, nhiều ván song song trên EngineLoop"""
+
+    def __init__(self, engines: List[dict], openings: List[dict], rounds: int = 1,
+                 concurrency: int = 1, time_control: Dict[str, object] = None,
+                 depth: int = None, movetime: int = None,
+                 max_plies: int = DEFAULT_MAX_PLIES, time_margin: int = DEFAULT_TIME_MARGIN,
+                 sprt: dict = None, pgn_path: str = None, ponder: bool = False,
+                 loop: EngineLoop = None, handshake_timeout: float = HANDSHAKE_TIMEOUT):
+        """
+        Args:
+            engines: [{'name', 'path', 'options'}] (ít nhất 2 engine)
+            openings: Khai cuộc (load_openings), mỗi khai cuộc 2 ván đổi màu mỗi cặp
+            rounds: Số lượt lặp lại toàn bộ khai cuộc
+            concurrency: Số ván chạy song song
+            time_control: Kết quả clock.parse_time_control
+            depth, movetime: Giới hạn cố định mỗi nước (khi không có time_control)
+            max_plies: Số nửa nước tối đa, quá thì xử hòa
+            time_margin: Thời gian vượt quá cho phép (ms)
+            sprt: {'elo0', 'elo1', 'alpha', 'beta'} (chỉ dùng khi có đúng 2 engine)
+            pgn_path: Ghi các ván ra file PGN (None = không ghi)
+            ponder: Cho engine suy nghĩ trong lượt đối thủ (go ponder/ponderhit)
+        """
+        if len(engines) < 2:
+            raise ValueError("Cần ít nhất 2 engine")
+        if time_control and time_control['mode'] == UNLIMITED:
+            time_control = None
+        if not time_control and not depth and not movetime:
+            raise ValueError("Cần time control, depth hoặc movetime")
+        self.engines = engines
+        self.openings = openings
+        self.rounds = max(1, rounds)
+        self.concurrency = max(1, concurrency)
+        self.time_control = time_control
+        self.depth = depth
+        self.movetime = movetime
+        self.max_plies = max_plies
+        self.time_margin = time_margin
+        self.sprt = dict(DEFAULT_SPRT, **sprt) if sprt and len(engines) == 2 else None
+        self.pgn_path = pgn_path
+        self.ponder = ponder
+        self.loop = loop or get_engine_loop()
+        self.handshake_timeout = handshake_timeout
+
+        self.pool = None
+        self.pgn = None
+        self.stopped = False
+        # {(tên engine 1, tên engine 2): {'wins', 'draws', 'losses'}} theo góc nhìn engine 1
+        self.results: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self.games: List[dict] = []
+
+    def total_games(self) -> int:
+        """Số ván theo lịch (chưa tính dừng sớm do SPRT)"""
+        pairs = len(self.engines) * (len(self.engines) - 1) // 2
+        return pairs * 2 * len(self.openings) * self.rounds
+
+    def run(self) -> dict:
+        """Chạy match (gọi từ thread khác thread của loop), trả về summary()"""
+        future = self.loop.submit(self.run_async())
+        try:
+            return future.result()
+        except KeyboardInterrupt:
+            future.cancel()
+            if self.pool is not None:
+                self.loop.run(self.pool.close_async())
+            raise
+
+    async def run_async(self) -> dict:
+        """Chạy match (trong loop)"""
+        self.pool = EnginePool(self.loop, standby=0, max_idle=2 * self.concurrency,
+                               handshake_timeout=self.handshake_timeout)
+        self.pgn = open(self.pgn_path, 'w', encoding='utf-8') if self.pgn_path else None
+        for first, second in itertools.combinations(self.engines, 2):
+            self.results[(first['name'], second['name'])] = {'wins': 0, 'draws': 0, 'losses': 0}
+
+        schedule = self._schedule()
+        print(f"⚔️ Match: {len(self.engines)} engine, {self.total_games()} ván, "
+              f"{self.concurrency} ván song song")
+        try:
+            await asyncio.gather(*(self._work(schedule) for _ in range(self.concurrency)))
+        finally:
+            if self.pgn is not None:
+                self.pgn.close()
+                self.pgn = None
+            await self.pool.close_async()
+        return self.summary()
+
+    def _schedule(self):
+        """(lượt, Đỏ, Đen, khai cuộc): mỗi khai cuộc 2 ván liên tiếp đổi màu"""
+        for round_index in range(1, self.rounds + 1):
+            for opening in self.openings:
+                for first, second in itertools.combinations(self.engines, 2):
+                    yield round_index, first, second, opening
+                    yield round_index, second, first, opening
+
+    async def _work(self, schedule):
+        """1 bàn đấu: lấy ván tiếp theo trong lịch cho tới khi hết hoặc dừng"""
+        while not self.stopped:
+            try:
+                round_index, red, black, opening = next(schedule)
+            except StopIteration:
+                return
+            game = await self._play_game(round_index, red, black, opening)
+            if game is None:
+                # Không khởi động được engine
+                self.stopped = True
+                return
+            self._record(game)
+
+    async def _play_game(self, round_index: int, red: dict, black: dict,
+                         opening: dict) -> Optional[dict]:
+        """Đánh 1 ván, trả về dict ván đấu hoặc None nếu không khởi động được engine"""
+        players = {'red': red, 'black': black}
+        engines = {}
+        try:
+            for side, player in players.items():
+                engine = await self.pool.acquire(player['path'], player.get('options'))
+                if engine is None:
+                    print(f"❌ Match: không khởi động được {player['name']}")
+                    return None
+                engine.echo = False
+                if self.ponder and option_key('Ponder') in engine.options:
+                    # UCI: báo engine sẽ được ponder để chia thời gian phù hợp
+                    engine.set_option('Ponder', True)
+                engines[side] = AnalysisEngine(engine)
+
+            game = {'round': round_index, 'red': red['name'], 'black': black['name'],
+                    'opening': opening['id'], 'fen': opening['fen'],
+                    'moves': list(opening['moves']),
+                    'ponder': {'hits': 0, 'misses': 0}}
+            game['result'], game['reason'] = await self._play_moves(game, engines)
+            return game
+        finally:
+            for analysis in engines.values():
+                await self.pool.release(analysis.engine)
+
+    async def _play_moves(self, game: dict, engines: Dict[str, AnalysisEngine]) -> Tuple[str, str]:
+        """Cho 2 engine đi tới khi hết ván, trả về (kết quả, lý do)"""
+        state = GameState(verbose=False)
+        if not state.load_from_fen(game['fen']):
+            raise ValueError(f"FEN khai cuộc sai: {game['fen']}")
+        for notation in game['moves']:
+            state.make_move(*self._board_move(notation))
+
+        clock = GameClock(self.time_control) if self.time_control else None
+        if clock is not None:
+            clock.start(state.current_player)
+
+        def loss(side, reason):
+            return ('0-1' if side == 'red' else '1-0'), reason
+
+        while True:
+            side = state.current_player
+            analysis = engines[side]
+            loop = asyncio.get_running_loop()
+            turn_start = loop.time()
+            try:
+                result = None
+                if analysis.ponder_move is not None:
+                    if analysis.ponder_move == game['moves'][-1]:
+                        game['ponder']['hits'] += 1
+                        result = await analysis.ponderhit(self._move_timeout(clock))
+                    else:
+                        game['ponder']['misses'] += 1
+                        await analysis.cancel_ponder(self._move_timeout(clock))
+                if result is None:
+                    go, movetime = self._go_arguments(clock)
+                    timeout = self._move_timeout(clock, loop.time() - turn_start)
+                    result = await analysis.analyse(
+                        game['fen'], game['moves'], self.depth, movetime, timeout, **go)
+            except asyncio.TimeoutError:
+                return loss(side, 'time forfeit')
+            except RuntimeError:
+                return loss(side, 'engine crashed')
+
+            if clock is not None and not clock.press(self.time_margin):
+                return loss(side, 'time forfeit')
+
+            bestmove = result['bestmove']
+            if bestmove is None:
+                return loss(side, 'no move')
+            try:
+                move = self._board_move(bestmove)
+            except ValueError:
+                return loss(side, f'illegal move {bestmove}')
+            if not state.make_move(*move):
+                return loss(side, f'illegal move {bestmove}')
+            game['moves'].append(bestmove)
+
+            if state.game_over:
+                if state.winner == 'red':
+                    return '1-0', state.game_status
+                if state.winner == 'black':
+                    return '0-1', state.game_status
+                return '1/2-1/2', state.game_status
+            if len(game['moves']) >= self.max_plies:
+                return '1/2-1/2', 'max plies'
+
+            if self.ponder and result['ponder']:
+                # Đồng hồ đã chuyển sang đối thủ: thời gian gửi kèm là lúc bắt đầu ponder
+                go, movetime = self._go_arguments(clock)
+                try:
+                    analysis.ponder(game['fen'], game['moves'], result['ponder'],
+                                    self.depth, movetime, **go)
+                except RuntimeError:
+                    return loss(side, 'engine crashed')
+
+    def _go_arguments(self, clock: Optional[GameClock]) -> Tuple[dict, Optional[int]]:
+        """(tham số thời gian cho go, movetime) theo đồng hồ hoặc movetime cố định"""
+        if clock is None:
+            return {}, self.movetime
+        go = clock.go_arguments()
+        return go, go.pop('time_ms', self.movetime)
+
+    def _move_timeout(self, clock: Optional[GameClock], elapsed: float = 0.0) -> Optional[float]:
+        """Thời gian chờ bestmove (giây) còn lại của lượt sau elapsed giây, None = không giới hạn"""
+        if clock is None:
+            return None
+        return max(0.0, (clock.move_deadline() + self.time_margin) / 1000.0 - elapsed)
+
+    @staticmethod
+    def _board_move(notation: str) -> Tuple[int, int, int, int]:
+        """'h2e2' -> (from_row, from_col, to_row, to_col) cho GameState.make_move"""
+        from_sq, to_sq = engine_notation_to_move(notation)
+        return SQUARE_COORDS[from_sq] + SQUARE_COORDS[to_sq]
+
+    def _record(self, game: dict):
+        """Cộng kết quả ván vào bảng, ghi PGN, kiểm tra SPRT"""
+        self.games.append(game)
+        key = (game['red'], game['black'])
+        score = RESULT_SCORES[game['result']]
+        if key not in self.results:
+            key = (game['black'], game['red'])
+            score = 1.0 - score
+        counts = self.results[key]
+        counts['wins' if score == 1.0 else 'losses' if score == 0.0 else 'draws'] += 1
+
+        if self.pgn is not None:
+            self.pgn.write(game_to_pgn(game))
+            self.pgn.flush()
+
+        estimate = elo_estimate(counts['wins'], counts['draws'], counts['losses'])
+        line = (f"🏁 Ván {len(self.games)}: {game['red']} - {game['black']} {game['result']} "
+                f"({game['reason']}, {len(game['moves'])} ply) | {key[0]} vs {key[1]}: "
+                f"+{counts['wins']} ={counts['draws']} -{counts['losses']}, "
+                f"Elo {estimate['elo']:.1f} ± {estimate['error']:.1f}")
+
+        status = self.sprt_status()
+        if status is not None:
+            line += f", LLR {status['llr']:.2f} ({status['lower']:.2f}, {status['upper']:.2f})"
+            if status['result'] is not None:
+                self.stopped = True
+                line += f" -> SPRT: chấp nhận {status['result']}"
+        print(line)
+
+    def sprt_status(self) -> Optional[dict]:
+        """{'llr', 'lower', 'upper', 'result': 'H0' | 'H1' | None} hoặc None nếu không dùng SPRT"""
+        if self.sprt is None:
+            return None
+        counts = next(iter(self.results.values()))
+        llr = sprt_llr(counts['wins'], counts['draws'], counts['losses'],
+                       self.sprt['elo0'], self.sprt['elo1'])
+        lower, upper = sprt_bounds(self.sprt['alpha'], self.sprt['beta'])
+        result = 'H1' if llr >= upper else 'H0' if llr <= lower else None
+        return {'llr': llr, 'lower': lower, 'upper': upper, 'result': result}
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: {'games': số ván, 'pairs': [{'first', 'second', 'wins', 'draws',
+                   'losses', 'score', 'elo', 'error', 'los'}], 'sprt': sprt_status(),
+                   'ponder': {'hits', 'misses'} tổng các ván}
+        """
+        pairs = []
+        for (first, second), counts in self.results.items():
+            pair = {'first': first, 'second': second}
+            pair.update(counts)
+            estimate = elo_estimate(counts['wins'], counts['draws'], counts['losses'])
+            pair.update({key: estimate[key] for key in ('score', 'elo', 'error', 'los')})
+            pairs.append(pair)
+        ponder = {'hits': 0, 'misses': 0}
+        for game in self.games:
+            for key in ponder:
+                ponder[key] += game['ponder'][key]
+        return {'games': len(self.games), 'pairs': pairs, 'sprt': self.sprt_status(),
+                'ponder': ponder}
@@ -1,31 +1,63 @@
 """
-Multi-Engine Manager với threading tách biệt cho mỗi engine
+Multi-Engine Manager: mỗi engine là 1 task trên event loop asyncio dùng chung
 """
+import asyncio
+import concurrent.futures
 import os
+from collections import deque
+import sqlite3
 import threading
-import time
-import queue
 from typing import Dict, List, Optional, Callable
 from PyQt5.QtCore import QObject, pyqtSignal
 
-from .ucci_protocol import UCCIEngine
-
-
-class EngineWorker(threading.Thread):
-    """Worker thread riêng cho mỗi engine"""
-
-    def __init__(self, engine_name: str, engine_path: str, result_callback: Callable):
-        super().__init__(daemon=True)
+from .ucci_protocol import UCCIEngine, HANDSHAKE_TIMEOUT
+from .engine_loop import (EngineLoop, UpdateCoalescer, DEFAULT_UPDATE_RATE,
+                          get_engine_loop)
+from .builtin_engine import BuiltinEngineWorker
+from .engine_pool import EnginePool, DEFAULT_MAX_IDLE, DEFAULT_STANDBY
+from .engine_resources import engine_options, split_resources
+from .info_parser import (RESULT_INFO_FIELDS, parse_bestmove, parse_info,
+                          score_to_evaluation)
+from .analysis_cache import (AnalysisCache, DEFAULT_CACHE_PATH, engine_identity,
+                             position_after_moves)
+
+
+class EngineWorker:
+    """
+    Worker cho mỗi engine, chạy như 1 task trên EngineLoop dùng chung
+
+    Giữ giao diện kiểu thread (start/is_alive/join) nhưng không tạo thread
+    riêng: lệnh từ GUI được đưa vào asyncio.Queue và xử lý ngay khi tới.
+    """
+
+    def __init__(self, engine_name: str, engine_path: str, result_callback: Callable,
+                 loop: EngineLoop = None, ready_callback: Callable = None,
+                 handshake_timeout: float = HANDSHAKE_TIMEOUT,
+                 update_rate: float = DEFAULT_UPDATE_RATE, multipv: int = 1,
+                 options: Dict[str, object] = None, pool: EnginePool = None):
         self.engine_name = engine_name
         self.engine_path = engine_path
         self.result_callback = result_callback
+        # Gọi (engine_name, protocol) ngay khi engine handshake xong
+        self.ready_callback = ready_callback
+        self.handshake_timeout = handshake_timeout
 
-        # Thread control
+        # Task control
+        self.loop = loop or get_engine_loop()
         self.running = True
-        self.command_queue = queue.Queue()
+        self.command_queue = asyncio.Queue()
+        self.future = None
 
-        # Engine instance
+        # Engine instance (lấy từ pool nếu có, trả lại pool khi dừng)
         self.engine = None
+        self.pool = pool
+
+        # Số PV muốn nhận (đặt cho engine ngay trước lệnh go)
+        self.multipv = max(1, multipv)
+
+        # Option muốn đặt cho engine (Hash, Threads...): gửi trước isready,
+        # thay đổi sau đó được gửi khi engine không search
+        self.options = dict(options or {})
 
         # Results storage
         self.last_result = {
@@ -35,72 +67,135 @@ class EngineWorker(threading.Thread):
             'depth': 0,
             'nodes': 0,
             'pv': [],
+            # Các nước ứng viên theo thứ hạng multipv:
+            # [{'multipv': 1, 'depth', 'evaluation', 'pv'}, ...]
+            'lines': [],
             'protocol': 'detecting...',
             'status': 'initializing',
-            # Flag để ignore engine info cũ (giống single engine)
-            'ignore_old_info': False
+            # Generation của search sinh ra kết quả này
+            'generation': 0,
+            # Khóa Zobrist của position đã search (khóa lưu analysis cache)
+            'key': None
         }
 
         # Lock for thread-safe access
         self.result_lock = threading.Lock()
 
-        print(f"📱 Created worker for engine: {engine_name}")
+        # Gửi kết quả lên GUI tối đa update_rate lần/giây (bản mới nhất)
+        self.updates = UpdateCoalescer(self.loop.loop, self._send_result_update,
+                                       update_rate)
+
+        # Độ sâu của kết quả lấy từ analysis cache cho position hiện tại
+        self.cached_depth = 0
+
+        # Mỗi lệnh go có 1 generation tăng dần; engine trả đúng 1 bestmove cho
+        # mỗi go nên output luôn thuộc search cũ nhất chưa nhận bestmove
+        self.generation = 0
+        self.running_searches = deque()
+        # Generation đang muốn nhận kết quả (None = bỏ hết output hiện có)
+        self.current_generation = None
+        self.stop_sent = False
+        # Search chờ bắt đầu sau khi search cũ trả bestmove: (status, depth)
+        self.pending_search = None
+        self.position = None  # (fen, moves) mới nhất
+        self.position_key = None  # Khóa Zobrist của self.position (do manager gửi kèm)
+        # {generation: khóa Zobrist của position lúc gửi go}
+        self.search_keys: Dict[int, Optional[int]] = {}
 
-    def run(self):
-        """Main thread loop"""
-        try:
-            # Initialize engine
-            self.engine = UCCIEngine(self.engine_path, "auto")
+        print(f"📱 Created worker for engine: {engine_name}")
 
-            # Setup callbacks
-            self.engine.on_bestmove = self._handle_bestmove
-            self.engine.on_info = self._handle_info
+    def start(self):
+        """Chạy worker trên event loop"""
+        self.future = self.loop.submit(self.run())
 
-            # Start engine
-            if self.engine.start():
-                with self.result_lock:
-                    self.last_result['status'] = 'ready'
-                print(f"✅ Engine {self.engine_name} started successfully")
+    def is_alive(self) -> bool:
+        """Worker còn đang chạy"""
+        return self.future is not None and not self.future.done()
 
-                # Send startup status
-                self._send_result_update()
+    def join(self, timeout: Optional[float] = None):
+        """Chờ worker kết thúc"""
+        if self.future is not None:
+            concurrent.futures.wait([self.future], timeout)
 
-                # Wait for protocol detection
-                print(f"🔍 {self.engine_name}: Detecting protocol...")
-                time.sleep(2)
+    async def run(self):
+        """Main task loop"""
+        try:
+            # Start engine (engine từ pool đã handshake sẵn)
+            if await self._start_engine():
+                print(f"✅ Engine {self.engine_name} started successfully")
                 detected_protocol = self.engine.get_detected_protocol()
 
                 with self.result_lock:
+                    self.last_result['status'] = 'ready'
                     self.last_result['protocol'] = detected_protocol
 
                 print(
                     f"📡 {self.engine_name}: Protocol detected = {detected_protocol}")
 
-                # Send protocol update
-                self._send_result_update()
+                # Send ready + protocol update
+                self.updates.request(force=True)
+                if self.ready_callback:
+                    self.ready_callback(self.engine_name, detected_protocol)
             else:
                 with self.result_lock:
                     self.last_result['status'] = 'failed'
                 print(f"❌ Failed to start engine: {self.engine_name}")
-                self._send_result_update()
+                self.updates.request(force=True)
                 return
 
             # Main command processing loop
             while self.running:
-                try:
-                    # Get command with timeout
-                    command = self.command_queue.get(timeout=0.5)
-                    self._process_command(command)
-                except queue.Empty:
-                    continue
-                except Exception as e:
-                    print(
-                        f"❌ Error processing command for {self.engine_name}: {e}")
+                commands = [await self.command_queue.get()]
+                while not self.command_queue.empty():
+                    commands.append(self.command_queue.get_nowait())
+
+                for command in self._coalesce_commands(commands):
+                    try:
+                        self._process_command(command)
+                    except Exception as e:
+                        print(
+                            f"❌ Error processing command for {self.engine_name}: {e}")
 
         except Exception as e:
             print(f"❌ Fatal error in engine worker {self.engine_name}: {e}")
         finally:
-            self._cleanup()
+            await self._cleanup()
+
+    async def _start_engine(self) -> bool:
+        """Lấy engine từ pool hoặc khởi động process mới và chờ handshake"""
+        if self.pool is not None:
+            self.engine = await self.pool.acquire(self.engine_path, self.options,
+                                                  self.handshake_timeout)
+            if self.engine is None:
+                return False
+            self.engine.on_bestmove = self._handle_bestmove
+            self.engine.on_info = self._handle_info
+            return True
+
+        # Initialize engine
+        self.engine = UCCIEngine(self.engine_path, "auto", self.loop,
+                                 self.handshake_timeout, self.options)
+
+        # Setup callbacks
+        self.engine.on_bestmove = self._handle_bestmove
+        self.engine.on_info = self._handle_info
+
+        if not await self.engine.start_async():
+            return False
+
+        # Chờ handshake (ucciok/uciok + readyok), không đợi cố định
+        print(f"🔍 {self.engine_name}: Detecting protocol...")
+        if not await self.engine.wait_ready():
+            print(f"⚠️ {self.engine_name}: No readyok within "
+                  f"{self.handshake_timeout}s, continuing anyway")
+        return True
+
+    @staticmethod
+    def _coalesce_commands(commands: List[dict]) -> List[dict]:
+        """Bỏ các set_position bị set_position ngay sau đó thay thế"""
+        return [command for command, following in zip(commands, commands[1:] + [None])
+                if not (command.get('type') == 'set_position' and following
+                        and following.get('type') == 'set_position')]
 
     def _process_command(self, command: dict):
         """Process command từ main thread"""
@@ -108,71 +203,77 @@ class EngineWorker(threading.Thread):
 
         try:
             if cmd_type == 'set_position':
-                fen = command.get('fen')
-                moves = command.get('moves', [])
                 if self.engine:
-                    # Kiểm tra nếu đang analyzing
-                    was_analyzing = self.last_result.get(
-                        'status') == 'analyzing'
-
-                    # Nếu đang analyzing, dừng trước khi set position mới
-                    if was_analyzing:
-                        print(
-                            f"⏹️ {self.engine_name}: Stopping analysis before position change")
-                        self.engine.stop_search()
-                        # Set flag để ignore engine info cũ (giống single engine)
-                        with self.result_lock:
-                            self.last_result['ignore_old_info'] = True
-
-                    # Set position mới
-                    self.engine.set_position(fen, moves)
+                    self.position = (command.get('fen'), command.get('moves', []))
+                    self.position_key = command.get('key')
+
+                    # Search đang chạy thuộc position cũ -> bỏ output của nó
+                    status = self.last_result.get('status')
+                    self.pending_search = None
+                    self.current_generation = None
+                    self._stop_running_search()
+                    with self.result_lock:
+                        # Kết quả của position cũ không còn đúng (PV, mũi tên)
+                        self.last_result.update({'bestmove': None, 'ponder': None,
+                                                 'evaluation': 0.0, 'depth': 0,
+                                                 'nodes': 0, 'pv': [], 'lines': [],
+                                                 'key': None})
+                        # Hint của position cũ bị bỏ -> không còn search nào chạy
+                        if status == 'thinking':
+                            self.last_result['status'] = 'ready'
                     print(f"📍 {self.engine_name}: Set position")
 
-                    # Restart analysis với delay nếu trước đó đang analyzing (giống single engine)
-                    if was_analyzing:
-                        print(
-                            f"🔄 {self.engine_name}: Scheduling analysis restart with delay")
-                        # Sử dụng threading.Timer để delay 100ms giống single engine
-                        import threading
-
-                        def delayed_restart():
-                            try:
-                                # Reset flag để nhận engine info mới
-                                with self.result_lock:
-                                    self.last_result['ignore_old_info'] = False
-                                # Set position lại (giống single engine)
-                                self.engine.set_position(fen, moves)
-                                # Bắt đầu analysis mới
-                                self.engine.go_infinite()
-                                print(
-                                    f"🔍 {self.engine_name}: Started new analysis after delay")
-                            except Exception as e:
-                                print(
-                                    f"❌ Error in delayed restart for {self.engine_name}: {e}")
-
-                        restart_timer = threading.Timer(
-                            0.1, delayed_restart)  # 100ms delay
-                        restart_timer.start()
+                    # Hiện ngay kết quả đã lưu, engine chỉ cần tìm sâu hơn
+                    self._load_cached(command.get('cached'))
+
+                    if status == 'analyzing':
+                        self._start_search('analyzing')
+                    else:
+                        self.updates.request(force=True)
 
             elif cmd_type == 'get_hint':
                 depth = command.get('depth', 8)
-                if self.engine:
+                if self.engine and depth <= self.cached_depth:
                     with self.result_lock:
-                        self.last_result['status'] = 'thinking'
-                    self.engine.get_hint(depth)
+                        self.last_result['status'] = 'ready'
+                    print(f"💾 {self.engine_name}: Hint from cache "
+                          f"(depth {self.cached_depth} >= {depth})")
+                    self.updates.request(force=True)
+                elif self.engine:
+                    self._start_search('thinking', depth)
                     print(
                         f"🤖 {self.engine_name}: Requested hint (depth {depth})")
 
             elif cmd_type == 'start_analysis':
                 if self.engine:
-                    with self.result_lock:
-                        self.last_result['status'] = 'analyzing'
-                    self.engine.go_infinite()
+                    self._start_search('analyzing')
                     print(f"🔍 {self.engine_name}: Started analysis")
 
+            elif cmd_type == 'set_multipv':
+                self.multipv = max(1, command.get('count', 1))
+                with self.result_lock:
+                    del self.last_result['lines'][self.multipv:]
+                    analyzing = self.last_result.get('status') == 'analyzing'
+                print(f"🔢 {self.engine_name}: MultiPV = {self.multipv}")
+                # Option chỉ đổi được khi engine không search -> chạy lại analysis
+                if self.engine and analyzing:
+                    self._start_search('analyzing')
+                else:
+                    self.updates.request(force=True)
+
+            elif cmd_type == 'set_options':
+                self.options = dict(command.get('options', {}))
+                if self.engine and not self.running_searches:
+                    self._apply_options()
+                elif self.engine and self.last_result.get('status') == 'analyzing':
+                    # Option chỉ đổi được khi engine không search -> chạy lại analysis
+                    self._start_search('analyzing')
+
             elif cmd_type == 'stop_analysis':
                 if self.engine:
-                    self.engine.stop_search()
+                    # Giữ current_generation để nhận bestmove cuối của analysis
+                    self.pending_search = None
+                    self._stop_running_search()
                     with self.result_lock:
                         self.last_result['status'] = 'ready'
                     print(f"⏹️ {self.engine_name}: Stopped analysis")
@@ -184,35 +285,106 @@ class EngineWorker(threading.Thread):
             print(
                 f"❌ Error executing command {cmd_type} for {self.engine_name}: {e}")
 
+    def _start_search(self, status: str, depth: int = None):
+        """
+        Bắt đầu search cho position mới nhất
+
+        Nếu engine còn search cũ thì chỉ ghi nhận yêu cầu; search được bắt
+        đầu khi bestmove của search cũ về (các yêu cầu dồn lại chỉ giữ cái cuối).
+        """
+        with self.result_lock:
+            self.last_result['status'] = status
+
+        if self.running_searches:
+            self.pending_search = (status, depth)
+            self.current_generation = None
+            self._stop_running_search()
+            return
+
+        if self.position is None:
+            return
+        self._apply_options()
+        if self.multipv != self.engine.option_values.get('multipv', 1):
+            self.engine.set_multipv(self.multipv)
+
+        fen, moves = self.position
+        self.engine.set_position(fen, moves)
+        if status == 'analyzing':
+            self.engine.go_infinite()
+        else:
+            self.engine.get_hint(depth)
+
+        self.generation += 1
+        self.running_searches.append(self.generation)
+        self.search_keys[self.generation] = self.position_key
+        self.current_generation = self.generation
+        self.stop_sent = False
+
+    def _apply_options(self):
+        """Gửi các option đã đổi (gọi khi engine không search)"""
+        applied = self.engine.apply_options(self.options)
+        if applied:
+            print(f"⚙️ {self.engine_name}: Options {applied}")
+
+    def _stop_running_search(self):
+        """Gửi stop (1 lần) cho search đang chạy"""
+        if self.running_searches and not self.stop_sent:
+            self.engine.stop_search()
+            self.stop_sent = True
+
+    def _load_cached(self, cached: Optional[dict]):
+        """Nạp kết quả từ analysis cache cho position vừa đặt"""
+        if not cached:
+            self.cached_depth = 0
+            return
+
+        self.cached_depth = cached['depth']
+        with self.result_lock:
+            self.last_result.update(cached)
+            self.last_result['lines'] = [{'multipv': 1, 'depth': cached['depth'],
+                                          'evaluation': cached['evaluation'],
+                                          'pv': cached['pv']}]
+            self.last_result['key'] = self.position_key
+        print(f"💾 {self.engine_name}: Cached result depth {self.cached_depth}")
+        self.updates.request(force=True)
+
     def _handle_bestmove(self, bestmove_line: str):
         """Handle bestmove từ engine"""
         try:
-            # Kiểm tra nếu đang ignore old info (giống single engine)
-            with self.result_lock:
-                if self.last_result.get('ignore_old_info', False):
-                    return
+            # Output này kết thúc search cũ nhất đang chạy
+            generation = (self.running_searches.popleft()
+                          if self.running_searches else None)
+            key = self.search_keys.pop(generation, None)
+            if not self.running_searches:
+                self.stop_sent = False
+                if self.pending_search:
+                    status, depth = self.pending_search
+                    self.pending_search = None
+                    self._start_search(status, depth)
+
+            if generation is None or generation != self.current_generation:
+                print(f"🗑️ {self.engine_name}: Dropped stale bestmove (search {generation})")
+                return
 
             # Parse bestmove line: "bestmove e2e4 ponder d7d5"
-            parts = bestmove_line.strip().split()
-            bestmove = None
-            ponder = None
-
-            # Tìm cả bestmove và ponder trong cùng một vòng lặp
-            for i, part in enumerate(parts):
-                if part == "bestmove" and i + 1 < len(parts):
-                    bestmove = parts[i + 1]
-                elif part == "ponder" and i + 1 < len(parts):
-                    ponder = parts[i + 1]
-
-            if bestmove and bestmove != "none":
+            bestmove, ponder = parse_bestmove(bestmove_line)
+
+            if bestmove:
                 with self.result_lock:
+                    if self.cached_depth and self.last_result['depth'] <= self.cached_depth:
+                        # Search dừng trước khi vượt độ sâu đã cache -> giữ kết quả cache
+                        self.last_result['status'] = 'ready'
+                        bestmove = self.last_result['bestmove']
+                        ponder = self.last_result['ponder']
                     self.last_result['bestmove'] = bestmove
                     self.last_result['ponder'] = ponder
                     self.last_result['status'] = 'ready'
+                    self.last_result['generation'] = generation
+                    self.last_result['key'] = key
 
                 print(
                     f"🎯 {self.engine_name}: Bestmove = {bestmove}, Ponder = {ponder}")
-                self._send_result_update()
+                self.updates.request(force=True)
 
         except Exception as e:
             print(f"❌ Error handling bestmove for {self.engine_name}: {e}")
@@ -220,73 +392,67 @@ class EngineWorker(threading.Thread):
     def _handle_info(self, info_line: str):
         """Handle info từ engine"""
         try:
-            # Kiểm tra nếu đang ignore old info (giống single engine)
-            with self.result_lock:
-                if self.last_result.get('ignore_old_info', False):
-                    return
+            # Bỏ output của search không còn cần (position đã đổi)
+            if (not self.running_searches
+                    or self.running_searches[0] != self.current_generation):
+                return
+
+            info = parse_info(info_line, RESULT_INFO_FIELDS)
+            if not info:
+                return
+
+            # Bỏ qua các độ sâu chưa vượt kết quả đã có trong cache
+            depth = info.get('depth')
+            if self.cached_depth and depth is not None and depth <= self.cached_depth:
+                return
 
-            # Parse info line
-            parts = info_line.split()
-            if not parts or parts[0] != "info":
+            multipv = info.get('multipv', 1)
+            if multipv > self.multipv:
                 return
+            evaluation = score_to_evaluation(info)
+            pv_moves = info.get('pv')
 
-            updated = False
+            depth_changed = False
             with self.result_lock:
-                i = 1
-                while i < len(parts):
-                    key = parts[i]
-
-                    if key == "depth" and i + 1 < len(parts):
-                        self.last_result['depth'] = int(parts[i + 1])
-                        updated = True
-                        i += 2
-
-                    elif key == "score" and i + 2 < len(parts):
-                        score_type = parts[i + 1]
-                        score_value = parts[i + 2]
-
-                        if score_type == "cp":
-                            # Centipawn to pawn
-                            self.last_result['evaluation'] = int(
-                                score_value) / 100.0
-                        elif score_type == "mate":
-                            mate_moves = int(score_value)
-                            if mate_moves > 0:
-                                self.last_result['evaluation'] = float('inf')
-                            else:
-                                self.last_result['evaluation'] = float('-inf')
-                        updated = True
-                        i += 3
-
-                    elif key == "nodes" and i + 1 < len(parts):
-                        self.last_result['nodes'] = int(parts[i + 1])
-                        updated = True
-                        i += 2
-
-                    elif key == "pv":
-                        # Principal variation
-                        pv_moves = parts[i + 1:]
+                if 'nodes' in info:
+                    self.last_result['nodes'] = info['nodes']
+
+                if pv_moves:
+                    # Lưu nước ứng viên theo thứ hạng, bỏ các hạng cũ đã vượt multipv
+                    lines = self.last_result['lines']
+                    del lines[self.multipv:]
+                    lines.extend({'multipv': rank, 'depth': 0, 'evaluation': 0.0, 'pv': []}
+                                 for rank in range(len(lines) + 1, multipv + 1))
+                    line = lines[multipv - 1]
+                    if depth is not None:
+                        line['depth'] = depth
+                    if evaluation is not None:
+                        line['evaluation'] = evaluation
+                    line['pv'] = pv_moves
+
+                # Các trường chính (depth, evaluation, pv) theo PV tốt nhất
+                if multipv == 1:
+                    if depth is not None:
+                        depth_changed = depth != self.last_result['depth']
+                        self.last_result['depth'] = depth
+
+                    if evaluation is not None:
+                        self.last_result['evaluation'] = evaluation
+
+                    if pv_moves is not None:
                         self.last_result['pv'] = pv_moves
 
                         # Trong chế độ analysis, sử dụng PV để tạo bestmove và ponder
                         if self.last_result.get('status') == 'analyzing' and pv_moves:
-                            if len(pv_moves) >= 1:
-                                self.last_result['bestmove'] = pv_moves[0]
-                                print(
-                                    f"🔍 {self.engine_name}: Analysis bestmove from PV = {pv_moves[0]}")
+                            self.last_result['bestmove'] = pv_moves[0]
                             if len(pv_moves) >= 2:
                                 self.last_result['ponder'] = pv_moves[1]
-                                print(
-                                    f"🔍 {self.engine_name}: Analysis ponder from PV = {pv_moves[1]}")
-
-                        updated = True
-                        break
 
-                    else:
-                        i += 1
+                self.last_result['generation'] = self.current_generation
+                self.last_result['key'] = self.search_keys.get(self.current_generation)
 
-            if updated:
-                self._send_result_update()
+            # Depth mới luôn gửi ngay, còn lại gộp theo update_rate
+            self.updates.request(force=depth_changed)
 
         except Exception as e:
             print(f"❌ Error handling info for {self.engine_name}: {e}")
@@ -295,31 +461,50 @@ class EngineWorker(threading.Thread):
         """Send result update to main thread"""
         if self.result_callback:
             with self.result_lock:
-                result_copy = self.last_result.copy()
+                result_copy = self._copy_result()
             self.result_callback(self.engine_name, result_copy)
 
     def send_command(self, command: dict):
-        """Send command to engine thread"""
-        try:
-            self.command_queue.put(command, timeout=1.0)
-        except queue.Full:
-            print(f"⚠️ Command queue full for {self.engine_name}")
+        """Send command to engine task (thread-safe)"""
+        self.loop.call_soon(self.command_queue.put_nowait, command)
+
+    def get_engine_options(self) -> Dict[str, dict]:
+        """Option engine khai báo khi handshake {tên: mô tả} (rỗng nếu chưa xong)"""
+        if self.engine is None:
+            return {}
+        return {option['name']: dict(option) for option in list(self.engine.options.values())}
 
     def get_result(self) -> dict:
         """Get current result (thread-safe)"""
         with self.result_lock:
-            return self.last_result.copy()
+            return self._copy_result()
+
+    def _copy_result(self) -> dict:
+        """Bản sao kết quả gửi ra ngoài (gọi khi đang giữ result_lock)"""
+        result = self.last_result.copy()
+        result['lines'] = [dict(line) for line in result['lines']]
+        return result
+
+    def is_ready(self) -> bool:
+        """Engine đã khởi động xong và nhận lệnh được"""
+        with self.result_lock:
+            return (self.is_alive() and self.last_result['status'] != 'failed'
+                    and self.last_result['protocol'] != 'detecting...')
 
     def stop(self):
         """Stop engine worker"""
         self.running = False
         self.send_command({'type': 'stop'})
 
-    def _cleanup(self):
+    async def _cleanup(self):
         """Cleanup resources"""
+        self.updates.cancel()
         if self.engine:
             try:
-                self.engine.stop()
+                if self.pool is not None:
+                    await self.pool.release(self.engine)
+                else:
+                    await self.engine.stop_async()
             except:
                 pass
         print(f"🧹 Cleaned up worker for {self.engine_name}")
@@ -330,21 +515,86 @@ class MultiEngineManager(QObject):
 
     # Signals for UI updates
     engine_result_updated = pyqtSignal(str, dict)  # engine_name, result
+    engine_ready = pyqtSignal(str, str)  # engine_name, protocol
 
-    def __init__(self):
+    def __init__(self, builtin_fallback: bool = True,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 update_rate: float = DEFAULT_UPDATE_RATE,
+                 engines_config: dict = None):
+        """
+        Args:
+            builtin_fallback: Dùng built-in engine khi chưa có engine ngoài
+                nào sẵn sàng (lúc khởi động hoặc máy không có engine)
+            cache_path: File SQLite của analysis cache, None = không cache
+            update_rate: Số lần tối đa mỗi giây gửi kết quả của 1 engine lên GUI
+            engines_config: Nội dung config/engines.json (option của engine và
+                chính sách chia Threads/Hash trong engine_settings)
+        """
         super().__init__()
+        self.update_rate = update_rate
+        self.engines_config = engines_config or {}
+        engine_settings = self.engines_config.get('engine_settings', {})
+        self.resource_policy = engine_settings.get('resources')
+
+        # Pool process engine đã handshake: thêm lại engine không phải khởi động lại
+        pool_settings = engine_settings.get('pool', {})
+        self.engine_pool = None
+        if pool_settings.get('enabled', True):
+            self.engine_pool = EnginePool(
+                standby=pool_settings.get('standby', DEFAULT_STANDBY),
+                max_idle=pool_settings.get('max_idle', DEFAULT_MAX_IDLE))
+        # Số nước ứng viên mỗi engine trả về (MultiPV)
+        self.multipv = 1
         self.workers: Dict[str, EngineWorker] = {}
         self.worker_lock = threading.Lock()
 
+        # Position cuối cùng để đồng bộ lại built-in engine khi cần
+        self.last_position = None
+
+        # Analysis cache theo (định danh engine, khóa Zobrist position)
+        self.analysis_cache = None
+        if cache_path:
+            try:
+                self.analysis_cache = AnalysisCache(cache_path)
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️ Analysis cache disabled: {e}")
+        self.engine_ids: Dict[str, str] = {}
+        self.current_position = None
+        # Kết quả ghi cache gần nhất của từng engine (tránh ghi lặp)
+        self.stored_results: Dict[str, tuple] = {}
+
+        self.builtin_worker = None
+        if builtin_fallback:
+            self.builtin_worker = BuiltinEngineWorker(
+                result_callback=self._on_engine_result)
+            self.engine_ids[self.builtin_worker.engine_name] = engine_identity(
+                self.builtin_worker.engine_name, self.builtin_worker.engine_path)
+            self.builtin_worker.start()
+
         print("🚀 MultiEngineManager initialized")
 
-    def add_engine(self, name: str, path: str) -> bool:
+    def _fallback_active(self) -> bool:
+        """Built-in engine thay thế khi không có engine ngoài nào sẵn sàng"""
+        if self.builtin_worker is None:
+            return False
+        return not any(worker.is_ready() for worker in self.workers.values())
+
+    def _command_targets(self) -> list:
+        """Các worker nhận lệnh (gọi khi đang giữ worker_lock)"""
+        targets = list(self.workers.values())
+        if self._fallback_active():
+            targets.append(self.builtin_worker)
+        return targets
+
+    def add_engine(self, name: str, path: str,
+                   handshake_timeout: float = HANDSHAKE_TIMEOUT) -> bool:
         """
-        Thêm engine mới với worker thread riêng
+        Thêm engine mới (worker chạy trên event loop dùng chung)
 
         Args:
             name: Tên engine
             path: Đường dẫn engine
+            handshake_timeout: Thời gian chờ tối đa mỗi bước handshake (giây)
 
         Returns:
             bool: True nếu thành công
@@ -358,11 +608,24 @@ class MultiEngineManager(QObject):
             return False
 
         try:
+            # Engine mới nhận phần Threads/Hash của mình ngay khi handshake
+            with self.worker_lock:
+                resources = split_resources(len(self.workers) + 1, self.resource_policy)
+
             # Create worker với callback
-            worker = EngineWorker(name, path, self._on_engine_result)
+            worker = EngineWorker(name, path, self._on_engine_result,
+                                  ready_callback=self.engine_ready.emit,
+                                  handshake_timeout=handshake_timeout,
+                                  update_rate=self.update_rate,
+                                  multipv=self.multipv,
+                                  options=engine_options(self.engines_config, name,
+                                                         path, resources),
+                                  pool=self.engine_pool)
 
             with self.worker_lock:
                 self.workers[name] = worker
+                self.engine_ids[name] = engine_identity(name, path)
+                self._rebalance_resources(exclude=name)
 
             # Start worker thread
             worker.start()
@@ -386,12 +649,37 @@ class MultiEngineManager(QObject):
                     worker.join(timeout=2.0)
 
                 del self.workers[name]
+                self.engine_ids.pop(name, None)
                 print(f"✅ Removed engine: {name}")
 
+                # Engine còn lại nhận thêm phần core/RAM vừa được trả
+                self._rebalance_resources()
+
+                # Không còn engine ngoài sẵn sàng -> built-in tiếp quản position cuối
+                if self._fallback_active() and self.last_position:
+                    builtin_name = self.builtin_worker.engine_name
+                    self.builtin_worker.send_command(
+                        dict(self.last_position, cached=self._cached_result(builtin_name)))
+
+    def _rebalance_resources(self, exclude: str = None):
+        """Chia lại Threads/Hash cho các engine đang chạy (gọi khi giữ worker_lock)"""
+        resources = split_resources(len(self.workers), self.resource_policy)
+        for name, worker in self.workers.items():
+            if name != exclude:
+                options = engine_options(self.engines_config, name,
+                                         worker.engine_path, resources)
+                worker.send_command({'type': 'set_options', 'options': options})
+
+    def get_engine_options(self, name: str) -> Dict[str, dict]:
+        """Option mà engine khai báo (để hiển thị/cấu hình)"""
+        with self.worker_lock:
+            worker = self.workers.get(name)
+        return worker.get_engine_options() if worker else {}
+
     def get_active_engines(self) -> List[str]:
-        """Lấy danh sách engine đang hoạt động"""
+        """Lấy danh sách engine đang hoạt động (gồm built-in khi dự phòng)"""
         with self.worker_lock:
-            return list(self.workers.keys())
+            return [worker.engine_name for worker in self._command_targets()]
 
     def set_position_all(self, fen: str, moves: List[str] = None):
         """Đặt position cho tất cả engines"""
@@ -401,11 +689,21 @@ class MultiEngineManager(QObject):
             'moves': moves or []
         }
 
+        position = position_after_moves(fen, moves)
+
+        if position is not None:
+            # Worker gắn khóa này với search để lưu cache đúng position đã search
+            command['key'] = position.key
+
         with self.worker_lock:
-            for worker in self.workers.values():
-                worker.send_command(command)
+            self.last_position = command
+            self.current_position = position
+            targets = self._command_targets()
+            for worker in targets:
+                worker.send_command(
+                    dict(command, cached=self._cached_result(worker.engine_name)))
 
-        print(f"📍 Set position for {len(self.workers)} engines")
+        print(f"📍 Set position for {len(targets)} engines")
 
     def get_hint_all(self, depth: int = 8):
         """Yêu cầu hint từ tất cả engines"""
@@ -415,21 +713,38 @@ class MultiEngineManager(QObject):
         }
 
         with self.worker_lock:
-            for worker in self.workers.values():
+            targets = self._command_targets()
+            for worker in targets:
                 worker.send_command(command)
 
         print(
-            f"🤖 Requested hints from {len(self.workers)} engines (depth {depth})")
+            f"🤖 Requested hints from {len(targets)} engines (depth {depth})")
 
     def start_analysis_all(self):
         """Bắt đầu analysis cho tất cả engines"""
         command = {'type': 'start_analysis'}
 
+        with self.worker_lock:
+            targets = self._command_targets()
+            for worker in targets:
+                worker.send_command(command)
+
+        print(f"🔍 Started analysis for {len(targets)} engines")
+
+    def set_multipv_all(self, count: int):
+        """
+        Đặt số nước ứng viên (MultiPV) cho tất cả engines
+
+        Analysis đang chạy được khởi động lại với số PV mới.
+        """
+        self.multipv = max(1, count)
+        command = {'type': 'set_multipv', 'count': self.multipv}
+
         with self.worker_lock:
             for worker in self.workers.values():
                 worker.send_command(command)
 
-        print(f"🔍 Started analysis for {len(self.workers)} engines")
+        print(f"🔢 MultiPV = {self.multipv} for {len(self.workers)} engines")
 
     def stop_analysis_all(self):
         """Dừng analysis cho tất cả engines"""
@@ -438,6 +753,8 @@ class MultiEngineManager(QObject):
         with self.worker_lock:
             for worker in self.workers.values():
                 worker.send_command(command)
+            if self.builtin_worker is not None:
+                self.builtin_worker.send_command(command)
 
         print(f"⏹️ Stopped analysis for {len(self.workers)} engines")
 
@@ -446,8 +763,8 @@ class MultiEngineManager(QObject):
         results = {}
 
         with self.worker_lock:
-            for name, worker in self.workers.items():
-                results[name] = worker.get_result()
+            for worker in self._command_targets():
+                results[worker.engine_name] = worker.get_result()
 
         return results
 
@@ -456,6 +773,9 @@ class MultiEngineManager(QObject):
         with self.worker_lock:
             workers_to_stop = list(self.workers.values())
             engine_names = list(self.workers.keys())
+            if self.builtin_worker is not None:
+                workers_to_stop.append(self.builtin_worker)
+                self.builtin_worker = None
 
         # Stop all workers
         for worker in workers_to_stop:
@@ -469,10 +789,54 @@ class MultiEngineManager(QObject):
         with self.worker_lock:
             self.workers.clear()
 
+        if self.engine_pool is not None:
+            self.engine_pool.close()
+            self.engine_pool = None
+
+        if self.analysis_cache is not None:
+            self.analysis_cache.close()
+            self.analysis_cache = None
+
         print(f"🛑 Stopped all engines: {engine_names}")
 
+    def _cached_result(self, engine_name: str) -> Optional[dict]:
+        """Kết quả đã cache của engine cho position hiện tại"""
+        position = self.current_position
+        engine_id = self.engine_ids.get(engine_name)
+        if self.analysis_cache is None or position is None or engine_id is None:
+            return None
+        return self.analysis_cache.lookup(engine_id, position.key)
+
+    def _store_result(self, engine_name: str, result: dict):
+        """Ghi kết quả vào analysis cache theo khóa position mà search đã chạy"""
+        key = result.get('key')
+        engine_id = self.engine_ids.get(engine_name)
+        pv = result.get('pv') or []
+        if (self.analysis_cache is None or key is None or engine_id is None
+                or result.get('depth', 0) <= 0 or not pv):
+            return
+
+        signature = (key, result['depth'], tuple(pv))
+        if self.stored_results.get(engine_name) == signature:
+            return
+
+        self.stored_results[engine_name] = signature
+        self.analysis_cache.store(engine_id, key, result)
+
     def _on_engine_result(self, engine_name: str, result: dict):
         """Callback khi có kết quả từ engine (thread-safe)"""
+        try:
+            self._store_result(engine_name, result)
+        except sqlite3.Error as e:
+            print(f"⚠️ Analysis cache error: {e}")
+
+        builtin = self.builtin_worker
+        if (builtin is not None and engine_name != builtin.engine_name
+                and result.get('status') == 'ready'
+                and builtin.get_result()['status'] in ('thinking', 'analyzing')):
+            # Engine ngoài đã sẵn sàng -> built-in không cần chạy tiếp
+            builtin.send_command({'type': 'stop_analysis'})
+
         # Emit signal để update UI
         self.engine_result_updated.emit(engine_name, result)
 
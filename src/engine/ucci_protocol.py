@@ -4,38 +4,206 @@ UCCI Protocol Implementation
 Giao thức UCCI (Universal Chinese Chess Interface) cho cờ tướng
 """
 
-import subprocess
+import asyncio
+import json
+import os
 import threading
-import queue
-import time
 import traceback
-from typing import Optional, List, Callable
+from typing import Optional, List, Callable, Dict
 
+from .engine_loop import EngineLoop, get_engine_loop
+from .info_parser import (RESULT_INFO_FIELDS, parse_bestmove, parse_info,
+                          score_to_evaluation)
+
+# Thời gian chờ mặc định cho mỗi bước handshake (ucciok/uciok, readyok) - giây
+HANDSHAKE_TIMEOUT = 2.0
+
+# Protocol đã dò được của từng binary engine (đường dẫn thật + mtime)
+PROTOCOL_CACHE_PATH = os.path.join("cache", "engine_protocols.json")
+
+_protocol_cache_lock = threading.Lock()
+
+
+def _protocol_cache_key(engine_path: str) -> Optional[str]:
+    real_path = os.path.realpath(engine_path)
+    try:
+        return f"{real_path}|{os.stat(real_path).st_mtime_ns}"
+    except OSError:
+        return None
+
+
+def load_cached_protocol(engine_path: str) -> Optional[str]:
+    """Protocol đã lưu của binary engine, None nếu chưa có hoặc binary đã đổi"""
+    key = _protocol_cache_key(engine_path)
+    if key is None:
+        return None
+    with _protocol_cache_lock:
+        try:
+            with open(PROTOCOL_CACHE_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f).get(key)
+        except (OSError, ValueError):
+            return None
+
+
+def save_cached_protocol(engine_path: str, protocol: str):
+    """Lưu protocol của binary engine để lần sau bỏ qua bước dò"""
+    key = _protocol_cache_key(engine_path)
+    if key is None:
+        return
+    with _protocol_cache_lock:
+        try:
+            with open(PROTOCOL_CACHE_PATH, 'r', encoding='utf-8') as f:
+                protocols = json.load(f)
+        except (OSError, ValueError):
+            protocols = {}
+        if protocols.get(key) == protocol:
+            return
+        protocols[key] = protocol
+        try:
+            os.makedirs(os.path.dirname(PROTOCOL_CACHE_PATH), exist_ok=True)
+            with open(PROTOCOL_CACHE_PATH, 'w', encoding='utf-8') as f:
+                json.dump(protocols, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠️ Không lưu được protocol cache: {e}")
+
+
+# Từ khóa trong dòng 'option' của engine
+_OPTION_KEYWORDS = ("type", "default", "min", "max", "var")
+
+
+def option_key(name: str) -> str:
+    """Khóa so sánh tên option: UCI dùng dấu cách, UCCI dùng '_' (e.g. 'Skill Level')"""
+    return name.strip().lower().replace(" ", "_")
+
+
+def parse_option_line(line: str) -> Optional[dict]:
+    """
+    Parse dòng khai báo option của engine
+
+    UCI:  'option name Hash type spin default 16 min 1 max 33554432'
+    UCCI: 'option hashsize type spin min 16 max 1024 default 16'
+
+    Returns:
+        dict hoặc None: {'name': 'Hash', 'type': 'spin', 'default': 16,
+                         'min': 1, 'max': 33554432, 'vars': [...]}
+    """
+    parts = line.split()
+    if len(parts) < 2 or parts[0] != "option":
+        return None
+
+    fields = {"name": [], "type": [], "default": [], "min": [], "max": []}
+    option = {"vars": []}
+    current = "name"
+    for token in parts[2:] if parts[1] == "name" else parts[1:]:
+        if token in _OPTION_KEYWORDS:
+            current = token
+            if token == "var":
+                option["vars"].append([])
+        elif current == "var":
+            option["vars"][-1].append(token)
+        else:
+            fields[current].append(token)
+
+    option["name"] = " ".join(fields["name"])
+    option["type"] = " ".join(fields["type"]) or "string"
+    option["vars"] = [" ".join(var) for var in option["vars"]]
+    default = " ".join(fields["default"])
+    if option["type"] == "spin":
+        try:
+            option["default"] = int(default)
+            option["min"] = int(fields["min"][0]) if fields["min"] else None
+            option["max"] = int(fields["max"][0]) if fields["max"] else None
+        except ValueError:
+            return None
+    elif option["type"] == "check":
+        option["default"] = default.lower() == "true"
+    else:
+        option["default"] = "" if default == "<empty>" else default
+    return option if option["name"] else None
+
+
+def coerce_option_value(option: dict, value):
+    """
+    Đổi giá trị về đúng kiểu option (spin bị kẹp vào [min, max])
+
+    Raises:
+        ValueError: Giá trị không hợp lệ với option
+    """
+    option_type = option["type"]
+    if option_type == "spin":
+        value = int(value)
+        if option.get("min") is not None:
+            value = max(option["min"], value)
+        if option.get("max") is not None:
+            value = min(option["max"], value)
+        return value
+    if option_type == "check":
+        if isinstance(value, str):
+            return value.strip().lower() in ("true", "1", "yes", "on")
+        return bool(value)
+    if option_type == "combo":
+        for var in option["vars"]:
+            if var.lower() == str(value).lower():
+                return var
+        raise ValueError(f"{value} không thuộc {option['vars']}")
+    if option_type == "button":
+        return None
+    return str(value)
 
-class UCCIEngine:
-    """Class để giao tiếp với engine cờ tướng qua giao thức UCCI"""
 
-    def __init__(self, engine_path: str, protocol: str = "auto"):
+class UCCIEngine:
+    """
+    Class để giao tiếp với engine cờ tướng qua giao thức UCCI
+
+    Process engine chạy qua asyncio trên EngineLoop dùng chung: đọc stdout,
+    dò protocol và gửi lệnh đều là task/callback của loop, không tạo thread
+    riêng cho từng engine. Các hàm đồng bộ (start, stop, send_command...)
+    gọi được từ bất kỳ thread nào; code chạy trong loop dùng start_async,
+    stop_async.
+    """
+
+    def __init__(self, engine_path: str, protocol: str = "auto",
+                 loop: EngineLoop = None, handshake_timeout: float = HANDSHAKE_TIMEOUT,
+                 options: Dict[str, object] = None):
         """
         Khởi tạo engine
 
         Args:
             engine_path: Đường dẫn đến file executable của engine
             protocol: "auto" để auto-detect, "ucci" cho cờ tướng, "uci" cho cờ vua
+            loop: EngineLoop chạy I/O (mặc định loop dùng chung)
+            handshake_timeout: Thời gian chờ tối đa mỗi bước handshake (giây)
+            options: Option gửi ngay sau handshake, trước isready (e.g. {'Hash': 256})
         """
         self.engine_path = engine_path
         self.protocol = protocol.lower()
         self.detected_protocol = None  # Protocol được detect
+        self.loop = loop or get_engine_loop()
         self.process = None
-        self.input_queue = queue.Queue()
-        self.output_queue = queue.Queue()
         self.is_running = False
-        self.engine_thread = None
+        self.handshake_timeout = handshake_timeout
+        # In lệnh gửi/nhận ra console (tắt khi chạy hàng loạt)
+        self.echo = True
+        self.reader_task = None
+        self.handshake_task = None
         self.protocol_detected = False  # Flag để biết đã detect xong protocol
-
-        # Callback functions
+        self.protocol_event = None  # asyncio.Event, set khi nhận ucciok/uciok
+        self.ready_event = None  # asyncio.Event, set khi nhận readyok
+
+        # Option engine khai báo khi handshake: {option_key: dict của parse_option_line}
+        self.options: Dict[str, dict] = {}
+        # Giá trị hiện tại của từng option (mặc định của engine hoặc đã gửi)
+        self.option_values: Dict[str, object] = {}
+        self.requested_options = dict(options or {})
+        self._unsupported_options = set()
+        # Bên đi của position gửi gần nhất ('red'/'black')
+        self.side_to_move = 'red'
+
+        # Callback functions (gọi trong thread của loop)
         self.on_bestmove: Optional[Callable[[str], None]] = None
         self.on_info: Optional[Callable[[str], None]] = None
+        # Gọi với protocol ngay khi handshake xong
+        self.on_ready: Optional[Callable[[str], None]] = None
 
     def start(self) -> bool:
         """
@@ -44,60 +212,83 @@ class UCCIEngine:
         Returns:
             True nếu khởi động thành công, False nếu thất bại
         """
+        return self.loop.run(self.start_async())
+
+    async def start_async(self) -> bool:
+        """Khởi động engine (chạy trong loop)"""
         try:
-            self.process = subprocess.Popen(
+            self.process = await asyncio.create_subprocess_exec(
                 self.engine_path,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=0
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
             )
+        except Exception as e:
+            print(f"Lỗi khởi động engine: {e}")
+            return False
 
-            self.is_running = True
-            self.engine_thread = threading.Thread(
-                target=self._engine_communication)
-            self.engine_thread.daemon = True
-            self.engine_thread.start()
-
-            # Auto-detect protocol hoặc sử dụng protocol đã chỉ định
-            if self.protocol == "auto":
-                self._detect_protocol()
-            else:
-                # Sử dụng protocol đã chỉ định
-                self.detected_protocol = self.protocol
-                self.protocol_detected = True
-                self._send_init_command()
+        self.is_running = True
+        self.protocol_event = asyncio.Event()
+        self.ready_event = asyncio.Event()
+        self.reader_task = asyncio.ensure_future(self._engine_communication())
+        self.handshake_task = asyncio.ensure_future(self._handshake())
+        return True
 
-            return True
+    async def wait_ready(self) -> bool:
+        """
+        Chờ handshake xong (chạy trong loop)
 
-        except Exception as e:
-            print(f"Lỗi khởi động engine: {e}")
+        Returns:
+            bool: True nếu engine đã trả lời readyok
+        """
+        if self.handshake_task is None:
             return False
+        return await asyncio.shield(self.handshake_task)
 
     def stop(self):
         """Dừng engine"""
-        if self.is_running:
-            self.send_command("quit")
-            self.is_running = False
+        if self.loop.in_loop_thread():
+            asyncio.ensure_future(self.stop_async())
+        else:
+            self.loop.run(self.stop_async())
+
+    async def stop_async(self):
+        """Dừng engine (chạy trong loop)"""
+        if not self.is_running and self.process is None:
+            return
 
-            if self.process:
-                self.process.terminate()
-                self.process.wait(timeout=5)
-                self.process = None
+        self._write("quit")
+        self.is_running = False
+        if self.handshake_task:
+            self.handshake_task.cancel()
+
+        process = self.process
+        self.process = None
+        if process:
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        if self.reader_task:
+            await self.reader_task
 
     def send_command(self, command: str):
         """
-        Gửi lệnh đến engine
+        Gửi lệnh đến engine (thread-safe, thứ tự lệnh được giữ nguyên)
 
         Args:
             command: Lệnh UCCI cần gửi
         """
+        self.loop.call_soon(self._write, command)
+
+    def _write(self, command: str):
+        """Ghi lệnh vào stdin engine (trong thread của loop)"""
         if self.process and self.is_running:
             try:
-                self.process.stdin.write(command + "\n")
-                self.process.stdin.flush()
-                print(f"Gửi: {command}")
+                self.process.stdin.write((command + "\n").encode())
+                if self.echo:
+                    print(f"Gửi: {command}")
             except Exception as e:
                 print(f"Lỗi gửi lệnh: {e}")
 
@@ -109,6 +300,91 @@ class UCCIEngine:
         else:  # UCI
             self.send_command("ucinewgame")
 
+    def set_option(self, name: str, value) -> bool:
+        """
+        Đặt option của engine (chỉ gửi khi engine không search)
+
+        Tên option được so khớp không phân biệt hoa thường với danh sách engine
+        khai báo; giá trị spin được kẹp vào [min, max].
+
+        Args:
+            name: Tên option (e.g., "MultiPV", "Hash")
+            value: Giá trị option
+
+        Returns:
+            bool: True nếu đã gửi setoption
+        """
+        key = option_key(name)
+        option = self.options.get(key)
+        if option is None and self.options:
+            # Engine đã khai báo option nhưng không có option này
+            if key not in self._unsupported_options:
+                self._unsupported_options.add(key)
+                print(f"⚠️ Engine không hỗ trợ option: {name}")
+            return False
+
+        if option is not None:
+            try:
+                value = coerce_option_value(option, value)
+            except (TypeError, ValueError) as e:
+                print(f"⚠️ Giá trị không hợp lệ cho option {name}: {e}")
+                return False
+            name = option["name"]
+            if option["type"] == "check":
+                value_text = "true" if value else "false"
+            else:
+                value_text = "" if value is None else str(value)
+        else:
+            value_text = str(value)
+
+        protocol = self.detected_protocol or self.protocol
+        if protocol == "ucci":
+            command = f"setoption {name} {value_text}"
+        else:  # UCI
+            command = f"setoption name {name}"
+            if value_text:
+                command += f" value {value_text}"
+        self.send_command(command.rstrip())
+        self.option_values[key] = value
+        return True
+
+    def changed_options(self, options: Dict[str, object]) -> Dict[str, object]:
+        """Các option trong options có giá trị khác giá trị hiện tại của engine"""
+        changed = {}
+        for name, value in options.items():
+            key = option_key(name)
+            option = self.options.get(key)
+            if option is not None and option["type"] != "button":
+                try:
+                    if coerce_option_value(option, value) == self.option_values.get(key):
+                        continue
+                except (TypeError, ValueError):
+                    pass
+            changed[name] = value
+        return changed
+
+    def apply_options(self, options: Dict[str, object]) -> Dict[str, object]:
+        """
+        Gửi các option có giá trị khác giá trị hiện tại của engine
+
+        Returns:
+            dict: Các option đã gửi {tên: giá trị}
+        """
+        applied = {}
+        for name, value in self.changed_options(options).items():
+            if self.set_option(name, value):
+                applied[name] = self.option_values[option_key(name)]
+        return applied
+
+    def set_multipv(self, count: int) -> bool:
+        """
+        Số nước ứng viên (PV) engine trả về trong mỗi lần search
+
+        Args:
+            count: Số PV (1 = chỉ nước tốt nhất)
+        """
+        return self.set_option("MultiPV", max(1, int(count)))
+
     def set_position(self, fen: str, moves: List[str] = None):
         """
         Thiết lập vị trí bàn cờ
@@ -120,24 +396,63 @@ class UCCIEngine:
         command = f"position fen {fen}"
         if moves:
             command += " moves " + " ".join(moves)
+        # Bên đi của position (UCCI gửi thời gian theo bên đi/đối thủ)
+        parts = fen.split()
+        black_first = len(parts) >= 2 and parts[1] == 'b'
+        self.side_to_move = 'black' if black_first ^ (len(moves or []) % 2 == 1) else 'red'
         self.send_command(command)
 
-    def go(self, depth: int = None, time_ms: int = None):
+    def go(self, depth: int = None, time_ms: int = None, wtime: int = None,
+           btime: int = None, winc: int = None, binc: int = None,
+           movestogo: int = None, ponder: bool = False):
         """
         Yêu cầu engine tìm nước đi tốt nhất
 
         Args:
             depth: Độ sâu tìm kiếm
             time_ms: Thời gian suy nghĩ (milliseconds)
+            wtime, btime: Thời gian còn lại của Đỏ/Đen (milliseconds)
+            winc, binc: Thời gian cộng thêm mỗi nước của Đỏ/Đen (milliseconds)
+            movestogo: Số nước tới lần cộng giờ tiếp theo
+            ponder: 'go ponder' - suy nghĩ trong lượt đối thủ trên nước đoán trước,
+                    engine chỉ trả bestmove sau ponderhit hoặc stop
         """
-        command = "go"
+        command = "go ponder" if ponder else "go"
         if depth:
             command += f" depth {depth}"
         if time_ms:
             command += f" movetime {time_ms}"
+        if wtime is not None or btime is not None:
+            command += self._clock_arguments(wtime, btime, winc, binc, movestogo)
 
         self.send_command(command)
 
+    def _clock_arguments(self, wtime, btime, winc, binc, movestogo) -> str:
+        """Phần thời gian của lệnh go: UCI 'wtime .. btime ..', UCCI 'time .. opptime ..'"""
+        protocol = self.detected_protocol or self.protocol
+        if protocol != "ucci":
+            arguments = ""
+            for name, value in (("wtime", wtime), ("btime", btime), ("winc", winc),
+                                ("binc", binc), ("movestogo", movestogo)):
+                if value is not None:
+                    arguments += f" {name} {max(0, int(value))}"
+            return arguments
+
+        if self.side_to_move == 'black':
+            own, opp = (btime, binc), (wtime, winc)
+        else:
+            own, opp = (wtime, winc), (btime, binc)
+        arguments = ""
+        for prefix, (remaining, increment) in (("", own), ("opp", opp)):
+            if remaining is None:
+                continue
+            arguments += f" {prefix}time {max(0, int(remaining))}"
+            if movestogo:
+                arguments += f" {prefix}movestogo {movestogo}"
+            elif increment:
+                arguments += f" {prefix}increment {int(increment)}"
+        return arguments
+
     def go_infinite(self):
         """
         Yêu cầu engine phân tích liên tục (infinite analysis)
@@ -148,6 +463,10 @@ class UCCIEngine:
         """Dừng tìm kiếm"""
         self.send_command("stop")
 
+    def ponderhit(self):
+        """Đối thủ đã đi đúng nước đoán trước: tiếp tục search 'go ponder' như search thường"""
+        self.send_command("ponderhit")
+
     def make_move(self, move: str):
         """
         Thông báo cho engine về nước đi vừa thực hiện
@@ -167,32 +486,79 @@ class UCCIEngine:
         """
         self.go(depth=depth)
 
-    def _detect_protocol(self):
-        """Auto-detect protocol của engine"""
-        print(f"🔍 Đang detect protocol cho engine: {self.engine_path}")
+    async def _handshake(self) -> bool:
+        """
+        Handshake theo sự kiện: gửi ucci/uci, chờ ucciok/uciok, rồi
+        isready/readyok - mỗi bước chờ tối đa handshake_timeout giây
+        """
+        if self.protocol != "auto":
+            # Sử dụng protocol đã chỉ định
+            self.detected_protocol = self.protocol
+            self.protocol_detected = True
+            self._send_init_command()
+            await self._wait_event(self.protocol_event)
+        else:
+            cached = load_cached_protocol(self.engine_path)
+            if cached and await self._probe(cached):
+                print(f"💾 Dùng protocol đã lưu: {cached.upper()}")
+            elif not await self._detect_protocol():
+                self._protocol_detection_failed()
+            else:
+                save_cached_protocol(self.engine_path, self.detected_protocol)
 
-        # Thử UCCI trước (vì đây là app cờ tướng)
-        import time
-        time.sleep(0.1)  # Đợi engine khởi động
+        # Option phải được đặt trước isready (e.g. Hash cấp phát lại bộ nhớ)
+        if self.requested_options:
+            applied = self.apply_options(self.requested_options)
+            if applied:
+                print(f"⚙️ Options: {applied}")
 
-        print("🧪 Thử UCCI protocol...")
-        self.send_command("ucci")
+        self._write("isready")
+        ready = await self._wait_event(self.ready_event)
+        if ready and self.on_ready:
+            try:
+                self.on_ready(self.detected_protocol)
+            except Exception as e:
+                print(f"Lỗi trong callback on_ready: {e}")
+        return ready
 
-        # Đợi phản hồi trong 2 giây
-        import threading
-        timer = threading.Timer(2.0, self._try_uci_protocol)
-        timer.start()
+    async def synchronize(self) -> bool:
+        """
+        isready/readyok: chờ engine xử lý xong mọi lệnh đã gửi (chạy trong loop)
 
-    def _try_uci_protocol(self):
-        """Thử UCI protocol nếu UCCI không phản hồi"""
-        if not self.protocol_detected:
-            print("🧪 UCCI không phản hồi, thử UCI protocol...")
-            self.send_command("uci")
+        Returns:
+            bool: True nếu engine trả lời readyok trong handshake_timeout
+        """
+        if not self.is_running:
+            return False
+        self.ready_event.clear()
+        self._write("isready")
+        return await self._wait_event(self.ready_event)
 
-            # Timeout cuối cùng
-            import threading
-            timer = threading.Timer(2.0, self._protocol_detection_failed)
-            timer.start()
+    async def _wait_event(self, event: asyncio.Event) -> bool:
+        try:
+            await asyncio.wait_for(event.wait(), timeout=self.handshake_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _probe(self, protocol: str) -> bool:
+        """Gửi lệnh khởi tạo của protocol và chờ ok"""
+        print(f"🧪 Thử {protocol.upper()} protocol...")
+        self._write(protocol)
+        if await self._wait_event(self.protocol_event):
+            return True
+        print(f"🧪 {protocol.upper()} không phản hồi")
+        return False
+
+    async def _detect_protocol(self) -> bool:
+        """Auto-detect protocol của engine"""
+        print(f"🔍 Đang detect protocol cho engine: {self.engine_path}")
+
+        # Thử UCCI trước (vì đây là app cờ tướng), không phản hồi thì thử UCI
+        for probe in ("ucci", "uci"):
+            if await self._probe(probe):
+                return True
+        return False
 
     def _protocol_detection_failed(self):
         """Xử lý khi không detect được protocol"""
@@ -214,22 +580,22 @@ class UCCIEngine:
         """Lấy protocol đã được detect"""
         return self.detected_protocol or "unknown"
 
-    def _engine_communication(self):
-        """Thread xử lý giao tiếp với engine"""
-        while self.is_running and self.process:
+    async def _engine_communication(self):
+        """Task đọc output của engine"""
+        stdout = self.process.stdout
+        while True:
             try:
-                if self.process.poll() is not None:
+                line = await stdout.readline()
+                if not line:
                     # Engine đã thoát
                     print("Engine process đã kết thúc")
                     break
 
-                line = self.process.stdout.readline()
-                if not line:
-                    continue
-
-                line = line.strip()
+                line = line.decode(errors="replace").strip()
                 if line:
-                    print(f"Nhận: {line}")
+                    # Dòng info chiếm gần hết output khi search: không in ra console
+                    if self.echo and not line.startswith("info "):
+                        print(f"Nhận: {line}")
                     self._process_engine_output(line)
 
             except Exception as e:
@@ -237,7 +603,7 @@ class UCCIEngine:
                 print(f"Traceback: {traceback.format_exc()}")
                 break
 
-        print("Engine communication thread kết thúc")
+        print("Engine communication task kết thúc")
         self.is_running = False
 
     def _process_engine_output(self, line: str):
@@ -247,48 +613,56 @@ class UCCIEngine:
         Args:
             line: Dòng output từ engine
         """
-        parts = line.split()
-        if not parts:
+        command, _, rest = line.partition(" ")
+        if not command:
             return
 
-        command = parts[0]
+        # info là output nhiều nhất khi search nên kiểm tra trước
+        if command == "info":
+            if self.on_info:
+                try:
+                    self.on_info(line)
+                except Exception as e:
+                    print(f"Lỗi trong callback on_info: {e}")
+                    print(f"Traceback: {traceback.format_exc()}")
 
-        if command == "ucciok":
+        elif command == "ucciok":
             print("✅ Engine hỗ trợ UCCI protocol")
             if not self.protocol_detected:
                 self.detected_protocol = "ucci"
                 self.protocol_detected = True
+            self.protocol_event.set()
 
         elif command == "uciok":
             print("✅ Engine hỗ trợ UCI protocol")
             if not self.protocol_detected:
                 self.detected_protocol = "uci"
                 self.protocol_detected = True
+            self.protocol_event.set()
 
         elif command == "readyok":
             print("Engine đã ready")
+            self.ready_event.set()
 
-        elif command == "bestmove":
-            if len(parts) >= 2:
-                # Gửi toàn bộ dòng bestmove để parse cả bestmove và ponder
-                if self.on_bestmove:
-                    try:
-                        # Gửi toàn bộ dòng thay vì chỉ move
-                        self.on_bestmove(line)
-                    except Exception as e:
-                        print(f"Lỗi trong callback on_bestmove: {e}")
-                        print(f"Traceback: {traceback.format_exc()}")
-
-        elif command == "info":
-            if self.on_info:
+        elif command in ("bestmove", "nobestmove"):
+            # Mỗi lệnh go kết thúc bằng đúng 1 dòng bestmove/nobestmove (UCCI),
+            # gửi toàn bộ dòng để parse cả bestmove và ponder
+            if self.on_bestmove:
                 try:
-                    self.on_info(line)
+                    self.on_bestmove(line)
                 except Exception as e:
-                    print(f"Lỗi trong callback on_info: {e}")
+                    print(f"Lỗi trong callback on_bestmove: {e}")
                     print(f"Traceback: {traceback.format_exc()}")
 
+        elif command == "option":
+            option = parse_option_line(line)
+            if option:
+                key = option_key(option["name"])
+                self.options[key] = option
+                self.option_values.setdefault(key, option["default"])
+
         elif command == "id":
-            print(f"Engine info: {' '.join(parts[1:])}")
+            print(f"Engine info: {rest}")
 
 
 class UCCIEngineManager:
@@ -405,6 +779,8 @@ class MultiEngineManager:
                 engine_name, line)
             engine.on_info = lambda line, engine_name=name: self._handle_engine_info(
                 engine_name, line)
+            engine.on_ready = lambda protocol, engine_name=name: self._handle_engine_ready(
+                engine_name, protocol)
 
             if auto_start and engine.start():
                 self.active_engines[name] = engine
@@ -417,18 +793,6 @@ class MultiEngineManager:
                     'protocol': 'detecting...'  # Thêm thông tin protocol
                 }
 
-                # Đợi một chút để protocol được detect
-                import threading
-
-                def update_protocol():
-                    import time
-                    time.sleep(3)  # Đợi 3 giây
-                    if name in self.engine_results:
-                        detected = engine.get_detected_protocol()
-                        self.engine_results[name]['protocol'] = detected
-                        print(f"✓ Engine {name} detected protocol: {detected}")
-
-                threading.Thread(target=update_protocol, daemon=True).start()
                 print(f"✓ Đã thêm engine: {name} (auto-detecting protocol...)")
                 return True
             else:
@@ -500,17 +864,19 @@ class MultiEngineManager:
         for name in list(self.active_engines.keys()):
             self.remove_engine(name)
 
+    def _handle_engine_ready(self, engine_name: str, protocol: str):
+        """Cập nhật protocol ngay khi engine handshake xong"""
+        if engine_name in self.engine_results:
+            self.engine_results[engine_name]['protocol'] = protocol
+            print(f"✓ Engine {engine_name} detected protocol: {protocol}")
+
     def _handle_engine_bestmove(self, engine_name: str, bestmove_line: str):
         """Xử lý bestmove từ engine"""
         try:
-            parts = bestmove_line.split()
-            if len(parts) >= 2:
-                bestmove = parts[1]
+            bestmove, ponder = parse_bestmove(bestmove_line)
+            if bestmove:
                 self.engine_results[engine_name]['bestmove'] = bestmove
-
-                # Parse ponder move nếu có
-                if len(parts) >= 4 and parts[2] == "ponder":
-                    ponder = parts[3]
+                if ponder:
                     self.engine_results[engine_name]['ponder'] = ponder
 
                 print(f"🎯 {engine_name} bestmove: {bestmove}")
@@ -526,40 +892,21 @@ class MultiEngineManager:
     def _handle_engine_info(self, engine_name: str, info_line: str):
         """Xử lý info từ engine"""
         try:
-            parts = info_line.split()
-
-            # Parse các thông tin từ info line
-            i = 1  # Bỏ qua "info"
-            while i < len(parts):
-                if parts[i] == "depth" and i + 1 < len(parts):
-                    self.engine_results[engine_name]['depth'] = int(
-                        parts[i + 1])
-                    i += 2
-                elif parts[i] == "score" and i + 2 < len(parts):
-                    if parts[i + 1] == "cp":
-                        # Centipawn score
-                        score = int(parts[i + 2]) / 100.0
-                        self.engine_results[engine_name]['evaluation'] = score
-                        i += 3
-                    elif parts[i + 1] == "mate":
-                        # Mate score
-                        mate_moves = int(parts[i + 2])
-                        self.engine_results[engine_name]['evaluation'] = float(
-                            'inf') if mate_moves > 0 else float('-inf')
-                        i += 3
-                    else:
-                        i += 1
-                elif parts[i] == "nodes" and i + 1 < len(parts):
-                    self.engine_results[engine_name]['nodes'] = int(
-                        parts[i + 1])
-                    i += 2
-                elif parts[i] == "pv":
-                    # Principal variation
-                    pv = parts[i + 1:]
-                    self.engine_results[engine_name]['pv'] = pv
-                    break
-                else:
-                    i += 1
+            info = parse_info(info_line, RESULT_INFO_FIELDS)
+            # Chỉ theo dõi PV tốt nhất
+            if not info or info.get('multipv', 1) > 1:
+                return
+
+            result = self.engine_results[engine_name]
+            if 'depth' in info:
+                result['depth'] = info['depth']
+            evaluation = score_to_evaluation(info)
+            if evaluation is not None:
+                result['evaluation'] = evaluation
+            if 'nodes' in info:
+                result['nodes'] = info['nodes']
+            if 'pv' in info:
+                result['pv'] = info['pv']
 
             # Callback cho UI nếu có depth và evaluation
             if (self.engine_results[engine_name]['depth'] > 0 and
@@ -519,13 +519,8 @@ class BoardWidget(QWidget):
                             return
 
                     # Thực hiện nước đi
-                    # Import GameState để validate
-                    from ..core.game_state import GameState
-                    temp_game_state = GameState()
-                    temp_game_state.board = [r[:] for r in self.board_state]
-                    temp_game_state.current_player = self.current_player
-
-                    if temp_game_state.is_valid_move(from_row, from_col, row, col):
+                    # possible_moves đã chứa đúng các nước hợp lệ của quân được chọn
+                    if (row, col) in self.possible_moves:
                         # Không modify board_state ở đây, để GameState xử lý
                         piece = self.board_state[from_row][from_col]
                         captured_piece = self.board_state[row][col]
@@ -630,25 +625,19 @@ class BoardWidget(QWidget):
         Returns:
             list: List of possible move positions (tuples of (row, col))
         """
-        possible_moves = []
         piece = self.board_state[row][col]
 
         if piece is None:
-            return possible_moves
+            return []
 
-        # Import GameState để validate moves
+        # Import GameState để sinh nước đi
         from ..core.game_state import GameState
         temp_game_state = GameState()
         temp_game_state.board = [r[:] for r in self.board_state]
         temp_game_state.current_player = self.current_player
 
-        # Kiểm tra tất cả các ô trên bàn cờ
-        for to_row in range(10):
-            for to_col in range(9):
-                if temp_game_state.is_valid_move(row, col, to_row, to_col):
-                    possible_moves.append((to_row, to_col))
-
-        return possible_moves
+        # Chỉ duyệt các nước đi thực sự của quân này
+        return temp_game_state.get_legal_moves_from(row, col)
 
     def undo_last_move(self):
         """Hoàn tác nước đi cuối"""
@@ -1228,7 +1217,7 @@ class BoardWidget(QWidget):
         Đặt mũi tên từ nhiều engine với style mới
 
         Args:
-            arrows_data: {engine_name: [{'from': pos, 'to': pos, 'color': str, 'style': str, 'opacity': float, ...}]}
+            arrows_data: {engine_name: [{'from': pos, 'to': pos, 'color': str, 'style': str, 'opacity': float, 'rank': int (MultiPV), ...}]}
         """
         self.multi_engine_arrows = arrows_data.copy()
         self.update()
@@ -1311,6 +1300,10 @@ class BoardWidget(QWidget):
 
                         # Create label cho engine
                         label = engine_name
+                        rank = arrow_info.get('rank', 1)
+                        if rank > 1:
+                            # Nước ứng viên thứ rank (MultiPV)
+                            label = f"#{rank} {engine_name}"
                         if not is_current_turn:
                             # Đánh dấu gợi ý cho phe đối phương
                             label += " (phụ)"
@@ -5,21 +5,54 @@ Widget hiển thị thông tin về ván cờ (nước đi, thời gian, điểm
 """
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QListWidget, QGroupBox, QLCDNumber)
+                             QListWidget, QGroupBox, QLCDNumber, QComboBox)
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
 
+from ..core.clock import GameClock, UNLIMITED, parse_time_control
+
+# Các time control chọn được: (tên hiển thị, chuỗi parse_time_control)
+TIME_CONTROL_PRESETS = [
+    ("Không giới hạn", "none"),
+    ("Fischer 5+3", "300+3"),
+    ("Fischer 10+5", "600+5"),
+    ("Fischer 15+10", "900+10"),
+    ("40 nước / 30 phút", "40/1800"),
+    ("Byoyomi 10 phút + 3×30s", "600:30x3"),
+    ("5 giây mỗi nước", "st=5"),
+]
+
+# Chu kỳ vẽ lại đồng hồ (ms) - thời gian thật đọc từ GameClock nên không bị trôi
+CLOCK_REFRESH_MS = 100
+
+
+def format_clock(ms):
+    """ms -> 'h:mm:ss', 'mm:ss' hoặc 's.s' (dưới 10 giây)"""
+    if ms < 10000:
+        return f"{ms / 1000:.1f}"
+    seconds = int(ms // 1000)
+    minutes, seconds = divmod(seconds, 60)
+    if minutes >= 60:
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
 
 class GameInfoWidget(QWidget):
     """Widget hiển thị thông tin game"""
 
+    # Click vào nước đi trong danh sách: ply sau nước đó (1 = nước đầu tiên)
+    move_selected = pyqtSignal(int)
+    # Bên hết giờ ('red'/'black')
+    flag_fallen = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         self.move_count = 0
-        self.red_time = 0
-        self.black_time = 0
+        self.clock = GameClock()
+        # {ply: clock.snapshot() lúc bắt đầu lượt sau ply} để hoàn tác nước hết giờ
+        self.clock_states = {0: self.clock.snapshot()}
         self.timer = QTimer()
-        self.current_player_timer = True  # True = red, False = black
 
         self.init_ui()
         self.setup_timer()
@@ -32,6 +65,16 @@ class GameInfoWidget(QWidget):
         time_group = QGroupBox("Thời Gian")
         time_layout = QVBoxLayout(time_group)
 
+        # Chế độ thời gian
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("Chế độ:"))
+        self.time_control_combo = QComboBox()
+        for label, spec in TIME_CONTROL_PRESETS:
+            self.time_control_combo.addItem(label, spec)
+        self.time_control_combo.currentIndexChanged.connect(self._on_time_control_selected)
+        mode_layout.addWidget(self.time_control_combo)
+        time_layout.addLayout(mode_layout)
+
         # Thời gian quân đỏ
         red_time_layout = QHBoxLayout()
         red_time_layout.addWidget(QLabel("Đỏ:"))
@@ -79,36 +122,110 @@ class GameInfoWidget(QWidget):
 
         self.moves_list = QListWidget()
         self.moves_list.setAlternatingRowColors(True)
+        self.moves_list.itemClicked.connect(self._on_move_item_clicked)
         moves_layout.addWidget(self.moves_list)
 
         layout.addWidget(moves_group)
 
     def setup_timer(self):
-        """Thiết lập timer cho đồng hồ"""
+        """Thiết lập timer vẽ lại đồng hồ và bắt đầu tính giờ cho Đỏ"""
         self.timer.timeout.connect(self.update_timer)
-        self.timer.start(1000)  # Cập nhật mỗi giây
+        self.timer.start(CLOCK_REFRESH_MS)
+        self.clock.start('red')
 
     def update_timer(self):
-        """Cập nhật thời gian"""
-        if self.current_player_timer:
-            self.red_time += 1
-        else:
-            self.black_time += 1
-
+        """Kiểm tra hết giờ và cập nhật hiển thị"""
+        if self.clock.flag is None and self.clock.flagged() is not None:
+            self._on_flag_fallen(self.clock.flag)
         self.update_time_display()
 
     def update_time_display(self):
-        """Cập nhật hiển thị thời gian"""
-        red_minutes = self.red_time // 60
-        red_seconds = self.red_time % 60
-        red_time_str = f"{red_minutes:02d}:{red_seconds:02d}"
+        """Cập nhật hiển thị thời gian (còn lại, hoặc đã dùng nếu không giới hạn)"""
+        for side, display in (('red', self.red_time_display),
+                              ('black', self.black_time_display)):
+            if self.clock.mode == UNLIMITED:
+                display.display(format_clock(self.clock.used_time(side)))
+            else:
+                display.display(format_clock(self.clock.remaining(side)))
+
+    def set_time_control(self, time_control):
+        """
+        Đổi chế độ thời gian và bắt đầu tính giờ lại từ đầu cho bên đang đi
 
-        black_minutes = self.black_time // 60
-        black_seconds = self.black_time % 60
-        black_time_str = f"{black_minutes:02d}:{black_seconds:02d}"
+        Args:
+            time_control: Chuỗi hoặc dict của clock.parse_time_control
+
+        Raises:
+            ValueError: Chuỗi time control sai
+        """
+        if isinstance(time_control, str):
+            time_control = parse_time_control(time_control)
+        side = self.clock.side
+        self.clock = GameClock(time_control)
+        self.clock.start(side)
+        self.clock_states = {0: self.clock.snapshot()}
+        self._update_turn_label(side)
+        self.update_time_display()
+
+    def _on_time_control_selected(self, index):
+        self.set_time_control(self.time_control_combo.itemData(index))
+
+    def _on_flag_fallen(self, side):
+        """Bên side hết giờ: dừng đồng hồ, báo lên cửa sổ chính"""
+        self.clock.stop()
+        name = "Đỏ" if side == 'red' else "Đen"
+        self.current_turn_label.setText(f"⏰ {name} hết giờ")
+        print(f"⏰ {name} hết giờ")
+        self.flag_fallen.emit(side)
+
+    def press_clock(self, ply=None):
+        """
+        Bấm đồng hồ sau khi bên đang đi đi xong 1 nước (trừ giờ, cộng giờ
+        theo chế độ, chuyển lượt)
+
+        Args:
+            ply: Số nửa nước sau nước vừa đi (lưu trạng thái đồng hồ cho sync_clock)
+        """
+        if not self.clock.press():
+            self._on_flag_fallen(self.clock.flag)
+        elif ply is not None:
+            # Đi nước mới khi đang xem lại giữa ván: bỏ trạng thái của nhánh cũ
+            for old_ply in [old_ply for old_ply in self.clock_states if old_ply >= ply]:
+                del self.clock_states[old_ply]
+            self.clock_states[ply] = self.clock.snapshot()
+        self.update_time_display()
+
+    def sync_clock(self, player, ply, game_over=False):
+        """
+        Đồng bộ đồng hồ với position sau undo/redo/nhảy ply/load FEN
+
+        Quay lại trước nước hết giờ thì khôi phục đồng hồ lúc bắt đầu lượt
+        tại ply; ván đã kết thúc thì dừng đồng hồ, chưa thì chạy tiếp.
+
+        Args:
+            player: Bên tới lượt ('red'/'black')
+            ply: Số nửa nước của position hiện tại
+            game_over: Ván đã kết thúc ở position này
+        """
+        if self.clock.flag is not None and not game_over and ply in self.clock_states:
+            self.clock.restore(self.clock_states[ply])
+            print(f"⏱️ Khôi phục đồng hồ tại nước {ply}")
+        self.set_current_player(player)
+        if game_over:
+            self.clock.stop()
+        else:
+            self.clock.resume()
+        self.update_time_display()
 
-        self.red_time_display.display(red_time_str)
-        self.black_time_display.display(black_time_str)
+    def _update_turn_label(self, player):
+        if self.clock.flag is not None:
+            return
+        if player == 'red':
+            self.current_turn_label.setText("Đỏ")
+            self.current_turn_label.setStyleSheet("font-weight: bold; color: red")
+        else:
+            self.current_turn_label.setText("Đen")
+            self.current_turn_label.setStyleSheet("font-weight: bold; color: black")
 
     def add_move(self, move):
         """Thêm nước đi vào danh sách"""
@@ -118,23 +235,52 @@ class GameInfoWidget(QWidget):
         if self.move_count % 2 == 1:
             # Nước đi của quân đỏ
             move_text = f"{(self.move_count + 1) // 2}. {move}"
-            self.current_turn_label.setText("Đen")
-            self.current_turn_label.setStyleSheet(
-                "font-weight: bold; color: black")
-            self.current_player_timer = False
+            self.set_current_player('black')
         else:
             # Nước đi của quân đen
             move_text = f"   {move}"
-            self.current_turn_label.setText("Đỏ")
-            self.current_turn_label.setStyleSheet(
-                "font-weight: bold; color: red")
-            self.current_player_timer = True
+            self.set_current_player('red')
 
         self.moves_list.addItem(move_text)
         self.moves_list.scrollToBottom()
 
         self.move_count_label.setText(str(self.move_count))
 
+    def set_moves(self, moves):
+        """
+        Thay toàn bộ danh sách nước đi (dựng 1 lần, chỉ cuộn 1 lần)
+
+        Args:
+            moves: Danh sách nước đi đã format theo thứ tự ply
+        """
+        self.moves_list.clear()
+        self.moves_list.addItems(
+            f"{index // 2 + 1}. {move}" if index % 2 == 0 else f"   {move}"
+            for index, move in enumerate(moves))
+        self.moves_list.scrollToBottom()
+
+        self.move_count = len(moves)
+        self.move_count_label.setText(str(self.move_count))
+
+    def _on_move_item_clicked(self, item):
+        """Phát move_selected với ply tương ứng của dòng được click"""
+        self.move_selected.emit(self.moves_list.row(item) + 1)
+
+    def set_current_ply(self, ply):
+        """
+        Đánh dấu nước đi của ply hiện tại trong danh sách
+
+        Args:
+            ply: Số nửa nước đã đi (0 = chưa đi nước nào)
+        """
+        self.moves_list.blockSignals(True)
+        if 0 < ply <= self.moves_list.count():
+            self.moves_list.setCurrentRow(ply - 1)
+        else:
+            self.moves_list.clearSelection()
+            self.moves_list.setCurrentRow(-1)
+        self.moves_list.blockSignals(False)
+
     def remove_last_move(self):
         """Xóa nước đi cuối cùng"""
         if self.moves_list.count() > 0:
@@ -143,28 +289,20 @@ class GameInfoWidget(QWidget):
             self.move_count_label.setText(str(self.move_count))
 
             # Cập nhật lượt chơi
-            if self.move_count % 2 == 0:
-                self.current_turn_label.setText("Đỏ")
-                self.current_turn_label.setStyleSheet(
-                    "font-weight: bold; color: red")
-                self.current_player_timer = True
-            else:
-                self.current_turn_label.setText("Đen")
-                self.current_turn_label.setStyleSheet(
-                    "font-weight: bold; color: black")
-                self.current_player_timer = False
+            self.set_current_player('red' if self.move_count % 2 == 0 else 'black')
 
     def reset(self):
         """Reset tất cả thông tin"""
         self.move_count = 0
-        self.red_time = 0
-        self.black_time = 0
-        self.current_player_timer = True
+        self.clock.reset()
+        self.clock.start('red')
+        self.clock_states = {0: self.clock.snapshot()}
 
         self.moves_list.clear()
         self.move_count_label.setText("0")
         self.current_turn_label.setText("Đỏ")
         self.current_turn_label.setStyleSheet("font-weight: bold; color: red")
+        self.update_time_display()
 
     def clear_moves(self):
         """Xóa danh sách nước đi nhưng giữ lại thông tin khác"""
@@ -172,19 +310,17 @@ class GameInfoWidget(QWidget):
         self.move_count = 0
         self.move_count_label.setText("0")
         # Reset về lượt đỏ
-        self.current_turn_label.setText("Đỏ")
-        self.current_turn_label.setStyleSheet("font-weight: bold; color: red")
-        self.current_player_timer = True
+        self.set_current_player('red')
 
         self.update_time_display()
 
     def pause_timer(self):
-        """Tạm dừng timer"""
-        self.timer.stop()
+        """Tạm dừng đồng hồ"""
+        self.clock.pause()
 
     def resume_timer(self):
-        """Tiếp tục timer"""
-        self.timer.start(1000)
+        """Tiếp tục đồng hồ"""
+        self.clock.resume()
 
     def set_current_player(self, player):
         """
@@ -193,13 +329,6 @@ class GameInfoWidget(QWidget):
         Args:
             player: 'red' hoặc 'black'
         """
-        if player == 'red':
-            self.current_turn_label.setText("Đỏ")
-            self.current_turn_label.setStyleSheet(
-                "font-weight: bold; color: red")
-            self.current_player_timer = True
-        else:
-            self.current_turn_label.setText("Đen")
-            self.current_turn_label.setStyleSheet(
-                "font-weight: bold; color: black")
-            self.current_player_timer = False
+        # Đổi lượt không tính là 1 nước (undo, nhảy tới ply, load FEN)
+        self.clock.switch_to(player)
+        self._update_turn_label(player)
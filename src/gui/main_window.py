@@ -322,6 +322,10 @@ class MainWindow(QMainWindow):
         self.board_widget.square_clicked.connect(self.on_square_clicked)
         self.board_widget.move_made.connect(self.on_move_made)
 
+        # Click vào nước đi trong lịch sử để nhảy tới position đó
+        self.game_info_widget.move_selected.connect(self.goto_ply)
+        self.game_info_widget.flag_fallen.connect(self.on_flag_fallen)
+
         # Multi-engine connections
         self.multi_engine_widget.hint_selected.connect(
             self.on_multi_engine_hint_selected)
@@ -352,15 +356,16 @@ class MainWindow(QMainWindow):
 
     def _emit_position_changed(self):
         """Emit signal khi position thay đổi"""
-        current_fen = self.game_state.to_fen()
-        if current_fen:
+        start_fen = self.game_state.start_fen()
+        if start_fen:
             engine_moves = self.convert_moves_to_engine_notation(
                 self.game_state.move_history)
             print(f"📡 Position changed: {len(engine_moves)} moves")
             if engine_moves:
                 # Show last 3 moves
                 print(f"📝 Latest moves: {engine_moves[-3:]}")
-            self.position_changed_signal.emit(current_fen, engine_moves)
+            # Moves tính từ position gốc nên phải gửi kèm FEN gốc
+            self.position_changed_signal.emit(start_fen, engine_moves)
         else:
             print(f"❌ [SIGNAL] Cannot emit - no FEN available")
 
@@ -406,6 +411,15 @@ class MainWindow(QMainWindow):
         print(
             f"🎯 DEBUG: Before make_move - current_player: {self.game_state.current_player}")
 
+        # Ván đã kết thúc (chiếu bí, hết giờ...): không nhận thêm nước đi, nếu
+        # không make_move sẽ xét lại game over và xóa kết quả (e.g. 'timeout')
+        if self.game_state.game_over:
+            self.board_widget.selected_square = None
+            self.board_widget.possible_moves = []
+            self.board_widget.update()
+            self.update_status("🏁 Ván đã kết thúc - bấm Game mới để chơi tiếp")
+            return
+
         # Sử dụng GameState để thực hiện nước đi (đã bao gồm validation và history tracking)
         if self.game_state.make_move(from_row, from_col, to_row, to_col):
             print(
@@ -459,8 +473,20 @@ class MainWindow(QMainWindow):
 
             self.update_status(status_msg)
 
-            # Update game info với formatted move
-            self.game_info_widget.add_move(formatted_move)
+            # Bên vừa đi bấm đồng hồ (trừ giờ, cộng giờ, chuyển lượt)
+            self.game_info_widget.press_clock(self.game_state.current_ply)
+            # Ván vừa kết thúc (chiếu bí, hết nước, lặp, hòa): dừng đồng hồ để
+            # không bị xử hết giờ đè lên kết quả thật
+            if self.game_state.game_over:
+                self.game_info_widget.pause_timer()
+
+            # Update game info với formatted move (đi nước mới khi đang xem
+            # lại giữa ván sẽ cắt nhánh cũ nên dựng lại cả danh sách)
+            if self.game_info_widget.move_count == self.game_state.current_ply - 1:
+                self.game_info_widget.add_move(formatted_move)
+            else:
+                self.refresh_move_history()
+            self.game_info_widget.set_current_ply(self.game_state.current_ply)
             self.game_info_widget.set_current_player(
                 self.game_state.current_player)
 
@@ -496,6 +522,18 @@ class MainWindow(QMainWindow):
         }
         return piece_names.get(piece, piece)
 
+    def on_flag_fallen(self, side):
+        """Một bên hết giờ: bên kia thắng (trừ khi ván đã kết thúc trước đó)"""
+        if self.game_state.game_over:
+            return
+        winner = 'black' if side == 'red' else 'red'
+        self.game_state.game_over = True
+        self.game_state.game_status = 'timeout'
+        self.game_state.winner = winner
+        loser_name = "Đỏ" if side == 'red' else "Đen"
+        winner_name = "Đỏ" if winner == 'red' else "Đen"
+        self.update_status(f"⏰ {loser_name} hết giờ - {winner_name} thắng")
+
     def check_game_end(self):
         """Kiểm tra điều kiện kết thúc game"""
         # TODO: Implement checkmate, stalemate detection
@@ -518,10 +556,12 @@ class MainWindow(QMainWindow):
                 self.board_widget.possible_moves = []
                 self.board_widget.update()
 
-                # Update UI
-                self.game_info_widget.remove_last_move()
-                self.game_info_widget.set_current_player(
-                    self.game_state.current_player)
+                # Update UI (giữ nước vừa hoàn tác trong danh sách để redo)
+                self.game_info_widget.set_current_ply(
+                    self.game_state.current_ply)
+                self.game_info_widget.sync_clock(
+                    self.game_state.current_player, self.game_state.current_ply,
+                    self.game_state.game_over)
                 self.update_turn_label()
 
                 self.update_status(f"✓ Đã hoàn tác nước đi: {last_move}")
@@ -549,11 +589,11 @@ class MainWindow(QMainWindow):
 
                 # Update UI
                 last_move = self.game_state.move_history[-1] if self.game_state.move_history else "unknown"
-                formatted_move = self.format_move_for_display(
-                    last_move, len(self.game_state.move_history) - 1)
-                self.game_info_widget.add_move(formatted_move)
-                self.game_info_widget.set_current_player(
-                    self.game_state.current_player)
+                self.game_info_widget.set_current_ply(
+                    self.game_state.current_ply)
+                self.game_info_widget.sync_clock(
+                    self.game_state.current_player, self.game_state.current_ply,
+                    self.game_state.game_over)
                 self.update_turn_label()
 
                 self.update_status(f"✓ Đã làm lại nước đi: {last_move}")
@@ -565,6 +605,33 @@ class MainWindow(QMainWindow):
         else:
             self.update_status("❌ Không có nước đi để làm lại")
 
+    def goto_ply(self, ply):
+        """Nhảy tới position sau ply nửa nước (click vào lịch sử nước đi)"""
+        if not self.game_state.goto_ply(ply):
+            self.update_status(f"❌ Không thể nhảy tới nước {ply}")
+            return
+
+        # Đồng bộ board với BoardWidget
+        self.board_widget.board_state = [row[:]
+                                         for row in self.game_state.board]
+        self.board_widget.set_current_player(self.game_state.current_player)
+        self.board_widget.selected_square = None
+        self.board_widget.possible_moves = []
+        self.board_widget.clear_engine_hint()
+        self.board_widget.update()
+
+        # Update UI
+        self.game_info_widget.set_current_ply(ply)
+        self.game_info_widget.sync_clock(
+            self.game_state.current_player, ply, self.game_state.game_over)
+        self.update_turn_label()
+
+        self.update_status(
+            f"✓ Đang xem nước {ply}/{self.game_state.total_plies}")
+
+        # Update position cho multi-engine widget
+        self._emit_position_changed()
+
     def update_turn_label(self):
         """Cập nhật label hiển thị lượt chơi"""
         current_player = "Đỏ" if self.game_state.current_player == "red" else "Đen"
@@ -617,6 +684,8 @@ class MainWindow(QMainWindow):
                     f"🎯 DEBUG: Game state board: {self.game_state.board[0][:3]}")
 
                 self.game_info_widget.reset()
+                self.game_info_widget.sync_clock(
+                    self.game_state.current_player, 0, self.game_state.game_over)
 
                 # Clear engine hint
                 self.board_widget.clear_engine_hint()
@@ -676,13 +745,17 @@ class MainWindow(QMainWindow):
     def refresh_move_history(self):
         """Refresh lại history moves với style notation mới"""
         if hasattr(self, 'game_info_widget'):
-            # Clear current moves và rebuild
-            self.game_info_widget.clear_moves()
-
-            # Rebuild từ game state history
-            for i, move in enumerate(self.game_state.move_history):
-                formatted_move = self.format_move_for_display(move, i)
-                self.game_info_widget.add_move(formatted_move)
+            # Rebuild từ bảng nước đi theo ply (gồm cả các nước có thể redo)
+            formatted_moves = []
+            move_table = self.game_state.get_move_table(include_redo=True)
+            for i, (from_row, from_col, to_row, to_col, _, _) in enumerate(move_table):
+                move = f"{chr(ord('a') + from_col)}{from_row}{chr(ord('a') + to_col)}{to_row}"
+                formatted_moves.append(self.format_move_for_display(move, i))
+
+            self.game_info_widget.set_moves(formatted_moves)
+            self.game_info_widget.set_current_ply(self.game_state.current_ply)
+            self.game_info_widget.set_current_player(
+                self.game_state.current_player)
 
     def format_move_for_display(self, move, move_index=None):
         """
@@ -721,8 +794,8 @@ class MainWindow(QMainWindow):
             piece = self.get_piece_from_move_history(
                 move_index, from_row, from_col)
             if piece:
-                # Xác định player từ move index
-                current_player = 'red' if move_index % 2 == 0 else 'black'
+                # Xác định player từ quân đã đi
+                current_player = 'red' if piece.isupper() else 'black'
 
                 # Sử dụng function từ constants.py
                 from ..utils.constants import format_move_chinese_style
@@ -737,34 +810,14 @@ class MainWindow(QMainWindow):
 
     def get_piece_from_move_history(self, move_index, from_row, from_col):
         """
-        Lấy quân cờ đã di chuyển từ history bằng cách replay moves
+        Lấy quân cờ đã di chuyển ở nước thứ move_index (tra bảng theo ply)
         """
         try:
-            # Tạo temporary game state để replay
-            from ..core.game_state import GameState
-            temp_game = GameState()
-
-            # Replay tất cả moves cho đến move_index
-            for i in range(move_index + 1):
-                if i < len(self.game_state.move_history):
-                    move = self.game_state.move_history[i]
-                    if len(move) == 4:
-                        move_from_col = ord(move[0]) - ord('a')
-                        move_from_row = int(move[1])
-                        move_to_col = ord(move[2]) - ord('a')
-                        move_to_row = int(move[3])
-
-                        if i == move_index:
-                            # Đây là move chúng ta quan tâm
-                            return temp_game.board[move_from_row][move_from_col]
-                        else:
-                            # Replay move này
-                            temp_game.make_move(
-                                move_from_row, move_from_col, move_to_row, move_to_col)
-                            return None
+            if 0 <= move_index < self.game_state.total_plies:
+                return self.game_state.get_ply_pieces(move_index)[0]
         except Exception as e:
             print(f"Lỗi get piece from history: {e}")
-            return None
+        return None
 
     def format_move_notation(self, move, is_engine_notation=False):
         """
@@ -910,17 +963,8 @@ class MainWindow(QMainWindow):
                     self.game_state.winner = None
                     self.game_state.game_status = 'playing'
 
-                    # Clear move history để bắt đầu fresh
-                    self.game_state.move_history = []
-                    self.game_state.board_history = []
-                    self.game_state.captured_pieces = []
-                    self.game_state.player_history = []
-
-                    # Clear redo stacks
-                    self.game_state.redo_board_history = []
-                    self.game_state.redo_player_history = []
-                    self.game_state.redo_captured_pieces = []
-                    self.game_state.redo_move_history = []
+                    # Clear move history và redo stack để bắt đầu fresh
+                    self.game_state.clear_history()
 
                     print(f"🎯 DEBUG: Reset game state flags and history")
 
@@ -946,8 +990,8 @@ class MainWindow(QMainWindow):
 
                     # Update UI components
                     self.game_info_widget.reset()
-                    self.game_info_widget.set_current_player(
-                        self.game_state.current_player)
+                    self.game_info_widget.sync_clock(
+                        self.game_state.current_player, 0, self.game_state.game_over)
                     self.update_turn_label()
 
                     # Switch to game tab
@@ -12,9 +12,13 @@ from PyQt5.QtGui import QFont, QColor, QPalette
 from typing import Dict, List
 import os
 
+from config.settings import settings
 from ..engine.multi_engine_manager import MultiEngineManager
 from ..utils.constants import format_move_chinese_style
 
+# Số nước ứng viên (MultiPV) tối đa cho mỗi engine
+MAX_MULTIPV = 5
+
 
 class MultiEngineWidget(QWidget):
     """Widget hiển thị phân tích từ nhiều engine cùng lúc"""
@@ -26,7 +30,8 @@ class MultiEngineWidget(QWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.multi_engine_manager = MultiEngineManager()
+        self.multi_engine_manager = MultiEngineManager(
+            engines_config=settings.load_engines_config())
 
         # Connect signals
         self.multi_engine_manager.engine_result_updated.connect(
@@ -119,6 +124,14 @@ class MultiEngineWidget(QWidget):
         self.depth_spin.setValue(8)
         analysis_layout.addWidget(self.depth_spin)
 
+        analysis_layout.addWidget(QLabel("MultiPV:"))
+        self.multipv_spin = QSpinBox()
+        self.multipv_spin.setRange(1, MAX_MULTIPV)
+        self.multipv_spin.setValue(1)
+        self.multipv_spin.setToolTip("Số nước ứng viên mỗi engine trả về")
+        self.multipv_spin.valueChanged.connect(self._on_multipv_changed)
+        analysis_layout.addWidget(self.multipv_spin)
+
         self.get_hints_btn = QPushButton("Lấy Gợi Ý")
         self.get_hints_btn.clicked.connect(self._get_hints)
         analysis_layout.addWidget(self.get_hints_btn)
@@ -291,7 +304,7 @@ class MultiEngineWidget(QWidget):
 
         engine_name_item = self.results_table.item(current_row, 0)
         if engine_name_item:
-            engine_name = engine_name_item.text()
+            engine_name = engine_name_item.data(Qt.UserRole)
             self._log_message(f"🗑️ Đang xóa engine: {engine_name}")
             self.multi_engine_manager.remove_engine(engine_name)
             self._update_results_table()
@@ -349,6 +362,12 @@ class MultiEngineWidget(QWidget):
 
         print("✅ Đã dừng phân tích liên tục")
 
+    def _on_multipv_changed(self, count: int):
+        """Đổi số nước ứng viên của tất cả engine"""
+        self.multi_engine_manager.set_multipv_all(count)
+        self._log_message(f"🔢 MultiPV: {count}")
+        self._update_display()
+
     def _get_hints(self):
         """Lấy gợi ý từ tất cả engine"""
         print(f"🔍 DEBUG _get_hints: current_fen = {self.current_fen}")
@@ -392,21 +411,48 @@ class MultiEngineWidget(QWidget):
         self._update_results_table()
         self._update_arrows()
 
+    @staticmethod
+    def _ranked_lines(result: dict) -> List[dict]:
+        """Các nước ứng viên theo thứ hạng (engine không có MultiPV -> 1 dòng)"""
+        lines = [line for line in result.get('lines', []) if line.get('pv')]
+        if lines:
+            return lines
+        return [{'multipv': 1, 'depth': result.get('depth', 0),
+                 'evaluation': result.get('evaluation', 0.0),
+                 'pv': result.get('pv', [])}]
+
+    @staticmethod
+    def _format_evaluation(eval_score: float) -> str:
+        if eval_score == float('inf'):
+            return "Chiến thắng"
+        if eval_score == float('-inf'):
+            return "Thua"
+        return f"{eval_score:+.2f}"
+
     def _update_results_table(self):
-        """Update bảng kết quả"""
+        """Update bảng kết quả: mỗi engine 1 dòng cho mỗi nước ứng viên"""
         active_engines = self.multi_engine_manager.get_active_engines()
         results = self.multi_engine_manager.get_results()
 
-        self.results_table.setRowCount(len(active_engines))
-
-        for row, engine_name in enumerate(active_engines):
+        rows = []
+        for engine_name in active_engines:
             result = results.get(engine_name, {})
+            for line in self._ranked_lines(result):
+                rows.append((engine_name, result, line))
+
+        self.results_table.setRowCount(len(rows))
+
+        for row, (engine_name, result, line) in enumerate(rows):
+            rank = line.get('multipv', 1)
+            is_main = rank == 1
 
-            # Engine name
-            self.results_table.setItem(row, 0, QTableWidgetItem(engine_name))
+            # Engine name (các hạng sau chỉ ghi thứ hạng)
+            name_item = QTableWidgetItem(engine_name if is_main else f"  #{rank}")
+            name_item.setData(Qt.UserRole, engine_name)
+            self.results_table.setItem(row, 0, name_item)
 
             # Protocol
-            protocol = result.get('protocol', 'unknown')
+            protocol = result.get('protocol', 'unknown') if is_main else ''
             protocol_item = QTableWidgetItem(protocol.upper())
             if protocol == "ucci":
                 protocol_item.setToolTip("UCCI - Xiangqi protocol")
@@ -415,22 +461,21 @@ class MultiEngineWidget(QWidget):
             self.results_table.setItem(row, 1, protocol_item)
 
             # Evaluation
-            eval_score = result.get('evaluation', 0.0)
-            if eval_score == float('inf'):
-                eval_text = "Chiến thắng"
-            elif eval_score == float('-inf'):
-                eval_text = "Thua"
-            else:
-                eval_text = f"{eval_score:+.2f}"
+            eval_text = self._format_evaluation(line.get('evaluation', 0.0))
             self.results_table.setItem(row, 2, QTableWidgetItem(eval_text))
 
             # Depth
-            depth = result.get('depth', 0)
+            depth = line.get('depth', 0)
             self.results_table.setItem(row, 3, QTableWidgetItem(str(depth)))
 
-            # Best move
-            bestmove = result.get('bestmove', '-')
-            ponder = result.get('ponder', '')
+            # Best move (hạng 1) hoặc nước ứng viên
+            pv = line.get('pv', [])
+            if is_main:
+                bestmove = result.get('bestmove') or (pv[0] if pv else '-')
+                ponder = result.get('ponder', '')
+            else:
+                bestmove = pv[0] if pv else '-'
+                ponder = ''
 
             # Hiển thị cả bestmove và ponder
             if bestmove != '-' and ponder:
@@ -438,20 +483,21 @@ class MultiEngineWidget(QWidget):
             else:
                 move_text = bestmove
 
-            self.results_table.setItem(row, 4, QTableWidgetItem(move_text))
+            move_item = QTableWidgetItem(move_text)
+            move_item.setData(Qt.UserRole, bestmove)
+            self.results_table.setItem(row, 4, move_item)
 
             # Nodes
-            nodes = result.get('nodes', 0)
+            nodes = result.get('nodes', 0) if is_main else 0
             nodes_text = f"{nodes:,}" if nodes > 0 else "-"
             self.results_table.setItem(row, 5, QTableWidgetItem(nodes_text))
 
             # Principal Variation
-            pv = result.get('pv', [])
             pv_text = " ".join(pv[:5]) if pv else "-"  # Hiển thị 5 nước đầu
             self.results_table.setItem(row, 6, QTableWidgetItem(pv_text))
 
             # Status
-            status = "Đang chạy" if self.is_analysis_running else "Sẵn sàng"
+            status = ("Đang chạy" if self.is_analysis_running else "Sẵn sàng") if is_main else ''
             self.results_table.setItem(row, 7, QTableWidgetItem(status))
 
     def _update_arrows(self):
@@ -506,6 +552,22 @@ class MultiEngineWidget(QWidget):
                     'is_current_turn': False
                 })
 
+            # Các nước ứng viên khác (MultiPV) - cùng màu, nhạt dần theo thứ hạng
+            for line in self._ranked_lines(result)[1:]:
+                move = line['pv'][0]
+                if len(move) < 4 or move == bestmove:
+                    continue
+                rank = line.get('multipv', 1)
+                engine_arrows.append({
+                    'from': move[:2],
+                    'to': move[2:4],
+                    'color': base_color,
+                    'style': 'solid',
+                    'opacity': max(0.3, 0.9 - 0.15 * rank),
+                    'is_current_turn': True,
+                    'rank': rank
+                })
+
             if engine_arrows:
                 arrows_data[engine_name] = engine_arrows
 
@@ -555,8 +617,8 @@ class MultiEngineWidget(QWidget):
             bestmove_item = self.results_table.item(row, 4)
 
             if engine_name_item and bestmove_item:
-                engine_name = engine_name_item.text()
-                bestmove = bestmove_item.text()
+                engine_name = engine_name_item.data(Qt.UserRole)
+                bestmove = bestmove_item.data(Qt.UserRole)
 
                 if bestmove != '-':
                     self.hint_selected.emit(engine_name, bestmove)
@@ -594,7 +656,7 @@ class MultiEngineWidget(QWidget):
             if app:
                 for widget in app.topLevelWidgets():
                     if hasattr(widget, 'game_state') and hasattr(widget, 'convert_moves_to_engine_notation'):
-                        current_fen = widget.game_state.to_fen()
+                        current_fen = widget.game_state.start_fen()
                         current_moves = widget.convert_moves_to_engine_notation(
                             widget.game_state.move_history)
                         print(f"🔄 Lấy position từ main window: {current_fen}")
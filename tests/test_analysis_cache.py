@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Test AnalysisCache: lưu/tra kết quả theo khóa Zobrist và loại bỏ LRU
+"""
+
+from src.core.perft import START_FEN
+from src.core.position import Position
+from src.engine.analysis_cache import (AnalysisCache, is_valid_pv,
+                                       position_after_moves)
+
+ENGINE = "pikafish"
+
+
+def _result(depth, pv=("h2e2", "h9g7"), evaluation=0.3):
+    return {'depth': depth, 'evaluation': evaluation, 'nodes': depth * 1000,
+            'pv': list(pv), 'bestmove': pv[0], 'ponder': None}
+
+
+def test_store_and_lookup():
+    cache = AnalysisCache(":memory:")
+    key = Position.from_fen(START_FEN).key
+    assert cache.lookup(ENGINE, key) is None
+
+    assert cache.store(ENGINE, key, _result(12))
+    assert len(cache) == 1
+    assert cache.lookup(ENGINE, key) == {
+        'bestmove': "h2e2", 'ponder': "h9g7", 'evaluation': 0.3,
+        'depth': 12, 'nodes': 12000, 'pv': ["h2e2", "h9g7"]}
+    # Mỗi engine có entry riêng
+    assert cache.lookup("fairy-stockfish", key) is None
+
+
+def test_store_keeps_deepest_result():
+    cache = AnalysisCache(":memory:")
+    key = (1 << 64) - 5  # khóa >= 2^63 phải lưu được vào INTEGER có dấu
+    assert cache.store(ENGINE, key, _result(14, evaluation=0.5))
+    assert not cache.store(ENGINE, key, _result(9, evaluation=-1.0))
+    assert cache.lookup(ENGINE, key)['depth'] == 14
+
+    assert cache.store(ENGINE, key, _result(14, pv=("b2e2",)))
+    assert cache.lookup(ENGINE, key)['pv'] == ["b2e2"]
+    assert len(cache) == 1
+
+    # Kết quả rỗng không được lưu
+    assert not cache.store(ENGINE, 1, _result(0))
+    assert not cache.store(ENGINE, 2, {'depth': 10, 'evaluation': 0.0, 'pv': []})
+
+
+def test_lru_eviction():
+    cache = AnalysisCache(":memory:", max_entries=10)
+    for key in range(10):
+        assert cache.store(ENGINE, key, _result(10))
+    # Dùng lại key 0 để nó không còn là entry cũ nhất
+    assert cache.lookup(ENGINE, 0) is not None
+
+    # Vượt giới hạn: xóa 2 entry ít dùng nhất (giữ lại 90%)
+    assert cache.store(ENGINE, 10, _result(10))
+    assert len(cache) == 9
+    assert cache.lookup(ENGINE, 1) is None
+    assert cache.lookup(ENGINE, 2) is None
+    for key in [0] + list(range(3, 11)):
+        assert cache.lookup(ENGINE, key) is not None
+
+
+def test_cache_persists_on_disk(tmp_path):
+    path = str(tmp_path / "cache" / "analysis.sqlite3")
+    cache = AnalysisCache(path)
+    cache.store(ENGINE, 42, _result(20))
+    cache.close()
+
+    cache = AnalysisCache(path)
+    assert len(cache) == 1
+    assert cache.lookup(ENGINE, 42)['depth'] == 20
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.lookup(ENGINE, 42) is None
+    cache.close()
+
+
+def test_pv_validation():
+    position = position_after_moves(START_FEN, ["h2e2", "h9g7"])
+    assert position is not None
+    assert position_after_moves(START_FEN, ["a0a5"]) is None
+
+    fen = position.to_fen()
+    assert is_valid_pv(position, ["h0g2", "i9h9"])
+    assert not is_valid_pv(position, ["h2e2"])
+    assert not is_valid_pv(position, [])
+    # Kiểm tra PV không được làm thay đổi position
+    assert position.to_fen() == fen
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Test batch_rules: đối chiếu mask nước hợp lệ, chiếu tướng và số quân tấn công
+với Position trên các thế cờ ngẫu nhiên
+"""
+
+import random
+
+import numpy as np
+
+from benchmarks.perft_bench import PERFT_SUITE
+from src.core.batch_rules import (encode_positions, in_check, iter_evaluate,
+                                  legal_move_mask, slot_moves)
+from src.core.position import BLACK, RED, Position
+
+
+def _random_positions(count, seed):
+    """Các thế cờ gặp khi đi ngẫu nhiên từ bộ FEN perft"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        _, fen, _ = rng.choice(PERFT_SUITE)
+        position = Position.from_fen(fen)
+        for _ in range(rng.randint(0, 60)):
+            moves = position.legal_moves()
+            if not moves:
+                break
+            position.push(rng.choice(moves))
+        positions.append(position.copy())
+    return positions
+
+
+def test_batch_matches_position():
+    positions = _random_positions(150, seed=1)
+    boards, sides = encode_positions(positions)
+    # chunk_size nhỏ để đi qua nhiều khối
+    checked = 0
+    for start, result in iter_evaluate(boards, sides, chunk_size=32):
+        for offset, position in enumerate(positions[start:start + len(result['legal'])]):
+            legal = result['legal'][offset]
+            assert set(slot_moves(legal)) == set(position.legal_moves())
+            assert result['move_counts'][offset] == len(position.legal_moves())
+            assert result['in_check'][offset] == position.is_in_check()
+            for side in (RED, BLACK):
+                expected = [len(position.attackers(sq, side)) for sq in range(90)]
+                assert result['attacks'][offset, side].tolist() == expected
+            checked += 1
+    assert checked == len(positions)
+
+
+def test_in_check_and_legal_mask_wrappers():
+    positions = _random_positions(40, seed=2)
+    # Thêm thế đang bị chiếu và thế tướng đối mặt
+    fens = ["3k5/9/9/9/4r4/9/9/2B6/9/3AK4 w", "4k4/9/9/9/9/9/9/9/4R4/4K4 w"]
+    positions += [Position.from_fen(fen) for fen in fens]
+    boards, sides = encode_positions(positions)
+
+    expected_check = [position.is_in_check() for position in positions]
+    assert in_check(boards, sides, chunk_size=16).tolist() == expected_check
+    assert expected_check[-2]
+
+    mask = legal_move_mask(boards, sides, chunk_size=16)
+    assert mask.shape[0] == len(positions)
+    for row, position in zip(mask, positions):
+        assert set(slot_moves(row)) == set(position.legal_moves())
+
+
+def test_encode_positions_accepts_fen_and_position():
+    fen = PERFT_SUITE[1][1]
+    position = Position.from_fen(fen)
+    boards, sides = encode_positions([fen, position])
+    assert boards.shape == (2, 90)
+    assert np.array_equal(boards[0], boards[1])
+    assert bytes(boards[0].astype(np.uint8)) == bytes(position.squares)
+    assert sides.tolist() == [RED, RED]
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Test đồng hồ ván cờ: parse time control, bấm đồng hồ, Fischer và byoyomi
+(dùng timer giả thay cho time.monotonic)
+"""
+
+import pytest
+
+from src.core.clock import (BYOYOMI, FISCHER, FIXED, UNLIMITED, GameClock,
+                            format_time_control, parse_time_control)
+
+
+class FakeTimer:
+    """Timer giả (giây), tự tăng bằng advance()"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def _clock(spec):
+    timer = FakeTimer()
+    clock = GameClock(parse_time_control(spec), timer=timer)
+    clock.start()
+    return clock, timer
+
+
+def test_parse_time_control():
+    assert parse_time_control('') == {'mode': UNLIMITED, 'time': 0, 'inc': 0, 'moves': None,
+                                      'period': 0, 'periods': 0, 'movetime': 0}
+    fischer = parse_time_control('10+0.1')
+    assert (fischer['mode'], fischer['time'], fischer['inc'], fischer['moves']) == \
+        (FISCHER, 10000, 100, None)
+    assert parse_time_control('40/300')['moves'] == 40
+    byoyomi = parse_time_control('600:30x3')
+    assert (byoyomi['mode'], byoyomi['time'], byoyomi['period'], byoyomi['periods']) == \
+        (BYOYOMI, 600000, 30000, 3)
+    assert parse_time_control('0:10')['periods'] == 1
+    fixed = parse_time_control('st=5')
+    assert (fixed['mode'], fixed['movetime']) == (FIXED, 5000)
+
+    for spec in ['none', '10+0.1', '40/300+2', '600:30x3', 'st=0.5']:
+        assert format_time_control(parse_time_control(spec)) == spec
+
+
+@pytest.mark.parametrize('spec', ['abc', '0', '10+-1', '0/60', '60:0', '60:5x0', 'st=0', 'st=x'])
+def test_parse_invalid_time_control(spec):
+    with pytest.raises(ValueError):
+        parse_time_control(spec)
+
+
+def test_fischer_press_adds_increment():
+    clock, timer = _clock('10+0.1')
+    timer.advance(2)
+    assert clock.remaining('red') == pytest.approx(8000)
+    assert clock.press()
+    assert clock.side == 'black'
+    assert clock.remaining('red') == pytest.approx(8100)
+    assert clock.used_time('red') == pytest.approx(2000)
+
+    timer.advance(3.5)
+    assert clock.remaining('black') == pytest.approx(6500)
+    assert clock.press()
+    assert clock.remaining('black') == pytest.approx(6600)
+    assert clock.go_arguments() == {'wtime': 8100, 'btime': 6600, 'winc': 100, 'binc': 100}
+
+
+def test_fischer_moves_to_go():
+    clock, timer = _clock('2/60')
+    assert clock.go_arguments()['movestogo'] == 2
+    for _ in range(2):
+        timer.advance(10)
+        assert clock.press()  # Đỏ
+        assert clock.press()  # Đen đi ngay
+    # Hết 2 nước: cộng lại 60 giây
+    assert clock.remaining('red') == pytest.approx(100000)
+    assert clock.go_arguments()['movestogo'] == 2
+
+
+def test_press_after_deadline_flags():
+    clock, timer = _clock('5')
+    timer.advance(4)
+    assert clock.flagged() is None
+    timer.advance(1.5)
+    assert clock.flagged() == 'red'
+    assert not clock.press()
+    assert clock.side == 'red'
+
+
+def test_press_with_grace():
+    clock, timer = _clock('5')
+    timer.advance(5.05)
+    assert clock.press(grace=100)
+    assert clock.flag is None
+
+    timer.advance(5.2)
+    assert not clock.press(grace=100)
+    assert clock.flag == 'black'
+    assert not clock.running
+
+
+def test_byoyomi_periods():
+    clock, timer = _clock('10:5x3')
+    # Đỏ dùng 22 giây: hết 10 giây chính, vượt 2 khoảng trọn vẹn
+    timer.advance(22)
+    assert clock.remaining('red') == pytest.approx(3000)
+    assert clock.press()
+    assert clock.periods['red'] == 1
+    assert clock.main['red'] == 0.0
+
+    assert clock.press()  # Đen
+    # Đi trong 1 khoảng thì không mất khoảng
+    timer.advance(4.9)
+    assert clock.press()
+    assert clock.periods['red'] == 1
+    assert clock.go_arguments()['wtime'] == 5000
+
+    assert clock.press()  # Đen
+    timer.advance(6)
+    assert clock.flagged() == 'red'
+    assert not clock.press()
+
+
+def test_fixed_and_unlimited():
+    clock, timer = _clock('st=5')
+    timer.advance(3)
+    assert clock.remaining('red') == pytest.approx(2000)
+    assert clock.press()
+    assert clock.move_deadline('black') == 5000
+    assert clock.go_arguments() == {'time_ms': 5000}
+
+    clock, timer = _clock('')
+    timer.advance(1000)
+    assert clock.flagged() is None
+    assert clock.remaining('red') is None
+    assert clock.press()
+    assert clock.used_time('red') == pytest.approx(1000000)
+    assert clock.go_arguments() == {}
+
+
+def test_pause_resume_and_switch():
+    clock, timer = _clock('60')
+    timer.advance(10)
+    clock.pause()
+    timer.advance(100)  # Thời gian tạm dừng không bị tính
+    assert clock.remaining('red') == pytest.approx(50000)
+    clock.resume()
+    timer.advance(5)
+
+    # Đổi lượt (undo/nhảy ply) không tính là 1 nước, không cộng giờ
+    clock.switch_to('black')
+    assert clock.side == 'black' and clock.running
+    assert clock.moves['red'] == 0
+    assert clock.remaining('red') == pytest.approx(45000)
+    timer.advance(1)
+    assert clock.remaining('black') == pytest.approx(59000)
+
+
+def test_snapshot_restore_clears_flag():
+    clock, timer = _clock('5')
+    timer.advance(1)
+    assert clock.press()
+    state = clock.snapshot()
+
+    timer.advance(6)
+    assert not clock.press()
+    assert clock.flag == 'black'
+
+    # Hoàn tác nước hết giờ: về trạng thái sau nước trước đó
+    clock.restore(state)
+    assert clock.flag is None and not clock.running
+    assert clock.side == 'black'
+    assert clock.remaining('black') == pytest.approx(5000)
+    clock.start()
+    timer.advance(2)
+    assert clock.press()
+    assert clock.remaining('black') == pytest.approx(3000)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Test parse option của engine (UCI/UCCI) và chia Threads/Hash giữa các engine
+"""
+
+import pytest
+
+from src.engine.engine_resources import engine_options, split_resources
+from src.engine.ucci_protocol import (coerce_option_value, option_key,
+                                      parse_option_line)
+
+
+def test_parse_uci_spin_option():
+    assert parse_option_line(
+        "option name Hash type spin default 16 min 1 max 33554432") == {
+        'name': "Hash", 'type': "spin", 'default': 16, 'min': 1, 'max': 33554432,
+        'vars': []}
+
+
+def test_parse_ucci_option_without_name_keyword():
+    # UCCI: không có 'name', thứ tự min/max/default tùy engine
+    option = parse_option_line("option hashsize type spin min 16 max 1024 default 16")
+    assert option['name'] == "hashsize"
+    assert (option['default'], option['min'], option['max']) == (16, 16, 1024)
+
+
+def test_parse_check_combo_string_button():
+    ponder = parse_option_line("option name Ponder type check default false")
+    assert ponder['type'] == "check" and ponder['default'] is False
+
+    combo = parse_option_line(
+        "option name UCI_Variant type combo default xiangqi var chess var xiangqi var minixiangqi")
+    assert combo['default'] == "xiangqi"
+    assert combo['vars'] == ["chess", "xiangqi", "minixiangqi"]
+
+    # Tên có dấu cách, giá trị rỗng '<empty>'
+    path = parse_option_line("option name Eval File type string default <empty>")
+    assert path['name'] == "Eval File" and path['default'] == ""
+    assert option_key(path['name']) == "eval_file"
+
+    clear = parse_option_line("option name Clear Hash type button")
+    assert clear['type'] == "button"
+
+
+def test_parse_invalid_option_lines():
+    assert parse_option_line("id name Pikafish") is None
+    assert parse_option_line("option") is None
+    assert parse_option_line("option name Threads type spin default many") is None
+
+
+def test_coerce_option_value():
+    spin = {'type': "spin", 'min': 1, 'max': 512}
+    assert coerce_option_value(spin, "64") == 64
+    assert coerce_option_value(spin, 100000) == 512
+    assert coerce_option_value(spin, 0) == 1
+    with pytest.raises(ValueError):
+        coerce_option_value(spin, "abc")
+
+    check = {'type': "check"}
+    assert coerce_option_value(check, "True") is True
+    assert coerce_option_value(check, "off") is False
+    assert coerce_option_value(check, 1) is True
+
+    combo = {'type': "combo", 'vars': ["chess", "xiangqi"]}
+    assert coerce_option_value(combo, "XIANGQI") == "xiangqi"
+    with pytest.raises(ValueError):
+        coerce_option_value(combo, "shogi")
+
+    assert coerce_option_value({'type': "button"}, "anything") is None
+    assert coerce_option_value({'type': "string"}, 12) == "12"
+
+
+def test_split_resources():
+    # 8 core, để lại 1 core; 16 GB RAM, 1/4 cho hash
+    assert split_resources(1, cores=8, memory_mb=16384) == {'Threads': 7, 'Hash': 4096}
+    assert split_resources(3, cores=8, memory_mb=16384) == {'Threads': 2, 'Hash': 1024}
+    # Hash làm tròn xuống lũy thừa của 2 và không nhỏ hơn min_hash_mb
+    assert split_resources(2, cores=4, memory_mb=6000) == {'Threads': 1, 'Hash': 512}
+    assert split_resources(16, cores=2, memory_mb=512) == {'Threads': 1, 'Hash': 16}
+    # Không đọc được RAM thì chỉ chia Threads
+    assert split_resources(2, cores=8, memory_mb=0) == {'Threads': 3}
+
+
+def test_split_resources_policy():
+    assert split_resources(0, cores=8, memory_mb=16384) == {}
+    assert split_resources(2, {'auto': False}, cores=8, memory_mb=16384) == {}
+    assert split_resources(1, {'reserve_cores': 0, 'max_hash_mb': 256},
+                           cores=4, memory_mb=16384) == {'Threads': 4, 'Hash': 256}
+
+
+def test_engine_options_priority():
+    config = {
+        'engine_settings': {'options': {'Hash': 128, 'Ponder': False}},
+        'engines': [{'name': "Pikafish", 'path': "engines/pikafish",
+                     'options': {'Ponder': True}}],
+    }
+    options = engine_options(config, "Pikafish", resources={'Threads': 3, 'Hash': 512})
+    assert options == {'Threads': 3, 'Hash': 128, 'Ponder': True}
+    assert engine_options(config, "Other", resources={'Threads': 3}) == {
+        'Threads': 3, 'Hash': 128, 'Ponder': False}
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Test điều hướng lịch sử của GameState: undo/redo và goto_ply
+"""
+
+import random
+
+from src.core.game_state import GameState
+from src.core.move_log import CHECKPOINT_INTERVAL
+from src.core.move_tables import SQUARE_COORDS
+from src.core.position import Position
+
+
+def _snapshot(state):
+    """Trạng thái cần khôi phục đúng sau khi điều hướng"""
+    return (state.to_fen(), state.zobrist_key, state.current_player,
+            state.halfmove_clock, state.fullmove_number, list(state.repetition.keys))
+
+
+def _play_random(state, plies, seed):
+    """Đi ngẫu nhiên tối đa plies nửa nước, trả về snapshot sau từng ply"""
+    rng = random.Random(seed)
+    snapshots = [_snapshot(state)]
+    for _ in range(plies):
+        if state.game_over:
+            break
+        from_sq, to_sq = rng.choice(state.position.legal_moves())
+        assert state.make_move(*SQUARE_COORDS[from_sq], *SQUARE_COORDS[to_sq])
+        snapshots.append(_snapshot(state))
+    return snapshots
+
+
+def test_undo_redo_round_trip():
+    state = GameState(verbose=False)
+    snapshots = _play_random(state, 40, seed=1)
+    plies = len(snapshots) - 1
+
+    for ply in range(plies - 1, -1, -1):
+        assert state.undo_move()
+        assert _snapshot(state) == snapshots[ply]
+    assert not state.undo_move()
+
+    for ply in range(1, plies + 1):
+        assert state.redo_move()
+        assert _snapshot(state) == snapshots[ply]
+    assert not state.redo_move()
+
+
+def test_goto_ply_near_and_far():
+    state = GameState(verbose=False)
+    snapshots = _play_random(state, 3 * CHECKPOINT_INTERVAL + 7, seed=2)
+    plies = len(snapshots) - 1
+    assert plies > 2 * CHECKPOINT_INTERVAL
+
+    # Nhảy gần (áp dụng delta) lẫn nhảy xa (dựng lại từ checkpoint), cả 2 chiều
+    targets = [0, plies, 3, plies - 1, CHECKPOINT_INTERVAL + 1, 1, plies // 2, plies]
+    rng = random.Random(3)
+    targets += [rng.randint(0, plies) for _ in range(20)]
+    for ply in targets:
+        assert state.goto_ply(ply)
+        assert state.current_ply == ply
+        assert state.total_plies == plies
+        assert _snapshot(state) == snapshots[ply]
+        assert state.zobrist_key == Position.from_fen(state.to_fen()).key
+
+    assert not state.goto_ply(plies + 1)
+    assert state.current_ply == targets[-1]
+
+
+def test_goto_ply_then_new_move_drops_redo():
+    state = GameState(verbose=False)
+    snapshots = _play_random(state, 20, seed=4)
+
+    assert state.goto_ply(6)
+    from_sq, to_sq = state.position.legal_moves()[-1]
+    assert state.make_move(*SQUARE_COORDS[from_sq], *SQUARE_COORDS[to_sq])
+    assert state.total_plies == state.current_ply == 7
+    assert not state.can_redo()
+
+    assert state.undo_move()
+    assert _snapshot(state) == snapshots[6]
+
+
+def test_goto_ply_from_black_to_move_fen():
+    # Position gốc đen đi trước, số nước FEN khác 1
+    state = GameState(verbose=False)
+    assert state.load_from_fen(
+        "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C4/9/RNBAKABNR b - - 1 7")
+    snapshots = _play_random(state, 2 * CHECKPOINT_INTERVAL + 3, seed=5)
+    plies = len(snapshots) - 1
+
+    for ply in [0, plies, 1, plies - 2, 2]:
+        assert state.goto_ply(ply)
+        assert _snapshot(state) == snapshots[ply]
+    assert state.goto_ply(0)
+    assert state.current_player == 'black'
+    assert state.fullmove_number == 7
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Test parse dòng info/bestmove của engine UCI/UCCI
+"""
+
+import os
+
+from benchmarks.info_parser_bench import (DEFAULT_INPUT, legacy_parse_info,
+                                          load_lines, new_parse_info)
+from src.engine.info_parser import (RESULT_INFO_FIELDS, parse_bestmove,
+                                    parse_info, score_to_evaluation)
+
+
+def test_parse_uci_info_line():
+    line = ("info depth 18 seldepth 24 multipv 1 score cp 35 nodes 1200345 "
+            "nps 950000 hashfull 120 tbhits 0 time 1263 pv h2e2 h9g7 h0g2")
+    assert parse_info(line) == {
+        'depth': 18, 'seldepth': 24, 'multipv': 1, 'score': 35, 'nodes': 1200345,
+        'nps': 950000, 'hashfull': 120, 'time': 1263, 'pv': ["h2e2", "h9g7", "h0g2"]}
+
+
+def test_parse_info_only_requested_fields():
+    line = "info depth 18 seldepth 24 multipv 2 score cp -12 nodes 500 nps 900 time 5 pv b2e2"
+    assert parse_info(line, RESULT_INFO_FIELDS) == {
+        'depth': 18, 'multipv': 2, 'score': -12, 'nodes': 500, 'pv': ["b2e2"]}
+    assert parse_info(line, frozenset(('depth',))) == {'depth': 18}
+
+
+def test_parse_mate_and_ucci_score():
+    mated = parse_info("info depth 30 score mate -3 upperbound nodes 10 pv e0e1")
+    assert mated == {'depth': 30, 'mate': -3, 'nodes': 10, 'pv': ["e0e1"]}
+    assert score_to_evaluation(mated) == float('-inf')
+
+    # UCCI (ElephantEye): 'score <n>' không có cp
+    ucci = parse_info("info depth 9 score 120 pv h2e2 h9g7")
+    assert ucci == {'depth': 9, 'score': 120, 'pv': ["h2e2", "h9g7"]}
+    assert score_to_evaluation(ucci) == 1.2
+    assert score_to_evaluation({'depth': 9}) is None
+
+
+def test_non_info_lines():
+    assert parse_info("info string NNUE evaluation using xiangqi.nnue") is None
+    assert parse_info("bestmove h2e2 ponder h9g7") is None
+    assert parse_info("readyok") is None
+    # Dòng currmove không có điểm
+    assert parse_info("info depth 14 currmove g0e2 currmovenumber 12") == {'depth': 14}
+
+
+def test_parse_bestmove():
+    assert parse_bestmove("bestmove h2e2 ponder h9g7") == ("h2e2", "h9g7")
+    assert parse_bestmove("bestmove h2e2") == ("h2e2", None)
+    assert parse_bestmove("bestmove (none)") == (None, None)
+    assert parse_bestmove("bestmove none") == (None, None)
+    assert parse_bestmove("nobestmove") == (None, None)
+
+
+def test_matches_legacy_parser_on_sample_log():
+    assert os.path.exists(DEFAULT_INPUT)
+    lines = load_lines(DEFAULT_INPUT)
+    assert lines
+    for line in lines:
+        assert new_parse_info(line) == legacy_parse_info(line), line
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Test thống kê của match runner: Elo, LOS và SPRT
+"""
+
+import math
+
+import pytest
+
+from src.engine.match_runner import (elo_estimate, elo_from_score, sprt_bounds,
+                                     sprt_llr)
+
+
+def test_elo_from_score():
+    assert elo_from_score(0.5) == 0.0
+    assert elo_from_score(0.75) == pytest.approx(400 * math.log10(3))
+    assert elo_from_score(0.25) == pytest.approx(-400 * math.log10(3))
+    assert elo_from_score(1.0) == float('inf')
+    assert elo_from_score(0.0) == float('-inf')
+
+
+def test_elo_estimate():
+    result = elo_estimate(60, 20, 40)
+    assert result['games'] == 120
+    assert result['score'] == pytest.approx(70 / 120)
+    assert result['elo'] == pytest.approx(elo_from_score(70 / 120))
+
+    # Khoảng tin cậy 95% theo phương sai điểm mỗi ván (thắng/hòa/thua)
+    score = 70 / 120
+    variance = (60 * (1 - score) ** 2 + 20 * (0.5 - score) ** 2 + 40 * score ** 2) / 120
+    margin = 1.959964 * math.sqrt(variance / 120)
+    assert result['error'] == pytest.approx(
+        (elo_from_score(score + margin) - elo_from_score(score - margin)) / 2)
+    assert 0 < result['error'] < 100
+
+    # (thắng - thua) / sqrt(thắng + thua) = 2 -> LOS = Phi(2)
+    assert result['los'] == pytest.approx(0.97725, abs=1e-5)
+
+
+def test_elo_estimate_edge_cases():
+    even = elo_estimate(10, 5, 10)
+    assert even['elo'] == 0.0 and even['los'] == 0.5
+
+    draws = elo_estimate(0, 8, 0)
+    assert draws['los'] == 0.5 and draws['error'] == 0.0
+
+    empty = elo_estimate(0, 0, 0)
+    assert empty['games'] == 0 and math.isnan(empty['error'])
+
+    assert elo_estimate(40, 20, 60)['los'] == pytest.approx(1 - 0.97725, abs=1e-5)
+
+
+def test_sprt_bounds():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert lower == pytest.approx(math.log(0.05 / 0.95))
+    assert upper == pytest.approx(math.log(19))
+    lower, upper = sprt_bounds(0.05, 0.1)
+    assert lower == pytest.approx(math.log(0.1 / 0.95))
+    assert upper == pytest.approx(math.log(0.9 / 0.05))
+
+
+def test_sprt_llr():
+    assert sprt_llr(60, 20, 40, 0.0, 5.0) == pytest.approx(0.34185, rel=1e-4)
+    # Điểm bằng nhau nghiêng về H0 (elo0 = 0)
+    assert sprt_llr(400, 200, 400, 0.0, 5.0) < 0
+    # LLR tăng tuyến tính theo số ván khi tỉ lệ kết quả giữ nguyên
+    assert sprt_llr(120, 40, 80, 0.0, 5.0) == pytest.approx(2 * sprt_llr(60, 20, 40, 0.0, 5.0))
+    # Đổi vai H0/H1 thì đổi dấu
+    assert sprt_llr(60, 20, 40, 5.0, 0.0) == pytest.approx(-sprt_llr(60, 20, 40, 0.0, 5.0))
+
+
+def test_sprt_llr_without_information():
+    assert sprt_llr(0, 0, 0, 0.0, 5.0) == 0.0
+    # Toàn hòa: phương sai 0, chưa kết luận được
+    assert sprt_llr(0, 10, 0, 0.0, 5.0) == 0.0
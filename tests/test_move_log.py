@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Test MoveLog: đóng gói record, checkpoint và dựng lại position theo ply
+"""
+
+import random
+
+import pytest
+
+from src.core.move_log import (CHECKPOINT_INTERVAL, FLAG_CHASE, FLAG_CHECK,
+                               MoveLog, pack_record, unpack_record)
+from src.core.perft import START_FEN
+from src.core.position import Position
+
+
+def _random_game(plies, seed):
+    """Đi ngẫu nhiên plies nửa nước, trả về (log, snapshot sau từng ply)"""
+    rng = random.Random(seed)
+    position = Position.from_fen(START_FEN)
+    log = MoveLog(position)
+    snapshots = [position.snapshot()]
+    for _ in range(plies):
+        moves = position.legal_moves()
+        if not moves:
+            break
+        from_sq, to_sq = rng.choice(moves)
+        piece = position.squares[from_sq]
+        captured = position.apply((from_sq, to_sq))
+        log.append(position, from_sq, to_sq, piece, captured)
+        snapshots.append(position.snapshot())
+    return log, snapshots
+
+
+def test_pack_unpack_round_trip():
+    for record in [(0, 89, 1, 0, 0), (81, 4, 15, 12, FLAG_CHECK | FLAG_CHASE),
+                   (45, 46, 5, 7, FLAG_CHASE)]:
+        assert unpack_record(pack_record(*record)) == record
+
+
+def test_checkpoints_every_interval():
+    log, snapshots = _random_game(3 * CHECKPOINT_INTERVAL + 5, seed=1)
+    assert sorted(log.checkpoints) == [0, CHECKPOINT_INTERVAL, 2 * CHECKPOINT_INTERVAL,
+                                       3 * CHECKPOINT_INTERVAL]
+    for ply, snapshot in log.checkpoints.items():
+        assert snapshot == snapshots[ply]
+
+
+def test_position_at_replays_from_checkpoint():
+    log, snapshots = _random_game(3 * CHECKPOINT_INTERVAL + 5, seed=2)
+    for ply, snapshot in enumerate(snapshots):
+        position = log.position_at(ply)
+        assert position.snapshot() == snapshot
+        # Khóa Zobrist cập nhật dần phải khớp khóa tính lại từ đầu
+        assert position.key == Position.from_fen(position.to_fen()).key
+
+    with pytest.raises(IndexError):
+        log.position_at(len(snapshots))
+
+
+def test_append_after_undo_drops_redo_branch():
+    log, snapshots = _random_game(2 * CHECKPOINT_INTERVAL + 3, seed=3)
+    total = len(log.records)
+    for _ in range(CHECKPOINT_INTERVAL + 2):
+        log.undo()
+    assert log.can_redo()
+
+    # Đi nước khác tại con trỏ: cắt nhánh redo và checkpoint phía sau
+    ply = log.ply
+    position = log.position_at(ply)
+    from_sq, to_sq = position.legal_moves()[0]
+    piece = position.squares[from_sq]
+    captured = position.apply((from_sq, to_sq))
+    log.append(position, from_sq, to_sq, piece, captured)
+
+    assert len(log.records) == ply + 1 < total
+    assert not log.can_redo()
+    assert all(checkpoint <= ply for checkpoint in log.checkpoints)
+    assert log.position_at(ply + 1).snapshot() == position.snapshot()
+    assert log.position_at(ply).snapshot() == snapshots[ply]
+
+
+def test_undo_redo_move_pointer():
+    log, _ = _random_game(10, seed=4)
+    records = [log.record(ply) for ply in range(10)]
+    assert [log.undo() for _ in range(10)] == records[::-1]
+    assert not log.can_undo()
+    assert [log.redo() for _ in range(10)] == records
+    assert list(log.iter_records()) == records
+
+    log.seek(4)
+    assert len(log) == 4
+    assert list(log.iter_records()) == records[:4]
+    with pytest.raises(IndexError):
+        log.seek(11)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Test bộ sinh nước đi của Position: luật tướng đối mặt, giải chiếu và perft
+"""
+
+import random
+
+import pytest
+
+from benchmarks.perft_bench import PERFT_SUITE
+from src.core.perft import START_FEN, engine_notation_to_move, perft
+from src.core.position import Position
+
+
+def _brute_force_moves(position):
+    # Lọc nước theo luật di chuyển bằng cách đi thử rồi xét chiếu
+    return {move for move in position.pseudo_legal_moves() if position.is_legal(move)}
+
+
+def test_start_position_moves():
+    position = Position.from_fen(START_FEN)
+    moves = position.legal_moves()
+    assert len(moves) == 44
+    assert engine_notation_to_move("h2e2") in moves
+    assert engine_notation_to_move("b0c2") in moves
+
+
+def test_kings_facing():
+    assert Position.from_fen("4k4/9/9/9/9/9/9/9/9/4K4 w").kings_facing()
+    assert not Position.from_fen("4k4/9/9/9/4p4/9/9/9/9/4K4 w").kings_facing()
+    assert not Position.from_fen("3k5/9/9/9/9/9/9/9/9/4K4 w").kings_facing()
+
+
+def test_king_cannot_step_onto_open_file():
+    # Tướng đen ở cột d: tướng đỏ không được sang cột d
+    position = Position.from_fen("3k5/9/9/9/9/9/9/9/9/4K4 w")
+    moves = position.legal_moves()
+    assert engine_notation_to_move("e0d0") not in moves
+    assert engine_notation_to_move("e0f0") in moves
+    assert engine_notation_to_move("e0e1") in moves
+
+
+def test_pinned_blocker_between_kings():
+    # Xe đỏ là quân duy nhất chắn giữa 2 tướng: chỉ được đi dọc cột e
+    position = Position.from_fen("4k4/9/9/9/9/9/9/9/4R4/4K4 w")
+    rook_sq = 8 * 9 + 4
+    rook_moves = [move for move in position.legal_moves() if move[0] == rook_sq]
+    assert rook_moves
+    assert all(move[1] % 9 == 4 for move in rook_moves)
+
+
+def test_evasions_resolve_check():
+    # Xe đen chiếu tướng đỏ theo cột: mọi nước hợp lệ đều phải giải chiếu
+    position = Position.from_fen("3k5/9/9/9/4r4/9/9/2B6/9/3AK4 w")
+    assert position.is_in_check()
+
+    moves = position.legal_moves()
+    assert set(moves) == _brute_force_moves(position)
+    # Chặn bằng sĩ hoặc tượng, hoặc tướng tránh sang cột f
+    assert engine_notation_to_move("d0e1") in moves
+    assert engine_notation_to_move("c2e4") in moves
+    assert engine_notation_to_move("e0f0") in moves
+    assert engine_notation_to_move("e0e1") not in moves
+    for move in moves:
+        position.push(move)
+        assert not position.is_in_check(position.side ^ 1)
+        position.pop()
+
+
+def test_cannon_check_screen_can_move_away():
+    # Pháo đen chiếu qua ngòi là mã đỏ: rút ngòi cũng giải chiếu
+    position = Position.from_fen("3k5/9/9/9/4c4/9/4N4/9/9/4K4 w")
+    assert position.is_in_check()
+    moves = position.legal_moves()
+    assert set(moves) == _brute_force_moves(position)
+    assert any(move[0] == 6 * 9 + 4 for move in moves)
+
+
+@pytest.mark.parametrize("name, fen", [(name, fen) for name, fen, _ in PERFT_SUITE])
+def test_legal_moves_match_brute_force(name, fen):
+    # Đi ngẫu nhiên từ mỗi thế trong bộ perft, so với cách lọc chậm
+    rng = random.Random(name)
+    position = Position.from_fen(fen)
+    for _ in range(40):
+        moves = position.legal_moves()
+        assert set(moves) == _brute_force_moves(position)
+        if not moves:
+            break
+        position.push(rng.choice(moves))
+
+
+def test_push_pop_restores_position():
+    position = Position.from_fen(START_FEN)
+    fen, key = position.to_fen(), position.key
+    rng = random.Random(1)
+    for _ in range(30):
+        position.push(rng.choice(position.legal_moves()))
+    for _ in range(30):
+        position.pop()
+    assert position.to_fen() == fen
+    assert position.key == key
+
+
+@pytest.mark.parametrize("name, fen, depth, nodes", [
+    (name, fen, depth, nodes)
+    for name, fen, counts in PERFT_SUITE
+    for depth, nodes in counts.items() if depth <= 3
+])
+def test_perft(name, fen, depth, nodes):
+    assert perft(Position.from_fen(fen), depth) == nodes
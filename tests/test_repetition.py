@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Test xét đuổi quân (Position.chased_pieces) và xử đuổi dai (RepetitionTracker)
+"""
+
+from src.core.game_state import GameState
+from src.core.position import Position
+from src.core.repetition import PERPETUAL_CHASE
+
+
+def test_chased_pawn_crossed_river():
+    # Tốt đen đã qua sông (hàng 6) bị xe đỏ tấn công -> bị đuổi
+    position = Position.from_fen("3k5/9/9/9/9/9/p8/9/R8/4K4 w")
+    assert position.chased_pieces(8 * 9) == [6 * 9]
+
+
+def test_pawn_not_crossed_river_is_not_chased():
+    # Tốt đen chưa qua sông (hàng 3) -> không tính là bị đuổi
+    position = Position.from_fen("3k5/9/9/p8/9/9/9/9/R8/4K4 w")
+    assert position.chased_pieces(8 * 9) == []
+
+
+def test_perpetual_chase_of_crossed_pawn():
+    # Xe đỏ đuổi tốt đen đã qua sông qua lại giữa 2 cột
+    state = GameState(verbose=False)
+    assert state.load_from_fen("3k5/9/9/9/9/9/1p7/9/R8/4K4 w")
+    cycle = [(8, 0, 8, 1), (6, 1, 6, 0), (8, 1, 8, 0), (6, 0, 6, 1)]
+
+    outcome = None
+    for _ in range(3):
+        for move in cycle:
+            assert state.make_move(*move)
+        outcome = state.repetition.outcome()
+        if outcome is not None:
+            break
+
+    assert outcome is not None
+    assert outcome['result'] == PERPETUAL_CHASE
+    assert outcome['loser'] == 'red'